@@ -10,6 +10,7 @@ and a pre-allocated framebuffer write buffer to avoid per-frame allocations.
 """
 
 import asyncio
+import base64
 import colorsys
 import io
 import json
@@ -21,6 +22,7 @@ import socket
 import sys
 import threading
 import time
+import zlib
 from typing import Callable, Optional
 
 import numpy as np
@@ -110,6 +112,8 @@ def get_lan_ip() -> str:
 
 
 server_info: dict = {}
+# Feature flags from the metadata service's /health, refreshed on connect
+server_capabilities: frozenset[str] = frozenset()
 
 SNAPCAST_MDNS_TYPE = "_snapcast._tcp.local."
 DISCOVERY_TIMEOUT = 5.0
@@ -244,6 +248,22 @@ current_metadata: dict | None = None
 metadata_version: int = 0  # bumped on change
 cached_artwork: Image.Image | None = None
 cached_artwork_url: str = ""
+# Raw (native FB format) artwork, fetched at the exact art panel size
+cached_artwork_fb: np.ndarray | None = None
+cached_artwork_fb_url: str = ""
+# Artwork URL last fetched in the background behind a placeholder
+_artwork_prefetch_url: str = ""
+# Lock protecting the artwork caches, _artwork_prefetch_url and
+# metadata_version against the placeholder prefetch thread
+_artwork_lock = threading.Lock()
+
+
+def _bump_metadata_version() -> None:
+    """Ask the render loop for a new base frame (safe from any thread)."""
+    global metadata_version
+    with _artwork_lock:
+        metadata_version += 1
+
 
 # Playback time tracking (local clock for smooth updates)
 _playback_start: float = 0.0  # monotonic time when playback started
@@ -264,6 +284,7 @@ FB_WIDTH, FB_HEIGHT = WIDTH, HEIGHT
 # Cached frames: base_frame has bg+art+text, spectrum_bg is native FB format
 base_frame: Image.Image | None = None
 base_frame_version: int = -1
+base_art_fb: np.ndarray | None = None  # art blitted over base_frame, if raw
 spectrum_bg_np: np.ndarray | None = None  # numpy RGB array for alpha blending
 spectrum_bg_fb: np.ndarray | None = None  # native FB format (RGB565 or BGRA32)
 _spectrum_work_buf: np.ndarray | None = (
@@ -438,6 +459,13 @@ def write_full_frame(img: Image.Image) -> None:
         logger.error(f"Framebuffer full-frame write failed: {e}")
 
 
+def write_base_frame(img: Image.Image) -> None:
+    """Write the base frame, then blit raw artwork (if any) over its panel."""
+    write_full_frame(img)
+    if base_art_fb is not None:
+        write_region_to_fb_fast(base_art_fb, layout["art_x"], layout["art_y"])
+
+
 def _get_font(size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
     """Load font with caching."""
     key = ("bold" if bold else "regular", size)
@@ -785,20 +813,118 @@ def _display_release_year(meta: dict) -> str:
     return ""
 
 
-def fetch_artwork(url: str) -> Image.Image | None:
-    """Fetch and cache artwork image."""
-    global cached_artwork, cached_artwork_url
-    if url == cached_artwork_url and cached_artwork is not None:
-        return cached_artwork
+def fetch_server_capabilities() -> frozenset[str]:
+    """Capabilities the metadata service lists in `/health`.
+
+    Empty when the request fails or the server predates the list, so
+    optional artwork variants are only asked of servers that offer them.
+    `/health` answers 503 while snapserver is unreachable, but its body
+    still carries the list.
+    """
+    url = f"http://{metadata_host}:{METADATA_HTTP_PORT}/health"
+    try:
+        caps = requests.get(url, timeout=3).json().get("capabilities")
+    except (requests.exceptions.RequestException, ValueError, AttributeError) as e:
+        logger.debug(f"Capability probe failed: {e}")
+        return frozenset()
+    if not isinstance(caps, list):
+        return frozenset()
+    return frozenset(c for c in caps if isinstance(c, str))
+
+
+def sized_artwork_url(url: str, size: int) -> str:
+    """Ask the metadata service for artwork already scaled to `size` px.
+
+    Only our own /artwork/ URLs understand `?size=`, and only when the
+    server advertises `artwork_size`; otherwise (and for URLs that already
+    carry a query) the URL is returned unchanged.
+    """
+    if "artwork_size" not in server_capabilities:
+        return url
+    if "/artwork/" not in url or "?" in url or size <= 0:
+        return url
+    return f"{url}?size={size}"
+
+
+def _raw_artwork_format() -> str:
+    """Metadata-service raw pixel format matching this framebuffer, or "".
+
+    Only offered when no render→FB scaling is needed, so the buffer can be
+    copied into the mmap as is.
+    """
+    if (WIDTH, HEIGHT) != (FB_WIDTH, FB_HEIGHT):
+        return ""
+    if fb_bpp == 16:
+        return "rgb565"
+    if fb_bpp == 32 and not fb_big_endian:
+        return "bgra"
+    return ""
+
+
+def _raw_artwork_url(url: str, size: int) -> str:
+    """URL of `url` as size×size raw pixels for this FB, or "" if unavailable."""
+    if "artwork_raw" not in server_capabilities:
+        return ""
+    fmt = _raw_artwork_format()
+    if not fmt or "/artwork/" not in url or "?" in url:
+        return ""
+    return f"{url}?format={fmt}&w={size}&h={size}&compress=zlib"
+
+
+def _download_artwork_fb(raw_url: str, size: int) -> np.ndarray | None:
+    """Download and unpack a raw artwork buffer; no caching."""
+    fmt = _raw_artwork_format()
+    try:
+        full_url = raw_url
+        if raw_url.startswith("/"):
+            full_url = f"http://{metadata_host}:{METADATA_HTTP_PORT}{raw_url}"
+        resp = requests.get(full_url, timeout=3)
+        if resp.status_code != 200:
+            logger.debug(f"Raw artwork fetch returned {resp.status_code}: {raw_url}")
+            return None
+        data = zlib.decompress(resp.content)
+        if fmt == "rgb565":
+            return np.frombuffer(data, dtype="<u2").reshape(size, size)
+        return np.frombuffer(data, dtype=np.uint8).reshape(size, size, 4)
+    except requests.exceptions.RequestException as e:
+        logger.debug(f"Raw artwork fetch failed: {e}")
+    except (zlib.error, ValueError) as e:
+        logger.warning(f"Malformed raw artwork from {raw_url}: {e}")
+    return None
+
+
+def fetch_artwork_fb(url: str, size: int) -> np.ndarray | None:
+    """Fetch artwork as size×size native FB pixels, ready to blit.
+
+    Skips decode, resize and `_rgb_to_fb_native` on track change. None when
+    the URL isn't ours, the FB format has no raw equivalent or the server
+    doesn't advertise `artwork_raw` — the caller falls back to
+    `fetch_artwork`.
+    """
+    global cached_artwork_fb, cached_artwork_fb_url
+    raw_url = _raw_artwork_url(url, size)
+    if not raw_url:
+        return None
+    with _artwork_lock:
+        if raw_url == cached_artwork_fb_url and cached_artwork_fb is not None:
+            return cached_artwork_fb
+    pixels = _download_artwork_fb(raw_url, size)
+    if pixels is not None:
+        with _artwork_lock:
+            cached_artwork_fb = pixels
+            cached_artwork_fb_url = raw_url
+    return pixels
+
+
+def _download_artwork(url: str) -> Image.Image | None:
+    """Download and open an artwork image; no caching."""
     try:
         full_url = url
         if url.startswith("/"):
             full_url = f"http://{metadata_host}:{METADATA_HTTP_PORT}{url}"
         resp = requests.get(full_url, timeout=3)
         if resp.status_code == 200:
-            cached_artwork = Image.open(io.BytesIO(resp.content))
-            cached_artwork_url = url
-            return cached_artwork
+            return Image.open(io.BytesIO(resp.content))
         elif resp.status_code != 404:
             logger.debug(f"Artwork fetch returned {resp.status_code}: {url}")
     except requests.exceptions.RequestException as e:
@@ -808,11 +934,84 @@ def fetch_artwork(url: str) -> Image.Image | None:
     return None
 
 
+def fetch_artwork(url: str) -> Image.Image | None:
+    """Fetch and cache artwork image."""
+    global cached_artwork, cached_artwork_url
+    with _artwork_lock:
+        if url == cached_artwork_url and cached_artwork is not None:
+            return cached_artwork
+    img = _download_artwork(url)
+    if img is not None:
+        with _artwork_lock:
+            cached_artwork = img
+            cached_artwork_url = url
+    return img
+
+
+def _artwork_cached(url: str, size: int) -> bool:
+    """True if drawing `url` needs no HTTP fetch."""
+    raw_url = _raw_artwork_url(url, size)
+    with _artwork_lock:
+        if cached_artwork_fb is not None and cached_artwork_fb_url == raw_url:
+            return True
+        return cached_artwork is not None and cached_artwork_url == (
+            sized_artwork_url(url, size)
+        )
+
+
+def render_placeholder(placeholder: dict, size: int) -> Image.Image | None:
+    """Art panel stand-in from the metadata's `artwork_placeholder`.
+
+    The tiny thumbnail upscaled (a soft blur of the cover), or the dominant
+    colour if there is none; None if the payload is malformed.
+    """
+    try:
+        side = int(placeholder.get("thumb_size", 0))
+        thumb = base64.b64decode(placeholder.get("thumb", ""), validate=True)
+        if side > 0 and len(thumb) == side * side * 3:
+            small = Image.frombytes("RGB", (side, side), thumb)
+            return small.resize((size, size), Image.BICUBIC)
+        return Image.new("RGB", (size, size), placeholder["color"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _prefetch_artwork(url: str, size: int) -> None:
+    """Fetch artwork behind a placeholder; redraw once it is cached.
+
+    Runs on its own thread. If the track moved on while the download was
+    in flight the result is dropped rather than clobbering the caches.
+    """
+    global cached_artwork, cached_artwork_url, cached_artwork_fb
+    global cached_artwork_fb_url, metadata_version
+    raw_url = _raw_artwork_url(url, size)
+    pixels = _download_artwork_fb(raw_url, size) if raw_url else None
+    img = None
+    if pixels is None:
+        sized_url = sized_artwork_url(url, size)
+        img = _download_artwork(sized_url)
+        if img is None:
+            return  # keep the placeholder
+    with _artwork_lock:
+        if _artwork_prefetch_url != url:
+            return
+        if pixels is not None:
+            cached_artwork_fb = pixels
+            cached_artwork_fb_url = raw_url
+        else:
+            cached_artwork = img
+            cached_artwork_url = sized_url
+        metadata_version += 1
+
+
 def render_base_frame() -> Image.Image:
     """Render static content: background, album art, track info.
 
-    Called only when metadata changes.
+    Called only when metadata changes. Artwork fetched as raw FB pixels is
+    left out of the image and stored in `base_art_fb` for `write_base_frame`.
     """
+    global base_art_fb, _artwork_prefetch_url
+    base_art_fb = None
     bg = create_background()
     draw = ImageDraw.Draw(bg)
     L = layout
@@ -837,8 +1036,30 @@ def render_base_frame() -> Image.Image:
 
     if is_playing:
         artwork_url = meta.get("artwork") or meta.get("artist_image") or ""
-        if artwork_url:
-            art_img = fetch_artwork(artwork_url)
+        placeholder = meta.get("artwork_placeholder")
+        stand_in = None
+        if (
+            artwork_url
+            and isinstance(placeholder, dict)
+            and artwork_url != _artwork_prefetch_url
+            and not _artwork_cached(artwork_url, L["art_size"])
+        ):
+            # Paint the placeholder now so the title isn't held up by the
+            # artwork download; the real art replaces it on the next redraw
+            stand_in = render_placeholder(placeholder, L["art_size"])
+        if stand_in is not None:
+            with _artwork_lock:
+                _artwork_prefetch_url = artwork_url
+            bg.paste(stand_in, (L["art_x"], L["art_y"]))
+            threading.Thread(
+                target=_prefetch_artwork,
+                args=(artwork_url, L["art_size"]),
+                daemon=True,
+            ).start()
+        elif artwork_url:
+            base_art_fb = fetch_artwork_fb(artwork_url, L["art_size"])
+        if artwork_url and stand_in is None and base_art_fb is None:
+            art_img = fetch_artwork(sized_artwork_url(artwork_url, L["art_size"]))
             if art_img:
                 resized = art_img.resize((L["art_size"], L["art_size"]), Image.LANCZOS)
                 bg.paste(resized, (L["art_x"], L["art_y"]))
@@ -1425,7 +1646,7 @@ async def spectrum_ws_reader() -> None:
 
 async def _handle_metadata_message(message: str) -> None:
     """Process metadata WebSocket message."""
-    global current_metadata, metadata_version
+    global current_metadata
     global _playback_start, _playback_offset, _is_playing, _last_duration
     global server_info
 
@@ -1436,11 +1657,17 @@ async def _handle_metadata_message(message: str) -> None:
         if data.get("type") == "server_info":
             if data != server_info:
                 server_info = data
-                metadata_version += 1
+                _bump_metadata_version()
             return
 
-        # Sync playback clock for progress bar
+        # Sync playback clock for progress bar. Anchored messages carry the
+        # position as of `elapsed_at` (server wall clock) advancing at `rate`;
+        # the server only re-sends it on a seek/pause/track change.
         new_elapsed = data.get("elapsed", 0)
+        elapsed_at = data.get("elapsed_at")
+        if isinstance(elapsed_at, (int, float)):
+            age = max(0.0, time.time() - elapsed_at)
+            new_elapsed += data.get("rate", 0) * age
         new_duration = data.get("duration", 0)
         new_playing = data.get("playing", False)
 
@@ -1461,7 +1688,14 @@ async def _handle_metadata_message(message: str) -> None:
                 logger.debug(f"Clock sync: seek to {new_elapsed}s")
 
         # Ignore volatile fields for change detection (must match metadata-service)
-        _VOLATILE = {"bitrate", "artwork", "artist_image", "elapsed", "duration"}
+        _VOLATILE = {
+            "bitrate",
+            "artwork",
+            "artist_image",
+            "elapsed",
+            "elapsed_at",
+            "duration",
+        }
         old_stable = {
             k: v for k, v in (current_metadata or {}).items() if k not in _VOLATILE
         }
@@ -1475,7 +1709,7 @@ async def _handle_metadata_message(message: str) -> None:
 
         if new_stable != old_stable or artwork_changed:
             current_metadata = data
-            metadata_version += 1
+            _bump_metadata_version()
             logger.debug(f"Metadata updated: {data.get('title', 'N/A')}")
         else:
             current_metadata = data  # update volatile fields silently
@@ -1493,7 +1727,7 @@ async def metadata_ws_reader() -> None:
     skip mDNS discovery — keep retrying loopback. Mirrors snapclient's
     discover-server.sh both-mode shortcut so the topology stays loopback.
     """
-    global metadata_host, snapserver_display, metadata_version
+    global metadata_host, snapserver_display, server_capabilities
     consecutive_failures = 0
 
     while True:
@@ -1501,8 +1735,16 @@ async def metadata_ws_reader() -> None:
         try:
             async with websockets.connect(ws_url) as ws:
                 logger.info(f"Connected to metadata WebSocket: {ws_url}")
+                caps = await asyncio.get_running_loop().run_in_executor(
+                    None, fetch_server_capabilities
+                )
+                if caps != server_capabilities:
+                    server_capabilities = caps
+                    _bump_metadata_version()
                 if CLIENT_ID:
-                    await ws.send(json.dumps({"subscribe": CLIENT_ID}))
+                    await ws.send(
+                        json.dumps({"subscribe": CLIENT_ID, "elapsed_mode": "anchored"})
+                    )
                     logger.info(f"Subscribed to metadata for client '{CLIENT_ID}'")
                 consecutive_failures = 0
                 async for message in ws:
@@ -1526,7 +1768,7 @@ async def metadata_ws_reader() -> None:
                         logger.info(f"Switching server: {metadata_host} → {new_host}")
                         metadata_host = new_host
                         snapserver_display = new_host
-                        metadata_version += 1
+                        _bump_metadata_version()
                     consecutive_failures = 0
                 else:
                     logger.warning("No snapcast servers found via mDNS")
@@ -1585,13 +1827,16 @@ async def render_loop() -> None:
 
             # Rebuild base frame if metadata changed
             if base_frame_version != metadata_version:
+                # Taken before rendering so a bump made meanwhile (e.g. by
+                # the artwork prefetch) triggers another redraw
+                version = metadata_version
                 base_frame = await asyncio.get_event_loop().run_in_executor(
                     None, render_base_frame
                 )
                 extract_spectrum_bg()
-                base_frame_version = metadata_version
+                base_frame_version = version
                 await asyncio.get_event_loop().run_in_executor(
-                    None, write_full_frame, base_frame
+                    None, write_base_frame, base_frame
                 )
                 # Full frame overwrites clock/progress regions — force redraw
                 _clock_cache["dirty"] = True
@@ -1,6 +1,7 @@
 """Tests for fb-display renderer (pure logic, no hardware)."""
 
 import asyncio
+import json
 import sys
 import os
 import time
@@ -272,6 +273,180 @@ class TestDisplayReleaseYear:
         assert fb_display._display_release_year(meta) == ""
 
 
+class TestSizedArtworkUrl:
+    """Test `?size=` is only requested from the metadata service's /artwork/."""
+
+    @pytest.fixture(autouse=True)
+    def _caps(self, monkeypatch):
+        monkeypatch.setattr(
+            fb_display, "server_capabilities", frozenset({"artwork_size"})
+        )
+
+    def test_appends_size_to_local_artwork(self):
+        url = "/artwork/artwork_" + "a" * 64 + ".jpg"
+        assert fb_display.sized_artwork_url(url, 300) == f"{url}?size=300"
+
+    def test_leaves_external_url_alone(self):
+        url = "https://coverartarchive.org/release/x/front-500"
+        assert fb_display.sized_artwork_url(url, 300) == url
+
+    def test_leaves_existing_query_alone(self):
+        url = "/artwork/artwork_x.jpg?size=100"
+        assert fb_display.sized_artwork_url(url, 300) == url
+
+    def test_leaves_url_alone_without_capability(self, monkeypatch):
+        monkeypatch.setattr(fb_display, "server_capabilities", frozenset())
+        url = "/artwork/artwork_" + "a" * 64 + ".jpg"
+        assert fb_display.sized_artwork_url(url, 300) == url
+
+
+class TestFetchArtworkFb:
+    """Test raw framebuffer artwork fetch and its fallbacks."""
+
+    @pytest.fixture(autouse=True)
+    def _fb(self, monkeypatch):
+        monkeypatch.setattr(fb_display, "fb_bpp", 16)
+        monkeypatch.setattr(fb_display, "fb_big_endian", False)
+        monkeypatch.setattr(fb_display, "FB_WIDTH", fb_display.WIDTH)
+        monkeypatch.setattr(fb_display, "FB_HEIGHT", fb_display.HEIGHT)
+        monkeypatch.setattr(fb_display, "cached_artwork_fb", None)
+        monkeypatch.setattr(fb_display, "cached_artwork_fb_url", "")
+        monkeypatch.setattr(
+            fb_display, "server_capabilities", frozenset({"artwork_raw"})
+        )
+
+    def _serve(self, monkeypatch, status=200, content=b""):
+        calls = []
+
+        def fake_get(url, timeout):
+            calls.append(url)
+            return type("Resp", (), {"status_code": status, "content": content})
+
+        monkeypatch.setattr(fb_display.requests, "get", fake_get)
+        return calls
+
+    def test_fetches_native_pixels_once(self, monkeypatch):
+        import zlib
+
+        pixels = np.arange(16, dtype="<u2").reshape(4, 4)
+        calls = self._serve(monkeypatch, content=zlib.compress(pixels.tobytes()))
+        url = "http://h:8083/artwork/artwork_aa.jpg"
+
+        result = fb_display.fetch_artwork_fb(url, 4)
+
+        assert (result == pixels).all()
+        assert calls == [f"{url}?format=rgb565&w=4&h=4&compress=zlib"]
+        assert fb_display.fetch_artwork_fb(url, 4) is result
+        assert len(calls) == 1
+
+    def test_falls_back_on_old_server_or_bad_payload(self, monkeypatch):
+        url = "http://h:8083/artwork/artwork_aa.jpg"
+        self._serve(monkeypatch, status=400)
+        assert fb_display.fetch_artwork_fb(url, 4) is None
+        self._serve(monkeypatch, content=b"not zlib")
+        assert fb_display.fetch_artwork_fb(url, 4) is None
+
+    def test_no_raw_for_external_url_or_scaled_output(self, monkeypatch):
+        calls = self._serve(monkeypatch)
+        assert fb_display.fetch_artwork_fb("https://example.com/a.jpg", 4) is None
+        monkeypatch.setattr(fb_display, "FB_WIDTH", fb_display.WIDTH * 2)
+        assert fb_display.fetch_artwork_fb("/artwork/artwork_aa.jpg", 4) is None
+        assert calls == []
+
+    def test_no_raw_request_unless_advertised(self, monkeypatch):
+        calls = self._serve(monkeypatch)
+        monkeypatch.setattr(
+            fb_display, "server_capabilities", frozenset({"artwork_size"})
+        )
+        url = "http://h:8083/artwork/artwork_aa.jpg"
+        assert fb_display.fetch_artwork_fb(url, 4) is None
+        assert calls == []
+
+
+class TestServerCapabilities:
+    """Test the /health capability probe run on each metadata connection."""
+
+    def _serve(self, monkeypatch, body):
+        def fake_get(url, timeout):
+            assert url.endswith("/health")
+            if isinstance(body, Exception):
+                raise body
+            return type("Resp", (), {"json": lambda self: body})()
+
+        monkeypatch.setattr(fb_display.requests, "get", fake_get)
+
+    def test_reads_advertised_list(self, monkeypatch):
+        self._serve(monkeypatch, {"status": "ok", "capabilities": ["artwork_raw", 3]})
+        assert fb_display.fetch_server_capabilities() == {"artwork_raw"}
+
+    def test_old_or_unreachable_server_has_none(self, monkeypatch):
+        self._serve(monkeypatch, {"status": "ok"})
+        assert fb_display.fetch_server_capabilities() == frozenset()
+        self._serve(monkeypatch, ValueError("not json"))
+        assert fb_display.fetch_server_capabilities() == frozenset()
+        self._serve(monkeypatch, fb_display.requests.exceptions.ConnectionError())
+        assert fb_display.fetch_server_capabilities() == frozenset()
+
+
+class TestArtworkPlaceholder:
+    """Test the inline placeholder painted before artwork is fetched."""
+
+    def test_upscales_thumbnail(self):
+        import base64
+
+        thumb = bytes([255, 0, 0] * 4)
+        placeholder = {
+            "color": "#000000",
+            "thumb": base64.b64encode(thumb).decode(),
+            "thumb_size": 2,
+        }
+        img = fb_display.render_placeholder(placeholder, 40)
+        assert img.size == (40, 40)
+        assert img.getpixel((20, 20)) == (255, 0, 0)
+
+    def test_falls_back_to_dominant_colour(self):
+        img = fb_display.render_placeholder({"color": "#102030"}, 10)
+        assert img.getpixel((5, 5)) == (16, 32, 48)
+
+    def test_malformed_payload(self):
+        assert fb_display.render_placeholder({"color": "nope"}, 10) is None
+        assert (
+            fb_display.render_placeholder({"thumb": "!!", "thumb_size": 2}, 10) is None
+        )
+
+    @pytest.fixture
+    def _prefetch(self, monkeypatch):
+        monkeypatch.setattr(fb_display, "server_capabilities", frozenset())
+        monkeypatch.setattr(fb_display, "cached_artwork", None)
+        monkeypatch.setattr(fb_display, "cached_artwork_url", "")
+        monkeypatch.setattr(fb_display, "_artwork_prefetch_url", "/artwork/a.jpg")
+
+    def test_prefetch_redraws_only_on_success(self, monkeypatch, _prefetch):
+        monkeypatch.setattr(fb_display, "_download_artwork", lambda url: None)
+        version = fb_display.metadata_version
+        fb_display._prefetch_artwork("/artwork/a.jpg", 100)
+        assert fb_display.metadata_version == version
+
+        art = object()
+        monkeypatch.setattr(fb_display, "_download_artwork", lambda url: art)
+        fb_display._prefetch_artwork("/artwork/a.jpg", 100)
+        assert fb_display.metadata_version == version + 1
+        assert fb_display.cached_artwork is art
+        assert fb_display.cached_artwork_url == "/artwork/a.jpg"
+
+    def test_prefetch_for_a_previous_track_is_dropped(self, monkeypatch, _prefetch):
+        def download(url):
+            # The next track's placeholder goes up while this one downloads
+            fb_display._artwork_prefetch_url = "/artwork/b.jpg"
+            return object()
+
+        monkeypatch.setattr(fb_display, "_download_artwork", download)
+        version = fb_display.metadata_version
+        fb_display._prefetch_artwork("/artwork/a.jpg", 100)
+        assert fb_display.metadata_version == version
+        assert fb_display.cached_artwork is None
+
+
 class TestRgbToFbNative:
     """Test RGB to framebuffer format conversion."""
 
@@ -687,6 +862,52 @@ class TestHandleMetadataMessage:
         # No exception = pass; globals unchanged
         assert fb_display.server_info == {}
 
+    def test_anchored_elapsed_extrapolated_from_server_timestamp(self):
+        """elapsed_at/rate anchor: position advances by the message's age."""
+        fb_display._is_playing = False
+        fb_display._last_duration = 0
+        msg = json.dumps(
+            {
+                "title": "Song",
+                "playing": True,
+                "elapsed": 30,
+                "elapsed_at": time.time() - 10,
+                "rate": 1.0,
+                "duration": 200,
+            }
+        )
+        asyncio.run(fb_display._handle_metadata_message(msg))
+        assert 39 <= fb_display.get_current_elapsed() <= 41
+
+    def test_anchor_at_track_start_is_extrapolated(self):
+        """An anchor at elapsed 0, rebroadcast seconds later, is not a seek to 0."""
+        fb_display._is_playing = False
+        fb_display._last_duration = 0
+        anchor = {
+            "title": "Song",
+            "playing": True,
+            "elapsed": 0,
+            "elapsed_at": time.time() - 6,
+            "rate": 1.0,
+            "duration": 200,
+        }
+        asyncio.run(fb_display._handle_metadata_message(json.dumps(anchor)))
+        # Follow-up enrichment message (artwork) repeating the same anchor
+        enriched = {**anchor, "artwork": "http://srv/artwork/a.jpg"}
+        asyncio.run(fb_display._handle_metadata_message(json.dumps(enriched)))
+        assert 5 <= fb_display.get_current_elapsed() <= 7
+
+    def test_anchor_refresh_does_not_redraw(self):
+        """A new anchor for the same track is volatile — no base frame redraw."""
+        base = {"title": "Song", "playing": True, "duration": 200, "rate": 1.0}
+        now = time.time()
+        first = {**base, "elapsed": 10, "elapsed_at": now}
+        asyncio.run(fb_display._handle_metadata_message(json.dumps(first)))
+        version = fb_display.metadata_version
+        seek = {**base, "elapsed": 90, "elapsed_at": now}
+        asyncio.run(fb_display._handle_metadata_message(json.dumps(seek)))
+        assert fb_display.metadata_version == version
+
 
 class TestVersionSuffix:
     """Test ver_suffix formatting logic from render_base_frame (4 combinations)."""
@@ -14,10 +14,15 @@ Replaces per-client metadata-service containers — N clients no longer make N r
 """
 
 import asyncio
+import base64
 import collections
+import concurrent.futures
+import contextvars
 import hashlib
 import html
+import io
 import ipaddress
+import itertools
 import json
 from datetime import datetime
 import logging
@@ -25,12 +30,15 @@ import os
 import re
 import signal
 import socket
+import sqlite3
 import subprocess
 import sys
+import tempfile
 import threading
 import time
 import urllib.parse
-import urllib.request
+import zlib
+from collections.abc import Callable, Hashable, Iterable, Iterator
 from pathlib import Path
 from typing import Any
 
@@ -38,135 +46,2220 @@ import aiohttp
 import websockets
 from aiohttp import web
 
+# Pillow is optional: without it artwork is stored and served as fetched
+# (no ingest normalization, `?size=` answers with the original).
+try:
+    from PIL import Image, ImageChops
+except ImportError:
+    Image = None
+
 _MAX_CACHE_ENTRIES = 500
 
-# Configuration
-WS_PORT = int(os.environ.get("METADATA_WS_PORT", "8082"))
-HTTP_PORT = int(os.environ.get("METADATA_HTTP_PORT", "8083"))
-SNAPSERVER_HOST = os.environ.get("SNAPSERVER_HOST", "127.0.0.1")
-SNAPSERVER_RPC_PORT = int(os.environ.get("SNAPSERVER_RPC_PORT", "1705"))
-MPD_HOST = os.environ.get("MPD_HOST", "127.0.0.1")
-MPD_PORT = int(os.environ.get("MPD_PORT", "6600"))
-ARTWORK_DIR = Path(os.environ.get("ARTWORK_DIR", "/app/artwork"))
-DEFAULTS_DIR = Path(os.environ.get("DEFAULTS_DIR", "/app/defaults"))
+# Configuration
+WS_PORT = int(os.environ.get("METADATA_WS_PORT", "8082"))
+HTTP_PORT = int(os.environ.get("METADATA_HTTP_PORT", "8083"))
+SNAPSERVER_HOST = os.environ.get("SNAPSERVER_HOST", "127.0.0.1")
+SNAPSERVER_RPC_PORT = int(os.environ.get("SNAPSERVER_RPC_PORT", "1705"))
+MPD_HOST = os.environ.get("MPD_HOST", "127.0.0.1")
+MPD_PORT = int(os.environ.get("MPD_PORT", "6600"))
+# Largest binary chunk (MPD `binarylimit`, MPD >= 0.22.4) asked for when
+# transferring artwork. Must stay below MPD's max_output_buffer_size (8 MiB
+# by default) or MPD drops the connection.
+MPD_BINARY_LIMIT = int(os.environ.get("MPD_BINARY_LIMIT", str(1024 * 1024)))
+# On each MPD track change, the next MPD_PREFETCH_DEPTH queue entries get
+# their artwork, display variants and release metadata looked up in the
+# background, at the lowest lookup priority and for at most
+# MPD_PREFETCH_BUDGET seconds per round. A depth of 0 disables it.
+MPD_PREFETCH_DEPTH = int(os.environ.get("MPD_PREFETCH_DEPTH", "3"))
+MPD_PREFETCH_BUDGET = float(os.environ.get("MPD_PREFETCH_BUDGET", "30"))
+# Opt-in crawl of the whole MPD library that stores each album directory's
+# artwork (embedded in its first track, else the folder image) before it is
+# ever played: one directory per MPD_ARTWORK_CRAWL_DELAY seconds, paused
+# while MPD updates its database or the artwork quota is nearly used up.
+# Progress survives restarts; a changed database is crawled again.
+MPD_ARTWORK_CRAWL = os.environ.get("MPD_ARTWORK_CRAWL", "0") == "1"
+MPD_ARTWORK_CRAWL_DELAY = float(os.environ.get("MPD_ARTWORK_CRAWL_DELAY", "1"))
+# MPD artwork is stored once per album (MusicBrainz album id, album artist +
+# album, else directory). With MPD_ARTWORK_VERIFY each track's first picture
+# chunk is compared to the album's, so the rare per-track art still shows;
+# "0" trusts the album's art without asking MPD.
+MPD_ARTWORK_VERIFY = os.environ.get("MPD_ARTWORK_VERIFY", "1") == "1"
+ARTWORK_DIR = Path(os.environ.get("ARTWORK_DIR", "/app/artwork"))
+DEFAULTS_DIR = Path(os.environ.get("DEFAULTS_DIR", "/app/defaults"))
+
+# Persistent lookup cache (artwork / artist image / release metadata results).
+# Lives next to the artwork on the bind-mounted volume so a container restart
+# or image update doesn't send the whole library back through MusicBrainz.
+# handle_artwork only serves image extensions, so the file is not exposed.
+LOOKUP_DB = Path(os.environ.get("LOOKUP_DB", str(ARTWORK_DIR / "lookups.sqlite3")))
+LOOKUP_DB_MAX_ENTRIES = int(os.environ.get("LOOKUP_DB_MAX_ENTRIES", "20000"))
+# Found results vs "nothing found" results (retried sooner)
+LOOKUP_TTL = float(os.environ.get("LOOKUP_TTL_DAYS", "90")) * 86400
+LOOKUP_NEGATIVE_TTL = float(os.environ.get("LOOKUP_NEGATIVE_TTL_HOURS", "24")) * 3600
+
+# Artwork directory quota, enforced every ARTWORK_GC_INTERVAL seconds by
+# evicting the least recently served images (see ArtworkStore.collect)
+ARTWORK_MAX_BYTES = int(os.environ.get("ARTWORK_MAX_MB", "200")) * 1024 * 1024
+ARTWORK_MAX_FILES = int(os.environ.get("ARTWORK_MAX_FILES", "2000"))
+ARTWORK_GC_INTERVAL = 600
+# Longest side of stored artwork; larger images are scaled down at ingest.
+# Also the largest `?size=` variant /artwork will generate.
+ARTWORK_MAX_DIMENSION = int(os.environ.get("ARTWORK_MAX_DIMENSION", "1200"))
+ARTWORK_MIN_VARIANT = 16
+# Largest w/h of a raw pixel buffer (`?format=`): the art panel of a 4K display
+ARTWORK_RAW_MAX_DIMENSION = 2048
+
+# Outbound HTTP (lookups, artwork downloads): one keep-alive pool, see HttpClient
+HTTP_POOL_LIMIT = 32
+HTTP_POOL_PER_HOST = 4
+HTTP_KEEPALIVE = 60
+
+# go-librespot API for accurate Spotify track position
+GO_LIBRESPOT_HOST = os.environ.get("GO_LIBRESPOT_HOST", "127.0.0.1")
+GO_LIBRESPOT_PORT = int(os.environ.get("GO_LIBRESPOT_PORT", "24879"))
+
+
+# External hostname for artwork URLs sent to remote clients.
+# SNAPSERVER_HOST may be 127.0.0.1 (for local socket connections),
+# but artwork URLs must use a host reachable by clients on the network.
+def _detect_lan_ip() -> str | None:
+    """Kernel-route-based LAN IP detection — no network traffic emitted."""
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+        finally:
+            s.close()
+    except OSError:
+        return None
+
+
+def _resolve_external_host() -> str:
+    """Pick a usable EXTERNAL_HOST: explicit env > FQDN-if-non-loopback > kernel LAN IP > SNAPSERVER_HOST."""
+    explicit = os.environ.get("EXTERNAL_HOST", "")
+    if explicit:
+        return explicit
+    fqdn = socket.getfqdn()
+    try:
+        if fqdn and not ipaddress.ip_address(socket.gethostbyname(fqdn)).is_loopback:
+            return fqdn
+    except (socket.gaierror, ValueError):
+        pass
+    lan_ip = _detect_lan_ip()
+    if lan_ip and not ipaddress.ip_address(lan_ip).is_loopback:
+        return lan_ip
+    return SNAPSERVER_HOST
+
+
+# Lazy-evaluated to avoid blocking module import on slow DNS / reverse lookup
+# (observed: macOS dev hosts where socket.getfqdn() hangs ~30 s on stale
+# resolvers, blocking every pytest import). Resolution happens once on first
+# access; runtime Pi hosts hit LAN DNS so cost is sub-millisecond.
+_EXTERNAL_HOST: str | None = None
+
+
+def get_external_host() -> str:
+    global _EXTERNAL_HOST
+    if _EXTERNAL_HOST is None:
+        _EXTERNAL_HOST = _resolve_external_host()
+    return _EXTERNAL_HOST
+
+
+_POLL_LOOP_MAX_ERRORS = 30
+
+# Snapserver notification mode: hold a JSON-RPC connection open and apply
+# Stream.OnProperties / Client.OnVolumeChanged / Group.OnStreamChanged /
+# Server.OnUpdate to an in-memory copy of the server tree instead of pulling
+# the full Server.GetStatus payload every poll. A full GetStatus still runs
+# every SNAPSERVER_RESYNC_INTERVAL seconds to heal a missed notification.
+# SNAPSERVER_NOTIFICATIONS=0 restores plain polling.
+SNAPSERVER_NOTIFICATIONS = os.environ.get("SNAPSERVER_NOTIFICATIONS", "1") != "0"
+SNAPSERVER_RESYNC_INTERVAL = float(os.environ.get("SNAPSERVER_RESYNC_INTERVAL", "60"))
+# Subscribe, control and /status read the poll loop's server tree; only a
+# tree older than this (seconds) forces a Server.GetStatus of their own.
+SNAPSERVER_STATUS_MAX_AGE = float(os.environ.get("SNAPSERVER_STATUS_MAX_AGE", "5"))
+POLL_INTERVAL = 3.0
+# Anchored-elapsed mode: re-send the position only when it drifts further
+# than this from what clients extrapolate (seek, stall, buffering).
+ELAPSED_DRIFT_SEC = float(os.environ.get("ELAPSED_DRIFT_SEC", "2"))
+# A WebSocket client whose socket cannot take a message within this many
+# seconds is disconnected instead of holding up anyone else.
+WS_SEND_TIMEOUT = float(os.environ.get("WS_SEND_TIMEOUT", "10"))
+
+# Minimum seconds between requests to each rate-limited provider, see
+# RateScheduler. MusicBrainz allows 1 req/s per client; Wikidata asks for
+# restraint but publishes no hard limit.
+PROVIDER_INTERVALS = {"musicbrainz": 1.1, "wikidata": 0.5}
+
+# Priority classes for rate-limited lookups (lower is served first): what
+# the displays are waiting for, then tags, then the artist photo, then
+# anything done ahead of time.
+PRIORITY_ARTWORK = 0
+PRIORITY_TAGS = 1
+PRIORITY_ARTIST_IMAGE = 2
+PRIORITY_PREFETCH = 3
+
+# External metadata providers by host (a host matches its subdomains too),
+# each with its own circuit breaker. BREAKER_FAILURES consecutive outages
+# (timeout, connection error, 5xx/429) open it; lookups then fail fast until
+# a probe is let through after the cool-down, doubled per failed probe.
+PROVIDER_HOSTS = {
+    "musicbrainz.org": "musicbrainz",
+    "coverartarchive.org": "coverartarchive",
+    "archive.org": "coverartarchive",
+    "itunes.apple.com": "itunes",
+    "mzstatic.com": "itunes",
+    "radio-browser.info": "radio-browser",
+    "wikidata.org": "wikidata",
+    "wikimedia.org": "wikimedia",
+}
+BREAKER_FAILURES = 2
+BREAKER_COOLDOWN = 30.0
+BREAKER_MAX_COOLDOWN = 600.0
+
+# Lock for LookupCache's in-memory OrderedDict. enrich_artwork / enrich_tags run in
+# executor threads for every stream concurrently (poll_loop gathers one
+# _process_stream per stream), so _cache_set really is called from several
+# threads at once. OrderedDict's internal doubly-linked list pointers can be
+# corrupted by concurrent move_to_end / popitem, with crashes (KeyError) hard
+# to reproduce.
+_cache_lock = threading.Lock()
+
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger("metadata-service")
+
+
+class StreamMetadata:
+    """Metadata state for a single stream."""
+
+    def __init__(self, stream_id: str) -> None:
+        self.stream_id = stream_id
+        self.current: dict[str, Any] = {}
+        # Background enrichment (artwork, tags, artist image) for the track
+        # identified by enrich_key; enriched holds what has resolved so far
+        # and is re-applied to every poll of the same track.
+        self.enrich_key: tuple = ()
+        self.enriched: dict[str, Any] = {}
+        self.enrich_task: asyncio.Task | None = None
+        # Cancelled with enrich_task so its queued lookups are dropped
+        self.lookup_ticket: LookupTicket | None = None
+        # Providers that were down during enrich_task: it re-runs once one
+        # of them is worth probing again
+        self.deferred: set[str] = set()
+        # Position anchor for "anchored" subscribers: (elapsed, wall-clock
+        # time it was observed, rate). Only replaced on a discontinuity.
+        self.anchor: tuple[float, float, float] | None = None
+        # (track, art_key) of the last inline artwork received: plugins send
+        # artData only when the picture changes, later flushes lack it
+        self.inline_art: tuple[tuple, str] = ((), "")
+
+
+class SubscribedClient:
+    """A WebSocket client subscribed to a CLIENT_ID or directly to a stream name.
+
+    `anchored` clients opted into elapsed_mode "anchored": they get
+    `elapsed_at`/`rate` with each message and no elapsed-only updates.
+
+    Outbound messages go through `send()`, which only queues: each client
+    has its own writer task draining an outbox, so a slow socket delays
+    nobody else. A message queued under a `key` replaces a still unsent
+    message with the same key — a newer metadata frame supersedes an older
+    one instead of piling up behind it — so the outbox never holds more
+    than one message per key. A client whose socket stalls for
+    WS_SEND_TIMEOUT is dropped.
+    """
+
+    def __init__(
+        self,
+        websocket: Any,
+        client_id: str = "",
+        stream_id_direct: str = "",
+        anchored: bool = False,
+    ) -> None:
+        self.websocket = websocket
+        self.client_id = client_id
+        self.stream_id: str | None = stream_id_direct if stream_id_direct else None
+        self.is_stream_subscriber = bool(stream_id_direct)
+        self.anchored = anchored
+        # (percent, muted) carried by the last metadata message sent
+        self.volume_sent: tuple[int, bool] | None = None
+        self.closed = False
+        self._outbox: collections.OrderedDict[str, str] = collections.OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._writer: asyncio.Task | None = None
+
+    def send(self, message: str, key: str) -> bool:
+        """Queue `message` under `key` without waiting for the socket.
+
+        Returns False if the client is closed; the caller should stop
+        tracking it.
+        """
+        if self.closed:
+            return False
+        if key in self._outbox:
+            self._outbox[key] = message
+            return True
+        self._outbox[key] = message
+        if self._writer is None:
+            self._writer = asyncio.get_running_loop().create_task(self._drain())
+        self._wakeup.set()
+        return True
+
+    async def _drain(self) -> None:
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._outbox:
+                    _, message = self._outbox.popitem(last=False)
+                    await asyncio.wait_for(
+                        self.websocket.send(message), WS_SEND_TIMEOUT
+                    )
+        except asyncio.TimeoutError:
+            await _drop_client(self, f"send stalled for {WS_SEND_TIMEOUT:.0f}s")
+        except Exception as e:
+            await _drop_client(self, f"send failed: {e}")
+
+    def close(self) -> None:
+        """Stop the writer task and discard anything still queued."""
+        self.closed = True
+        self._outbox.clear()
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+
+class ClientRecord:
+    """One Snapcast client, flattened out of the server tree."""
+
+    __slots__ = (
+        "id",
+        "host_name",
+        "config_name",
+        "group_id",
+        "stream_id",
+        "volume",
+        "connected",
+    )
+
+    def __init__(self, client: dict, group: dict) -> None:
+        config = client.get("config", {})
+        self.id: str = client.get("id", "")
+        self.host_name: str = client.get("host", {}).get("name", "")
+        self.config_name: str = config.get("name", "")
+        self.group_id: str = group.get("id", "")
+        self.stream_id: str = group.get("stream_id", "")
+        self.volume: dict = config.get("volume", {"percent": 100, "muted": False})
+        self.connected = bool(client.get("connected", False))
+
+
+class ClientRegistry:
+    """Indexed view of a server tree's clients, built once per status update.
+
+    Every client is reachable by host name, config name and Snapcast id;
+    `lookup()` also accepts the `snapclient-<name>` alias snapclient uses
+    for its own id. When two clients share an identifier the first one in
+    tree order keeps it. Reverse indexes give a stream's or group's clients
+    without walking the tree.
+    """
+
+    def __init__(self, server: dict | None = None, version: int = 0) -> None:
+        # The tree this was built from, kept so its identity stays unique
+        self.server = server
+        self.version = version
+        self.clients: list[ClientRecord] = []
+        self.by_identifier: dict[str, ClientRecord] = {}
+        self.by_stream: dict[str, list[ClientRecord]] = {}
+        self.by_group: dict[str, list[ClientRecord]] = {}
+        for group in (server or {}).get("groups", []):
+            for client in group.get("clients", []):
+                record = ClientRecord(client, group)
+                self.clients.append(record)
+                for identifier in (record.host_name, record.config_name, record.id):
+                    if identifier:
+                        self.by_identifier.setdefault(identifier, record)
+                self.by_stream.setdefault(record.stream_id, []).append(record)
+                self.by_group.setdefault(record.group_id, []).append(record)
+
+    def lookup(self, client_id: str) -> ClientRecord | None:
+        # Exact match or `snapclient-`-prefix-stripped exact match. Substring
+        # matching here would mis-route "Sala" volume to "Sala Grande".
+        record = self.by_identifier.get(client_id) if client_id else None
+        if record is None and client_id.startswith("snapclient-"):
+            record = self.by_identifier.get(client_id[len("snapclient-") :])
+        return record
+
+    def volume(self, client_id: str) -> dict:
+        record = self.lookup(client_id)
+        return record.volume if record else {"percent": 100, "muted": False}
+
+    def stream_map(self) -> dict[str, str]:
+        """identifier → stream_id, the shape `_resolve_client_stream` reads."""
+        return {ident: rec.stream_id for ident, rec in self.by_identifier.items()}
+
+
+class ServerModel:
+    """In-memory copy of the Snapserver status tree, kept current by notifications.
+
+    Seeded from a full Server.GetStatus, then patched by `apply()` for each
+    JSON-RPC notification. Patches replace nested objects instead of mutating
+    them, so a reader holding a reference to an old stream/client dict never
+    sees a half-applied update.
+    """
+
+    def __init__(self) -> None:
+        self.server: dict | None = None
+        # Monotonic time of the last full Server.GetStatus seed
+        self.synced_at: float = 0.0
+        # True while the notification connection is up — a model that is not
+        # live may have missed notifications and must not be trusted.
+        self.live = False
+        # Bumped on every seed and applied patch; lets derived views (the
+        # client registry) rebuild once per change instead of per lookup.
+        self.version = 0
+
+    def reset(self, server: dict) -> None:
+        self.server = server
+        self.synced_at = time.monotonic()
+        self.version += 1
+
+    def invalidate(self) -> None:
+        self.live = False
+
+    def _find_stream(self, stream_id: str) -> int | None:
+        for i, stream in enumerate((self.server or {}).get("streams", [])):
+            if stream.get("id") == stream_id:
+                return i
+        return None
+
+    def _find_client(self, client_id: str) -> tuple[dict, int] | None:
+        for group in (self.server or {}).get("groups", []):
+            for i, client in enumerate(group.get("clients", [])):
+                if client.get("id") == client_id:
+                    return group, i
+        return None
+
+    def _find_group(self, group_id: str) -> int | None:
+        for i, group in enumerate((self.server or {}).get("groups", [])):
+            if group.get("id") == group_id:
+                return i
+        return None
+
+    def _patch_group(self, group_id: str, key: str, value: Any) -> bool:
+        i = self._find_group(group_id)
+        if i is None:
+            return False
+        groups = self.server["groups"]
+        groups[i] = {**groups[i], key: value}
+        return True
+
+    def _patch_client_config(self, client_id: str, key: str, value: Any) -> bool:
+        found = self._find_client(client_id)
+        if found is None:
+            return False
+        group, i = found
+        client = dict(group["clients"][i])
+        client["config"] = {**client.get("config", {}), key: value}
+        group["clients"][i] = client
+        return True
+
+    def apply(self, method: str, params: dict) -> bool:
+        """Apply one notification. Returns False when a full resync is needed.
+
+        Unknown notifications and references to objects the model has never
+        seen (a brand-new client, a stream added at runtime) cannot be
+        patched incrementally — the caller answers False with a GetStatus.
+        """
+        if not self._apply(method, params):
+            return False
+        self.version += 1
+        return True
+
+    def _apply(self, method: str, params: dict) -> bool:
+        if method == "Server.OnUpdate":
+            server = params.get("server")
+            if not isinstance(server, dict):
+                return False
+            self.reset(server)
+            return True
+        if self.server is None:
+            return False
+
+        if method == "Stream.OnProperties":
+            i = self._find_stream(params.get("id", ""))
+            if i is None:
+                return False
+            streams = self.server["streams"]
+            streams[i] = {**streams[i], "properties": params.get("properties", {})}
+            return True
+        if method == "Stream.OnUpdate":
+            stream = params.get("stream")
+            i = self._find_stream(params.get("id", ""))
+            if not isinstance(stream, dict) or i is None:
+                return False
+            self.server["streams"][i] = stream
+            return True
+        if method == "Client.OnVolumeChanged":
+            return self._patch_client_config(
+                params.get("id", ""), "volume", params.get("volume", {})
+            )
+        if method == "Client.OnNameChanged":
+            return self._patch_client_config(
+                params.get("id", ""), "name", params.get("name", "")
+            )
+        if method == "Client.OnLatencyChanged":
+            return self._patch_client_config(
+                params.get("id", ""), "latency", params.get("latency", 0)
+            )
+        if method in ("Client.OnConnect", "Client.OnDisconnect"):
+            client = params.get("client")
+            found = self._find_client(params.get("id", ""))
+            if not isinstance(client, dict) or found is None:
+                return False
+            group, i = found
+            group["clients"][i] = client
+            return True
+        if method == "Group.OnStreamChanged":
+            return self._patch_group(
+                params.get("id", ""), "stream_id", params.get("stream_id", "")
+            )
+        if method == "Group.OnMute":
+            return self._patch_group(
+                params.get("id", ""), "muted", bool(params.get("mute"))
+            )
+        if method == "Group.OnNameChanged":
+            return self._patch_group(
+                params.get("id", ""), "name", params.get("name", "")
+            )
+        return False
+
+
+class SnapcastRpcClient:
+    """Asyncio JSON-RPC client for Snapserver's TCP control port.
+
+    One persistent connection carries both request/response traffic and
+    server notifications. Every request gets its own id and future, so
+    concurrent callers (poll loop, volume commands, WebSocket subscribes)
+    share the socket without serializing on a lock; a background reader
+    task routes each line to the matching future or, for id-less messages,
+    to `on_notification`. Reconnects with exponential backoff and fails any
+    in-flight requests when the connection drops.
+    """
+
+    # Server.GetStatus on a large install is well past asyncio's 64 KiB
+    # default line limit.
+    STREAM_LIMIT = 16 * 1024 * 1024
+    # How long a request waits for a (re)connect before giving up
+    CONNECT_WAIT = 2.0
+    MAX_BACKOFF = 30.0
+    # A connection that lasted this long (s) was a real session: reconnect
+    # right away and start the backoff over. Shorter ones (snapserver
+    # starting up or shutting down) back off like a failed connect.
+    STABLE_SESSION = 5.0
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        on_notification: Callable[[str, dict], None] | None = None,
+        on_connection_change: Callable[[bool], None] | None = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.on_notification = on_notification
+        self.on_connection_change = on_connection_change
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._on_response: dict[int, Callable[[dict], None]] = {}
+        self._writer: asyncio.StreamWriter | None = None
+        self._connected = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._reconnect_now = False
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def start(self) -> None:
+        """Start the connection task (idempotent; needs a running loop)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def reconnect(self) -> None:
+        """Drop the current connection; `_run` reconnects immediately."""
+        if self._writer is not None:
+            self._reconnect_now = True
+            self._writer.close()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def request(
+        self,
+        method: str,
+        params: dict | None = None,
+        timeout: float = 10.0,
+        on_response: Callable[[dict], None] | None = None,
+    ) -> dict | None:
+        """Send one JSON-RPC request and await its response.
+
+        Returns the full response object (check "result"/"error"), or None
+        when Snapserver is unreachable or doesn't answer within `timeout`.
+        `on_response` runs inside the reader, before any later line is
+        dispatched — use it when the response must be applied in order
+        with the notifications that follow it.
+        """
+        self.start()
+        if not self._connected.is_set():
+            try:
+                await asyncio.wait_for(self._connected.wait(), self.CONNECT_WAIT)
+            except TimeoutError:
+                return None
+        writer = self._writer
+        if writer is None:
+            return None
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        if on_response is not None:
+            self._on_response[request_id] = on_response
+        request = {
+            "id": request_id,
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params or {},
+        }
+        try:
+            writer.write((json.dumps(request) + "\r\n").encode())
+            await writer.drain()
+            return await asyncio.wait_for(future, timeout)
+        except TimeoutError:
+            logger.warning(f"Snapserver {method} timed out after {timeout:.0f}s")
+            return None
+        except (ConnectionError, OSError) as e:
+            logger.warning(f"Snapserver {method} failed: {e}")
+            return None
+        finally:
+            self._pending.pop(request_id, None)
+            self._on_response.pop(request_id, None)
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        warned = False
+        while True:
+            writer = None
+            connected_at = None
+            try:
+                reader, writer = await asyncio.open_connection(
+                    self.host, self.port, limit=self.STREAM_LIMIT
+                )
+                self._writer = writer
+                self._connected.set()
+                connected_at = time.monotonic()
+                logger.info(f"Connected to Snapserver {self.host}:{self.port}")
+                warned = False
+                if self.on_connection_change:
+                    self.on_connection_change(True)
+                await self._read_loop(reader)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # One warning per outage, not one per reconnect attempt
+                if not warned:
+                    logger.warning(
+                        f"Snapserver {self.host}:{self.port} unavailable: {e}"
+                    )
+                    warned = True
+            finally:
+                was_connected = self._connected.is_set()
+                self._connected.clear()
+                self._writer = None
+                if writer is not None:
+                    writer.close()
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(
+                            ConnectionError("Snapserver connection lost")
+                        )
+                if was_connected and self.on_connection_change:
+                    self.on_connection_change(False)
+            reconnect_now, self._reconnect_now = self._reconnect_now, False
+            if connected_at is not None and (
+                reconnect_now or time.monotonic() - connected_at >= self.STABLE_SESSION
+            ):
+                # Dropped after a good session — retry right away once
+                backoff = 1.0
+                continue
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.MAX_BACKOFF)
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("connection closed by snapserver")
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                msg = json.loads(line.decode("utf-8", errors="replace"))
+            except json.JSONDecodeError as e:
+                logger.warning(f"Malformed JSON from Snapserver: {line[:100]!r}: {e}")
+                continue
+            if not isinstance(msg, dict):
+                continue
+            if "id" in msg:
+                future = self._pending.get(msg["id"])
+                if future is None or future.done():
+                    continue
+                callback = self._on_response.pop(msg["id"], None)
+                if callback is not None:
+                    try:
+                        callback(msg)
+                    except Exception as e:
+                        logger.warning(f"Response handler error: {e}")
+                future.set_result(msg)
+                continue
+            params = msg.get("params")
+            if self.on_notification and isinstance(params, dict):
+                try:
+                    self.on_notification(msg.get("method", ""), params)
+                except Exception as e:
+                    logger.warning(f"Notification handler error: {e}")
+
+
+class MpdCommandError(Exception):
+    """MPD answered a command with ACK."""
+
+
+# MPD before 0.22.4 rejects `binarylimit` at the head of a command list as
+# `ACK [5@0] {} unknown command "binarylimit"` (5: ACK_ERROR_UNKNOWN); newer
+# ones name it in braces if they refuse the value.
+_MPD_UNKNOWN_BINARYLIMIT = re.compile(
+    r'^ACK \[5@0\]|unknown command "binarylimit"|\{binarylimit\}'
+)
+
+
+class MpdSession:
+    """Persistent MPD protocol connection shared by metadata, artwork and control.
+
+    Blocking (callers run it in the executor). Each public call holds the
+    session's re-entrant lock for one full command/response exchange, so
+    threads interleave between commands, never inside one; hold `lock`
+    yourself to make a multi-command sequence atomic. A command that fails
+    on a reused socket (MPD drops clients idle past its connection_timeout)
+    is retried once on a fresh connection. Connection failures raise
+    OSError, ACK responses raise MpdCommandError.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        connect_timeout: float = 2.0,
+        timeout: float = 10.0,
+        binary_limit: int = MPD_BINARY_LIMIT,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.binary_limit = binary_limit
+        self.lock = threading.RLock()
+        self._sock: socket.socket | None = None
+        self._buffer = b""
+        # binarylimit in effect on the current connection (None: MPD's default)
+        self._negotiated_limit: int | None = None
+        self._binarylimit_supported = True
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def close(self) -> None:
+        with self.lock:
+            if self._sock is not None:
+                try:
+                    self._sock.close()
+                except OSError:
+                    pass
+            self._sock = None
+            self._buffer = b""
+            self._negotiated_limit = None
+
+    def _connect(self) -> None:
+        sock = socket.create_connection(
+            (self.host, self.port), timeout=self.connect_timeout
+        )
+        sock.settimeout(self.timeout)
+        self._sock = sock
+        self._buffer = b""
+        self._negotiated_limit = None
+        try:
+            greeting = self._readline()
+        except OSError:
+            self.close()
+            raise
+        if not greeting.startswith(b"OK MPD"):
+            self.close()
+            raise ConnectionError(f"unexpected MPD greeting: {greeting[:40]!r}")
+
+    def _readline(self) -> bytes:
+        assert self._sock is not None
+        while b"\n" not in self._buffer:
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("connection closed by MPD")
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line
+
+    def _read_exact(self, size: int) -> bytes:
+        assert self._sock is not None
+        while len(self._buffer) < size:
+            chunk = self._sock.recv(max(65536, size - len(self._buffer)))
+            if not chunk:
+                raise ConnectionError("connection closed by MPD")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _read_into(self, view: memoryview) -> None:
+        """Fill `view`: buffered bytes first, then straight from the socket."""
+        assert self._sock is not None
+        pos = min(len(self._buffer), len(view))
+        view[:pos] = self._buffer[:pos]
+        self._buffer = self._buffer[pos:]
+        while pos < len(view):
+            received = self._sock.recv_into(view[pos:])
+            if not received:
+                raise ConnectionError("connection closed by MPD")
+            pos += received
+
+    def _read_response(
+        self, end: bytes = b"OK", into: memoryview | None = None
+    ) -> tuple[dict[str, str], bytes | memoryview]:
+        """Read one response up to `end`. Returns (fields, binary payload).
+
+        A binary payload is received into `into` if given (and returned as
+        a slice of it), else into a buffer of its own.
+        """
+        fields: dict[str, str] = {}
+        binary: bytes | memoryview = b""
+        while True:
+            line = self._readline()
+            if line == end:
+                return fields, binary
+            if line.startswith(b"ACK"):
+                raise MpdCommandError(line.decode("utf-8", errors="replace"))
+            key, sep, value = line.decode("utf-8", errors="replace").partition(": ")
+            if not sep:
+                continue
+            if key == "binary":
+                if not value.isdigit():
+                    raise ConnectionError(f"malformed binary length: {value!r}")
+                size = int(value)
+                if into is None:
+                    binary = memoryview(bytearray(size))
+                elif size <= len(into):
+                    binary = into[:size]
+                else:
+                    raise ConnectionError(f"binary payload over {len(into)} bytes")
+                self._read_into(binary)
+                self._read_exact(1)  # trailing newline after the payload
+            else:
+                fields[key] = value
+
+    def _exchange(self, payload: bytes, read: Callable[[], Any]) -> Any:
+        with self.lock:
+            while True:
+                reused = self._sock is not None
+                if not reused:
+                    self._connect()
+                try:
+                    assert self._sock is not None
+                    self._sock.sendall(payload)
+                    return read()
+                except MpdCommandError:
+                    raise
+                except OSError:
+                    self.close()
+                    # Only a reused socket earns a retry — it may simply have
+                    # been closed by MPD while we weren't looking.
+                    if not reused:
+                        raise
+
+    def command(self, command: str) -> dict[str, str]:
+        """Run one command; returns its key/value fields."""
+        return self._exchange(
+            (command + "\n").encode(), lambda: self._read_response()[0]
+        )
+
+    def command_list(self, commands: list[str]) -> list[dict[str, str]]:
+        """Run several commands in one round trip (command_list_ok_begin)."""
+        payload = "command_list_ok_begin\n" + "".join(c + "\n" for c in commands)
+        payload += "command_list_end\n"
+
+        def read() -> list[dict[str, str]]:
+            results = [self._read_response(b"list_OK")[0] for _ in commands]
+            self._read_response()
+            return results
+
+        return self._exchange(payload.encode(), read)
+
+    def binary_command(
+        self, command: str, into: memoryview | None = None, limit: int | None = None
+    ) -> tuple[dict[str, str], bytes | memoryview]:
+        """Run a command with a binary response (readpicture, albumart).
+
+        MPD sends at most `limit` bytes (default `binary_limit`) per response;
+        a limit not yet in effect is set with `binarylimit` in the same round
+        trip. The payload is received into `into` when given.
+        """
+        limit = limit or self.binary_limit
+        with self.lock:
+            if not self._binarylimit_supported or limit == self._negotiated_limit:
+                return self._exchange(
+                    (command + "\n").encode(), lambda: self._read_response(into=into)
+                )
+            payload = (
+                f"command_list_ok_begin\nbinarylimit {limit}\n{command}\n"
+                "command_list_end\n"
+            )
+
+            def read() -> tuple[dict[str, str], bytes | memoryview]:
+                self._read_response(b"list_OK")
+                self._negotiated_limit = limit
+                result = self._read_response(b"list_OK", into)
+                self._read_response()
+                return result
+
+            try:
+                return self._exchange(payload.encode(), read)
+            except MpdCommandError as e:
+                if not _MPD_UNKNOWN_BINARYLIMIT.search(str(e)):
+                    raise
+                # MPD before 0.22.4 only sends its default 8 KiB chunks
+                logger.info("MPD does not support binarylimit; using its default")
+                self._binarylimit_supported = False
+            return self.binary_command(command, into, limit)
+
+    def entries_command(
+        self, command: str, starts: tuple[str, ...] = ("file", "directory", "playlist")
+    ) -> list[dict[str, str]]:
+        """Run a listing command (lsinfo, ...); one dict per entry.
+
+        A new entry begins at each key in `starts`.
+        """
+
+        def read() -> list[dict[str, str]]:
+            entries: list[dict[str, str]] = []
+            while True:
+                line = self._readline()
+                if line == b"OK":
+                    return entries
+                if line.startswith(b"ACK"):
+                    raise MpdCommandError(line.decode("utf-8", errors="replace"))
+                key, sep, value = line.decode("utf-8", errors="replace").partition(": ")
+                if not sep:
+                    continue
+                if key in starts or not entries:
+                    entries.append({})
+                entries[-1][key] = value
+
+        return self._exchange((command + "\n").encode(), read)
+
+
+def _mpd_quote(arg: str) -> str:
+    """Quote `arg` as one MPD command argument."""
+    return '"' + arg.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight block on its Future and get the same result (or exception).
+    Nothing is cached once the call finishes — caching stays with the
+    callee. Thread-based because the lookups it guards run in the executor.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, concurrent.futures.Future] = {}
+        # Number of calls answered by another caller's in-flight execution
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._calls[key] = future
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        future.set_result(result)
+        return result
+
+
+class LookupCancelled(Exception):
+    """A queued rate-limited request was dropped: its track is gone."""
+
+
+class LookupTicket:
+    """Identity of one enrichment job (one track on one stream).
+
+    Cancelling it (RateScheduler.cancel) drops every request it still has
+    queued, unless another live job is waiting on the same request.
+    """
+
+    __slots__ = ("cancelled", "unavailable")
+
+    def __init__(self) -> None:
+        self.cancelled = False
+        # Providers that were down while this job ran — see _enrich_stream
+        self.unavailable: set[str] = set()
+
+
+# (priority, ticket) of the lookup running in this thread; set per
+# enrichment stage by MetadataService._run_stage
+_lookup_context: contextvars.ContextVar[tuple[int, LookupTicket | None]] = (
+    contextvars.ContextVar("lookup_context", default=(PRIORITY_ARTWORK, None))
+)
+
+
+class _ScheduledRequest:
+    __slots__ = ("key", "fn", "args", "priority", "seq", "tickets", "future")
+
+    def __init__(
+        self, key: Hashable, fn: Callable, args: tuple, priority: int, seq: int
+    ) -> None:
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.priority = priority
+        self.seq = seq
+        self.tickets: list[LookupTicket | None] = []
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+
+    def abandoned(self) -> bool:
+        return all(t is not None and t.cancelled for t in self.tickets)
+
+
+class RateScheduler:
+    """Per-provider rate buckets serving queued requests by priority.
+
+    `call()` queues a request and blocks the calling (executor) thread until
+    a dispatcher thread — one per provider, started on first use — has run
+    it. Each provider runs at most one request per `intervals[provider]`
+    seconds, always the best queued (priority, arrival) next, so under rapid
+    skipping the budget goes to what is on screen. Identical queued
+    requests are merged (the best priority wins); requests whose tickets
+    were all cancelled are dropped with LookupCancelled.
+    """
+
+    def __init__(self, intervals: dict[str, float]) -> None:
+        self.intervals = dict(intervals)
+        self._cond = threading.Condition()
+        self._queues: dict[str, list[_ScheduledRequest]] = {
+            p: [] for p in self.intervals
+        }
+        self._pending: dict[tuple[str, Hashable], _ScheduledRequest] = {}
+        self._next_slot = dict.fromkeys(self.intervals, 0.0)
+        self._dispatchers: dict[str, threading.Thread] = {}
+        self._seq = itertools.count()
+        # Requests answered by an identical queued one / dropped on cancel
+        self.merged = 0
+        self.cancelled = 0
+
+    def call(
+        self,
+        provider: str,
+        key: Hashable,
+        fn: Callable[..., Any],
+        *args: Any,
+        priority: int | None = None,
+    ) -> Any:
+        """Run `fn(*args)` within `provider`'s rate limit; returns its result.
+
+        Priority and ticket come from the thread's lookup context;
+        `priority` can only lower it (e.g. a tag query inside the artwork
+        stage). Raises LookupCancelled if dropped.
+        """
+        context_priority, ticket = _lookup_context.get()
+        priority = max(context_priority, priority or 0)
+        if ticket is not None and ticket.cancelled:
+            raise LookupCancelled(key)
+        with self._cond:
+            request = self._pending.get((provider, key))
+            if request is None:
+                request = _ScheduledRequest(key, fn, args, priority, next(self._seq))
+                self._pending[(provider, key)] = request
+                self._queues[provider].append(request)
+                self._ensure_dispatcher(provider)
+            else:
+                self.merged += 1
+                request.priority = min(request.priority, priority)
+            request.tickets.append(ticket)
+            self._cond.notify_all()
+        return request.future.result()
+
+    def cancel(self, ticket: LookupTicket) -> None:
+        """Cancel `ticket`; its queued requests nobody else needs are dropped."""
+        with self._cond:
+            ticket.cancelled = True
+            for provider, queue in self._queues.items():
+                for request in [r for r in queue if r.abandoned()]:
+                    queue.remove(request)
+                    del self._pending[(provider, request.key)]
+                    request.future.set_exception(LookupCancelled(request.key))
+                    self.cancelled += 1
+
+    def queued(self) -> dict[str, int]:
+        with self._cond:
+            return {p: len(q) for p, q in self._queues.items()}
+
+    def _ensure_dispatcher(self, provider: str) -> None:
+        if provider not in self._dispatchers:
+            thread = threading.Thread(
+                target=self._dispatch,
+                args=(provider,),
+                name=f"ratelimit-{provider}",
+                daemon=True,
+            )
+            self._dispatchers[provider] = thread
+            thread.start()
+
+    def _dispatch(self, provider: str) -> None:
+        queue = self._queues[provider]
+        while True:
+            with self._cond:
+                while True:
+                    wait = self._next_slot[provider] - time.monotonic()
+                    if queue and wait <= 0:
+                        break
+                    # Released while waiting: callers queue and re-rank freely
+                    self._cond.wait(wait if queue else None)
+                request = min(queue, key=lambda r: (r.priority, r.seq))
+                queue.remove(request)
+                del self._pending[(provider, request.key)]
+                self._next_slot[provider] = time.monotonic() + self.intervals[provider]
+            try:
+                request.future.set_result(request.fn(*request.args))
+            except BaseException as e:
+                request.future.set_exception(e)
+
+
+class ProviderUnavailable(Exception):
+    """A provider's circuit breaker is open, or a request to it just failed.
+
+    Distinct from "not found": callers must not cache a negative answer.
+    """
+
+    def __init__(self, *providers: str) -> None:
+        super().__init__(", ".join(providers))
+        self.providers = providers
+
+
+def _is_outage(exc: BaseException) -> bool:
+    """Did `exc` fail to reach the provider (as opposed to a bad answer)?"""
+    if isinstance(exc, BlockedAddressError):
+        return False
+    if isinstance(exc, (TimeoutError, OSError)):
+        return True
+    status = getattr(exc, "status", None)
+    return isinstance(status, int) and (status >= 500 or status == 429)
+
+
+class CircuitBreaker:
+    """Health of one external provider: closed, open or half-open.
+
+    `threshold` consecutive outages open the breaker; while open, acquire()
+    refuses without touching the network. Once `retry_at` passes, the next
+    acquire() becomes the probe (half-open) and everyone else keeps being
+    refused until it reports: success closes the breaker, failure re-opens
+    it with the cool-down doubled, up to `max_cooldown`.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(
+        self,
+        name: str,
+        threshold: int = BREAKER_FAILURES,
+        cooldown: float = BREAKER_COOLDOWN,
+        max_cooldown: float = BREAKER_MAX_COOLDOWN,
+    ) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = cooldown
+        self.retry_at = 0.0
+        self.last_error = ""
+        self.trips = 0
+        self.short_circuited = 0
+
+    def ready(self) -> bool:
+        """Would acquire() let a request through now? Claims nothing."""
+        with self._lock:
+            return self.state == self.CLOSED or (
+                self.state == self.OPEN and time.monotonic() >= self.retry_at
+            )
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() >= self.retry_at:
+                self.state = self.HALF_OPEN
+                return True
+            self.short_circuited += 1
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Provider {self.name} is reachable again")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+
+    def release(self) -> None:
+        """Hand back an acquire() that never reached the provider.
+
+        A half-open probe that was abandoned before any request went out
+        proves nothing either way: the breaker goes back to open with the
+        cool-down already over, so the next acquire() probes again.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def failure(self, error: str) -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == self.HALF_OPEN:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            elif self.state == self.CLOSED and self.failures >= self.threshold:
+                self.trips += 1
+                logger.warning(
+                    f"Provider {self.name} unreachable ({error}), "
+                    f"skipping it for {self.cooldown:.0f}s"
+                )
+            else:
+                return
+            self.state = self.OPEN
+            self.retry_at = time.monotonic() + self.cooldown
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "retry_in": max(0.0, self.retry_at - time.monotonic())
+                if self.state == self.OPEN
+                else 0.0,
+                "last_error": self.last_error,
+                "trips": self.trips,
+                "short_circuited": self.short_circuited,
+            }
+
+
+class ProviderHealth:
+    """One CircuitBreaker per PROVIDER_HOSTS provider, looked up by URL."""
+
+    def __init__(self, hosts: dict[str, str]) -> None:
+        self.hosts = hosts
+        self.breakers = {name: CircuitBreaker(name) for name in hosts.values()}
+
+    def for_url(self, url: str) -> CircuitBreaker | None:
+        host = (urllib.parse.urlparse(url).hostname or "").lower()
+        while host:
+            name = self.hosts.get(host)
+            if name is not None:
+                return self.breakers[name]
+            host = host.partition(".")[2]
+        return None
+
+    def any_ready(self, names: Iterable[str]) -> bool:
+        return any(
+            self.breakers[name].ready() for name in names if name in self.breakers
+        )
+
+    def stats(self) -> dict[str, dict]:
+        return {name: b.stats() for name, b in sorted(self.breakers.items())}
+
+
+class AlbumLookupStats:
+    """MusicBrainz requests and time spent per album, for /status.
+
+    Every request is charged to the album it was made for; time is measured
+    around the scheduler call, so it includes the rate-limit wait. The most
+    recent `recent` albums are kept individually, totals cover the process.
+    """
+
+    def __init__(self, recent: int = 10) -> None:
+        self.recent = recent
+        self._lock = threading.Lock()
+        self._albums: collections.OrderedDict[str, list] = collections.OrderedDict()
+        self.albums = 0
+        self.requests = 0
+        self.seconds = 0.0
+
+    def record(self, album: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._albums.pop(album, None)
+            if entry is None:
+                entry = [0, 0.0]
+                self.albums += 1
+            entry[0] += 1
+            entry[1] += seconds
+            self._albums[album] = entry
+            while len(self._albums) > self.recent:
+                self._albums.popitem(last=False)
+            self.requests += 1
+            self.seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "albums": self.albums,
+                "requests": self.requests,
+                "seconds": self.seconds,
+                "recent": [
+                    {"album": album, "requests": n, "seconds": secs}
+                    for album, (n, secs) in reversed(self._albums.items())
+                ],
+            }
+
+
+class LookupStore:
+    """SQLite table of lookup results shared by every LookupCache.
+
+    One row per (namespace, key) with an absolute expiry, so "nothing found"
+    answers age out on their own schedule. The database is opened on first
+    use — nothing is bulk-loaded at startup — and trimmed back to
+    `max_entries` by least-recent use. A schema version mismatch drops the
+    table (it is only a cache). Any SQLite error disables the store for the
+    rest of the process; lookups then behave as plain in-memory caches.
+    """
+
+    SCHEMA_VERSION = 1
+    # Reads refresh `used_at` at most this often — LRU order needs no finer
+    # grain, and it keeps cache hits from turning into disk writes.
+    _TOUCH_INTERVAL = 3600
+    _TRIM_EVERY = 64
+
+    def __init__(self, path: Path, max_entries: int = LOOKUP_DB_MAX_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._disabled = False
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection | None:
+        if self._db is None and not self._disabled:
+            try:
+                db = sqlite3.connect(
+                    self.path, check_same_thread=False, isolation_level=None
+                )
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                (version,) = db.execute("PRAGMA user_version").fetchone()
+                if version != self.SCHEMA_VERSION:
+                    db.execute("DROP TABLE IF EXISTS lookups")
+                    db.execute(
+                        "CREATE TABLE lookups ("
+                        " ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                        " expires_at REAL NOT NULL, used_at REAL NOT NULL,"
+                        " PRIMARY KEY (ns, key)) WITHOUT ROWID"
+                    )
+                    db.execute("CREATE INDEX lookups_used_at ON lookups (used_at)")
+                    db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+                self._db = db
+            except sqlite3.Error as e:
+                self._disable(e)
+        return self._db
+
+    def _disable(self, error: Exception) -> None:
+        logger.warning(f"Lookup store {self.path} disabled: {error}")
+        self._disabled = True
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def get(self, ns: str, key: str) -> tuple[str, float] | None:
+        """(value, expires_at) for a live entry, else None."""
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return None
+            try:
+                row = db.execute(
+                    "SELECT value, expires_at, used_at FROM lookups"
+                    " WHERE ns = ? AND key = ?",
+                    (ns, key),
+                ).fetchone()
+                if row is None:
+                    return None
+                value, expires_at, used_at = row
+                if expires_at <= now:
+                    db.execute(
+                        "DELETE FROM lookups WHERE ns = ? AND key = ?", (ns, key)
+                    )
+                    return None
+                if now - used_at > self._TOUCH_INTERVAL:
+                    db.execute(
+                        "UPDATE lookups SET used_at = ? WHERE ns = ? AND key = ?",
+                        (now, ns, key),
+                    )
+                return value, expires_at
+            except sqlite3.Error as e:
+                self._disable(e)
+                return None
+
+    def put(self, ns: str, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO lookups VALUES (?, ?, ?, ?, ?)",
+                    (ns, key, value, expires_at, time.time()),
+                )
+                self._writes += 1
+                if self._writes % self._TRIM_EVERY == 0:
+                    self._trim(db)
+            except sqlite3.Error as e:
+                self._disable(e)
+
+    def delete(self, ns: str, key: str) -> None:
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                db.execute("DELETE FROM lookups WHERE ns = ? AND key = ?", (ns, key))
+            except sqlite3.Error as e:
+                self._disable(e)
+
+    def _trim(self, db: sqlite3.Connection) -> None:
+        db.execute("DELETE FROM lookups WHERE expires_at <= ?", (time.time(),))
+        (count,) = db.execute("SELECT COUNT(*) FROM lookups").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            db.execute(
+                "DELETE FROM lookups WHERE (ns, key) IN"
+                " (SELECT ns, key FROM lookups ORDER BY used_at LIMIT ?)",
+                (excess,),
+            )
+
+
+class LookupCache:
+    """Bounded in-memory LRU in front of one LookupStore namespace.
+
+    Supports the mapping operations the lookup code uses (`in`, `[]`,
+    `get`, `pop`, assignment); a memory miss reads through to the store.
+    Every entry expires: found results after `ttl` seconds, empty ones
+    (nothing found — "" or only separators) after `negative_ttl`. Memory
+    mutations hold _cache_lock; store I/O happens outside it.
+    """
+
+    def __init__(
+        self,
+        store: LookupStore | None,
+        namespace: str,
+        ttl: float = LOOKUP_TTL,
+        negative_ttl: float = LOOKUP_NEGATIVE_TTL,
+        limit: int = _MAX_CACHE_ENTRIES,
+    ) -> None:
+        self.store = store
+        self.namespace = namespace
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.limit = limit
+        # key → (value, expires_at wall time)
+        self._memory: collections.OrderedDict[str, tuple[str, float]] = (
+            collections.OrderedDict()
+        )
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        with _cache_lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.limit:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> str | None:
+        with _cache_lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > time.time():
+                    self._memory.move_to_end(key)
+                    return entry[0]
+                del self._memory[key]
+        if self.store is None:
+            return None
+        row = self.store.get(self.namespace, key)
+        if row is None:
+            return None
+        self._remember(key, *row)
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: float | None = None) -> None:
+        if ttl is None:
+            ttl = self.ttl if value.strip("|") else self.negative_ttl
+        expires_at = time.time() + ttl
+        self._remember(key, value, expires_at)
+        if self.store is not None:
+            self.store.put(self.namespace, key, value, expires_at)
+
+    def get(self, key: str, default: str | None = None) -> str | None:
+        value = self._lookup(key)
+        return default if value is None else value
+
+    def pop(self, key: str, default: str | None = None) -> str | None:
+        with _cache_lock:
+            entry = self._memory.pop(key, None)
+        if self.store is not None:
+            self.store.delete(self.namespace, key)
+        return default if entry is None else entry[0]
+
+    def __contains__(self, key: str) -> bool:
+        return self._lookup(key) is not None
+
+    def __getitem__(self, key: str) -> str:
+        value = self._lookup(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: str) -> None:
+        self.set(key, value)
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+
+def _encode_image(img: Any) -> tuple[bytes, str]:
+    """Encode a PIL image for storage: WebP if it has transparency, else JPEG."""
+    buf = io.BytesIO()
+    if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+        img.convert("RGBA").save(buf, "WEBP", quality=85)
+        return buf.getvalue(), ".webp"
+    img.convert("RGB").save(buf, "JPEG", quality=85, optimize=True)
+    return buf.getvalue(), ".jpg"
+
+
+def _encode_raw_pixels(img: Any, fmt: str) -> bytes:
+    """Pack a PIL image as framebuffer pixels: little-endian RGB565 or BGRA.
+
+    Bit-for-bit what fb-display's `_rgb_to_fb_native` produces, so the
+    client can copy the buffer into its mmap unchanged.
+    """
+    rgb = img.convert("RGB")
+    if fmt == "bgra":
+        return rgb.convert("RGBA").tobytes("raw", "BGRA")
+    # RGB565 as two 8-bit planes (Pillow has no 16-bit packer): the low
+    # byte is GGGBBBBB, the high byte RRRRRGGG; the OR'd bit fields never
+    # overlap, so a saturating add is exact
+    r, g, b = rgb.split()
+    low = ImageChops.add(g.point(lambda v: (v & 0x1C) << 3), b.point(lambda v: v >> 3))
+    high = ImageChops.add(r.point(lambda v: v & 0xF8), g.point(lambda v: v >> 5))
+    return Image.merge("LA", (low, high)).tobytes()
+
+
+# Side of the inline placeholder thumbnail (raw RGB, base64 in metadata)
+PLACEHOLDER_THUMB_SIZE = 8
+
+
+def _compute_placeholder(img: Any) -> dict:
+    """Dominant colours and a tiny thumbnail, painted before the art arrives.
+
+    `palette` is up to four colours by area, `color` the largest; `thumb`
+    is PLACEHOLDER_THUMB_SIZE² raw RGB bytes, base64 — a few hundred bytes
+    that upscale (smoothly) to a convincing blur of the cover.
+    """
+    img.draft("RGB", (64, 64))  # JPEG: decode at reduced scale
+    small = img.convert("RGB").resize((64, 64), Image.BOX)
+    quantized = small.quantize(colors=4, method=Image.Quantize.MEDIANCUT)
+    palette = quantized.getpalette() or []
+    colors = [
+        "#{:02x}{:02x}{:02x}".format(*palette[i * 3 : i * 3 + 3])
+        for _count, i in sorted(quantized.getcolors() or [], reverse=True)
+    ]
+    side = PLACEHOLDER_THUMB_SIZE
+    thumb = small.resize((side, side), Image.BOX).tobytes()
+    return {
+        "color": colors[0] if colors else "#000000",
+        "palette": colors,
+        "thumb": base64.b64encode(thumb).decode("ascii"),
+        "thumb_size": side,
+    }
+
+
+class ArtworkStore:
+    """Content-addressed artwork files with an in-memory source index.
+
+    Each image is written once as `artwork_<sha256><ext>`, whichever URL or
+    file it came from, so a name always means the same bytes and can be
+    served as immutable. `index` maps a source key (URL, `mpd:<path>`, a
+    caller's cache_key) to a blob name; `_sizes` holds every blob on disk,
+    scanned once at startup. A repeat lookup touches neither the network
+    nor the filesystem.
+
+    `collect()` keeps the directory within `max_bytes` / `max_files` by
+    evicting the least recently served blobs, each with its variants. Last use is tracked here, in
+    memory, and written back as the file's mtime (at most hourly per blob)
+    so the order survives a restart without relying on atime.
+
+    `variant()` produces downscaled copies under `variants/`, named
+    `<blob stem>-<size><ext>`, and `raw_variant()` framebuffer-native
+    pixel buffers named `<blob stem>-<w>x<h>-<format>[-zlib].bin`; both
+    count against the quota (sizes in `_variant_sizes`) and are deleted
+    with their blob.
+    The last few `?size=` variants asked for are remembered, so `warm()`
+    can make them for an image before any display requests it; raw buffers
+    are much larger and only made on request.
+    `placeholder()` returns the blob's inline placeholder, computed at
+    ingest and kept in `placeholders` (by blob name, as JSON).
+    """
+
+    NAME_PATTERN = re.compile(r"^artwork_([0-9a-f]{64})\.(?:jpg|png|gif|webp)$")
+    # Files of the pre-content-hash naming scheme, never served any more
+    LEGACY_PATTERN = re.compile(r"^artwork_[0-9a-f]{32}\.(?:jpg|png|gif|webp)$")
+    _VARIANT_PATTERN = re.compile(
+        r"^(artwork_[0-9a-f]{64})-([0-9a-z-]+)\.(?:jpg|webp|bin)$"
+    )
+    # Raw pixel formats → bytes per pixel
+    RAW_FORMATS = {"rgb565": 2, "bgra": 4}
+    _PERSIST_USE_AFTER = 3600
+    _WANTED_SIZES = 8
+
+    def __init__(
+        self,
+        directory: Path,
+        index: LookupCache,
+        max_bytes: int = ARTWORK_MAX_BYTES,
+        max_files: int = ARTWORK_MAX_FILES,
+        placeholders: LookupCache | None = None,
+    ) -> None:
+        self.directory = directory
+        self.index = index
+        self.placeholders = placeholders
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._sizes: dict[str, int] = {}
+        # Last served/stored (wall time) and the mtime last written to disk
+        self._last_used: dict[str, float] = {}
+        self._mtimes: dict[str, float] = {}
+        self._legacy: list[str] = []
+        self.variants_dir = directory / "variants"
+        # (blob stem, spec) → variant file name; "" = original already fits
+        self._variants: dict[tuple[str, str], str] = {}
+        # (blob stem, spec) → size of the variant file, for the quota
+        self._variant_sizes: dict[tuple[str, str], int] = {}
+        # Recently requested variant() sizes, for warm()
+        self._wanted: collections.OrderedDict[int, None] = collections.OrderedDict()
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.collected_at = 0.0
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if self.NAME_PATTERN.match(entry.name):
+                        st = entry.stat()
+                        self._sizes[entry.name] = st.st_size
+                        self._last_used[entry.name] = st.st_mtime
+                        self._mtimes[entry.name] = st.st_mtime
+                    elif self.LEGACY_PATTERN.match(entry.name):
+                        self._legacy.append(entry.name)
+        except OSError as e:
+            logger.warning(f"Cannot scan artwork directory {directory}: {e}")
+        stems = {name.rsplit(".", 1)[0] for name in self._sizes}
+        try:
+            self.variants_dir.mkdir(exist_ok=True)
+            with os.scandir(self.variants_dir) as entries:
+                for entry in entries:
+                    match = self._VARIANT_PATTERN.match(entry.name)
+                    if not match:
+                        continue
+                    if match.group(1) not in stems:
+                        # Its blob is gone; nothing would ever evict it
+                        self._unlink(f"variants/{entry.name}")
+                        continue
+                    self._variants[match.group(1, 2)] = entry.name
+                    self._variant_sizes[match.group(1, 2)] = entry.stat().st_size
+        except OSError as e:
+            logger.warning(f"Cannot scan artwork variants {self.variants_dir}: {e}")
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sizes
+
+    def touch(self, name: str) -> None:
+        """Record that `name` was just served."""
+        if name in self._sizes:
+            self._last_used[name] = time.time()
+
+    def contains(self, source: str) -> bool:
+        """Is `source` indexed to a stored blob? Unlike lookup(), not a use."""
+        name = self.index.get(source)
+        return bool(name) and name in self._sizes
+
+    def lookup(self, source: str) -> str:
+        """Blob name stored for `source`, or "" if unknown or gone."""
+        name = self.index.get(source)
+        if not name or name not in self._sizes:
+            return ""
+        self.touch(name)
+        return name
+
+    def put(self, source: str, data: bytes, ext: str) -> str:
+        """Store `data` (once per content) and index it under `source`.
+
+        Raises OSError if the blob cannot be written.
+        """
+        name = f"artwork_{hashlib.sha256(data).hexdigest()}{ext}"
+        # Under the lock so a concurrent collect() can't delete the file
+        # between the "already stored" check and the caller publishing it
+        with self._lock:
+            is_new = name not in self._sizes
+            if is_new:
+                path = self.directory / name
+                tmp_path = path.with_name(f"{name}.tmp")
+                try:
+                    with open(tmp_path, "wb") as f:
+                        f.write(data)
+                    tmp_path.rename(path)
+                except OSError:
+                    tmp_path.unlink(missing_ok=True)
+                    raise
+                self._sizes[name] = len(data)
+                self._mtimes[name] = time.time()
+            self._last_used[name] = time.time()
+        self.index.set(source, name)
+        if is_new and self.placeholders is not None:
+            self._store_placeholder(name, lambda: Image.open(io.BytesIO(data)))
+        return name
+
+    def put_file(self, source: str, tmp_path: Path, digest: str, ext: str) -> str:
+        """Like put(), for a file already written (and hashed) in `directory`.
+
+        The file is renamed into place, or removed if the blob exists.
+        """
+        name = f"artwork_{digest}{ext}"
+        with self._lock:
+            is_new = name not in self._sizes
+            if is_new:
+                path = self.directory / name
+                tmp_path.rename(path)
+                self._sizes[name] = path.stat().st_size
+                self._mtimes[name] = time.time()
+            else:
+                tmp_path.unlink(missing_ok=True)
+            self._last_used[name] = time.time()
+        self.index.set(source, name)
+        if is_new and self.placeholders is not None:
+            self._store_placeholder(name, lambda: Image.open(self.directory / name))
+        return name
+
+    def placeholder(self, name: str, compute: bool = True) -> dict | None:
+        """Inline placeholder for blob `name`; None without Pillow.
+
+        Blobs stored before placeholders existed (or whose entry expired)
+        get theirs computed here, from the file, unless `compute` is False.
+        Blocking.
+        """
+        if self.placeholders is None or name not in self._sizes:
+            return None
+        cached = self.placeholders.get(name)
+        if cached:
+            return json.loads(cached)
+        if not compute:
+            return None
+        return self._store_placeholder(name, lambda: Image.open(self.directory / name))
+
+    def _store_placeholder(self, name: str, open_image: Callable) -> dict | None:
+        if Image is None:
+            return None
+        try:
+            with open_image() as img:
+                placeholder = _compute_placeholder(img)
+        except Exception as e:
+            logger.debug(f"No placeholder for {name}: {e}")
+            return None
+        self.placeholders.set(name, json.dumps(placeholder))
+        return placeholder
+
+    def etag(self, name: str) -> str:
+        """Strong ETag for a blob: its content hash."""
+        match = self.NAME_PATTERN.match(name)
+        return f'"{match.group(1)}"' if match else ""
 
-# go-librespot API for accurate Spotify track position
-GO_LIBRESPOT_HOST = os.environ.get("GO_LIBRESPOT_HOST", "127.0.0.1")
-GO_LIBRESPOT_PORT = int(os.environ.get("GO_LIBRESPOT_PORT", "24879"))
+    def variant(self, name: str, size: int) -> Path | None:
+        """Path of blob `name` scaled to fit size×size, made on first request.
 
+        None when the original already fits (serve it as is) or Pillow is
+        missing. Blocking: call it from the executor.
+        """
+        if Image is None or name not in self._sizes:
+            return None
+        self._want(size)
+        key = (name.rsplit(".", 1)[0], str(size))
+        cached = self._variants.get(key)
+        if cached is not None:
+            return self.variants_dir / cached if cached else None
+        with Image.open(self.directory / name) as img:
+            if max(img.size) <= size:
+                self._variants[key] = ""
+                return None
+            img.thumbnail((size, size), Image.LANCZOS)
+            data, ext = _encode_image(img)
+        return self._write_variant(key, data, ext)
+
+    def raw_variant(
+        self, name: str, fmt: str, width: int, height: int, compress: bool = False
+    ) -> Path | None:
+        """Path of blob `name` as width×height raw `fmt` pixels, made once.
+
+        Scaled to exactly that size (as the display would), row-major with
+        no padding; `compress` stores it zlib-compressed. None if Pillow is
+        missing. Blocking: call it from the executor.
+        """
+        if Image is None or name not in self._sizes:
+            return None
+        spec = f"{width}x{height}-{fmt}" + ("-zlib" if compress else "")
+        key = (name.rsplit(".", 1)[0], spec)
+        cached = self._variants.get(key)
+        if cached:
+            return self.variants_dir / cached
+        with Image.open(self.directory / name) as img:
+            img = img.convert("RGB").resize((width, height), Image.LANCZOS)
+        data = _encode_raw_pixels(img, fmt)
+        if compress:
+            data = zlib.compress(data)
+        return self._write_variant(key, data, ".bin")
+
+    def _want(self, size: int) -> None:
+        with self._lock:
+            self._wanted.pop(size, None)
+            self._wanted[size] = None
+            while len(self._wanted) > self._WANTED_SIZES:
+                self._wanted.popitem(last=False)
+
+    def warm(self, name: str) -> None:
+        """Make the scaled variants displays asked for lately, for blob `name`.
+
+        Blocking: call it from the executor.
+        """
+        with self._lock:
+            wanted = list(self._wanted)
+        for size in wanted:
+            try:
+                self.variant(name, size)
+            except Exception as e:
+                logger.debug(f"Cannot make {size}px variant of {name}: {e}")
 
-# External hostname for artwork URLs sent to remote clients.
-# SNAPSERVER_HOST may be 127.0.0.1 (for local socket connections),
-# but artwork URLs must use a host reachable by clients on the network.
-def _detect_lan_ip() -> str | None:
-    """Kernel-route-based LAN IP detection — no network traffic emitted."""
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    def _write_variant(self, key: tuple[str, str], data: bytes, ext: str) -> Path:
+        variant_name = f"{key[0]}-{key[1]}{ext}"
+        path = self.variants_dir / variant_name
+        tmp_path = path.with_name(f"{variant_name}.tmp")
         try:
-            s.connect(("8.8.8.8", 80))
-            return s.getsockname()[0]
-        finally:
-            s.close()
-    except OSError:
-        return None
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            tmp_path.rename(path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self._variants[key] = variant_name
+            self._variant_sizes[key] = len(data)
+        return path
+
+    def collect(self, protected: set[str]) -> dict:
+        """Evict least recently used blobs until within quota; returns stats.
+
+        Names in `protected` (artwork currently published) are never
+        evicted, even if that leaves the directory over quota.
+        """
+        with self._lock:
+            for name in self._legacy:
+                self._unlink(name)
+            self._legacy.clear()
+            total = sum(self._sizes.values()) + sum(self._variant_sizes.values())
+            files = len(self._sizes) + len(self._variant_sizes)
+            for name in sorted(self._sizes, key=self._last_used.__getitem__):
+                if total <= self.max_bytes and files <= self.max_files:
+                    break
+                if name in protected:
+                    continue
+                size = self._sizes.pop(name)
+                del self._last_used[name], self._mtimes[name]
+                self._unlink(name)
+                removed = 1
+                stem = name.rsplit(".", 1)[0]
+                for key in [k for k in self._variants if k[0] == stem]:
+                    variant_name = self._variants.pop(key)
+                    if variant_name:
+                        self._unlink(f"variants/{variant_name}")
+                        size += self._variant_sizes.pop(key, 0)
+                        removed += 1
+                total -= size
+                files -= removed
+                self.evicted_files += removed
+                self.evicted_bytes += size
+            stale = [
+                (name, self._last_used[name])
+                for name, mtime in self._mtimes.items()
+                if self._last_used[name] - mtime > self._PERSIST_USE_AFTER
+            ]
+        for name, used in stale:
+            try:
+                os.utime(self.directory / name, (used, used))
+                self._mtimes[name] = used
+            except OSError:
+                pass
+        self.collected_at = time.time()
+        return self.stats()
 
+    def _unlink(self, name: str) -> None:
+        try:
+            (self.directory / name).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Cannot remove artwork {name}: {e}")
 
-def _resolve_external_host() -> str:
-    """Pick a usable EXTERNAL_HOST: explicit env > FQDN-if-non-loopback > kernel LAN IP > SNAPSERVER_HOST."""
-    explicit = os.environ.get("EXTERNAL_HOST", "")
-    if explicit:
-        return explicit
-    fqdn = socket.getfqdn()
-    try:
-        if fqdn and not ipaddress.ip_address(socket.gethostbyname(fqdn)).is_loopback:
-            return fqdn
-    except (socket.gaierror, ValueError):
-        pass
-    lan_ip = _detect_lan_ip()
-    if lan_ip and not ipaddress.ip_address(lan_ip).is_loopback:
-        return lan_ip
-    return SNAPSERVER_HOST
+    def stats(self) -> dict:
+        with self._lock:
+            files = len(self._sizes) + len(self._variant_sizes)
+            size = sum(self._sizes.values()) + sum(self._variant_sizes.values())
+        return {
+            "files": files,
+            "bytes": size,
+            "max_files": self.max_files,
+            "max_bytes": self.max_bytes,
+            "evicted_files": self.evicted_files,
+            "evicted_bytes": self.evicted_bytes,
+            "collected_at": self.collected_at,
+        }
 
 
-# Lazy-evaluated to avoid blocking module import on slow DNS / reverse lookup
-# (observed: macOS dev hosts where socket.getfqdn() hangs ~30 s on stale
-# resolvers, blocking every pytest import). Resolution happens once on first
-# access; runtime Pi hosts hit LAN DNS so cost is sub-millisecond.
-_EXTERNAL_HOST: str | None = None
+class CrawlProgress:
+    """Resumable position of the MPD library artwork crawl.
 
+    Directories are visited in sorted pre-order, so the last one finished
+    (`cursor`, as path components) says everything before it is done. The
+    cursor is saved to `path` every SAVE_EVERY directories; a finished pass
+    clears it and records the MPD database version (`db_update`) it covered.
+    """
 
-def get_external_host() -> str:
-    global _EXTERNAL_HOST
-    if _EXTERNAL_HOST is None:
-        _EXTERNAL_HOST = _resolve_external_host()
-    return _EXTERNAL_HOST
+    SAVE_EVERY = 25
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.cursor: tuple[str, ...] | None = None
+        self.pass_db_update = ""
+        self.db_update = ""
+        self.state = "starting"
+        self.current = ""
+        self.scanned = 0
+        self.stored = 0
+        self.finished_at = 0.0
+        try:
+            saved = json.loads(path.read_text())
+            if saved.get("cursor") is not None:
+                self.cursor = tuple(saved["cursor"])
+            self.pass_db_update = str(saved.get("pass_db_update", ""))
+            self.db_update = str(saved.get("db_update", ""))
+            self.finished_at = float(saved.get("finished_at", 0.0))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable {path.name}: {e}")
+
+    def done(self, parts: tuple[str, ...]) -> bool:
+        """Was directory `parts` finished (or is it an ancestor of the cursor)?"""
+        return self.cursor is not None and parts <= self.cursor
+
+    def holds_cursor(self, parts: tuple[str, ...]) -> bool:
+        return self.cursor is not None and self.cursor[: len(parts)] == parts
+
+    def begin(self, db_update: str) -> None:
+        if self.cursor is None:
+            self.pass_db_update = db_update
+            self.scanned = self.stored = 0
+
+    def advance(self, parts: tuple[str, ...], stored: bool) -> None:
+        self.cursor = parts
+        self.scanned += 1
+        self.stored += stored
+        if self.scanned % self.SAVE_EVERY == 0:
+            self.save()
+
+    def finish(self) -> None:
+        self.cursor = None
+        self.db_update = self.pass_db_update
+        self.finished_at = time.time()
+        self.state = "complete"
+        self.current = ""
+        self.save()
+
+    def save(self) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            tmp_path.write_text(
+                json.dumps(
+                    {
+                        "cursor": self.cursor,
+                        "pass_db_update": self.pass_db_update,
+                        "db_update": self.db_update,
+                        "finished_at": self.finished_at,
+                    }
+                )
+            )
+            tmp_path.rename(self.path)
+        except OSError as e:
+            logger.warning(f"Cannot save library crawl progress: {e}")
 
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "current": self.current,
+            "scanned": self.scanned,
+            "stored": self.stored,
+            "finished_at": self.finished_at,
+        }
 
-_POLL_LOOP_MAX_ERRORS = 30
 
-# MusicBrainz rate limiter (1 request per 1.1 seconds, shared across threads)
-_mb_last_request: float = 0.0
-_mb_lock = threading.Lock()
-
-# Defensive lock for OrderedDict cache mutations. Today the only caller of
-# _cache_set is enrich_artwork / enrich_tags, both run SERIALLY by the poll
-# loop via `await loop.run_in_executor(...)` (no asyncio.gather, no
-# create_task on cache writers). So in current code there's no concurrent
-# write — the lock is cheap insurance against future code paths that might
-# parallelise enrich (e.g. asyncio.gather across streams). OrderedDict's
-# internal doubly-linked list pointers can be corrupted by concurrent
-# move_to_end / popitem, with crashes (KeyError) hard to reproduce.
-_cache_lock = threading.Lock()
+class BlockedAddressError(OSError):
+    """An artwork URL resolved to an address we refuse to connect to."""
+
+
+def _is_restricted_ip(addr: str, trusted: set[str]) -> bool:
+    """Private/loopback/link-local/multicast/reserved and not one of ours."""
+    ip = ipaddress.ip_address(addr.split("%", 1)[0])
+    restricted = (
+        ip.is_private
+        or ip.is_loopback
+        or ip.is_link_local
+        or ip.is_multicast
+        or ip.is_reserved
+    )
+    return restricted and addr not in trusted
 
 
-def _mb_rate_limit() -> None:
-    """Enforce MusicBrainz 1 req/s rate limit, sleeping only the remaining time.
+class _GuardedResolver:
+    """aiohttp resolver that refuses hosts resolving to restricted addresses.
 
-    Lock is released BEFORE sleep so concurrent threads don't queue on the
-    lock during the 1.1s window — they each reserve their slot atomically
-    via the timestamp update, then sleep independently. This keeps the
-    thread pool free for non-MusicBrainz tasks (HTTP /status, file I/O)
-    even when several artwork lookups land in MusicBrainz at once.
+    The connector connects to exactly the addresses returned here, so the
+    check and the connection use the same lookup — no DNS-rebinding window,
+    for HTTPS too (TLS still verifies the original hostname).
     """
-    global _mb_last_request
-    with _mb_lock:
-        now = time.monotonic()
-        wait = 1.1 - (now - _mb_last_request)
-        # Reserve the slot atomically: even if we sleep outside the lock,
-        # the next thread's `now - _mb_last_request` already accounts for
-        # our sleep window via this forward-dated timestamp.
-        if wait > 0:
-            _mb_last_request = now + wait
-        else:
-            _mb_last_request = now
-            wait = 0.0
-    # Sleep OUTSIDE the lock — other waiters can compute their slot.
-    if wait > 0:
-        time.sleep(wait)
 
+    def __init__(self, trusted: set[str]) -> None:
+        self.trusted = trusted
+        self._resolver = aiohttp.ThreadedResolver()
+
+    async def resolve(
+        self, host: str, port: int = 0, family: int = socket.AF_INET
+    ) -> list:
+        results = await self._resolver.resolve(host, port, family)
+        for result in results:
+            if _is_restricted_ip(result["host"], self.trusted):
+                raise BlockedAddressError(
+                    f"{host} resolves to restricted IP {result['host']}"
+                )
+        return results
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
-logger = logging.getLogger("metadata-service")
+    async def close(self) -> None:
+        await self._resolver.close()
 
 
-class StreamMetadata:
-    """Metadata state for a single stream."""
+class HttpClient:
+    """Long-lived, connection-pooled aiohttp client for all outbound HTTP.
 
-    def __init__(self, stream_id: str) -> None:
-        self.stream_id = stream_id
-        self.current: dict[str, Any] = {}
+    Replaces a urlopen (fresh TCP + TLS handshake) per MusicBrainz, iTunes,
+    Wikidata, radio-browser, Cover Art Archive or go-librespot call with
+    keep-alive connections, at most HTTP_POOL_PER_HOST per host. Two pools:
+    one for APIs and local services, and a guarded one for artwork URLs
+    (arbitrary hosts — SSRF protection in `_GuardedResolver`, redirects
+    followed by hand so each hop is checked).
 
+    Sessions are created lazily on `loop`. The lookup chain runs in
+    executor threads, so it uses the blocking wrappers (`get_json_sync`,
+    `download_sync`): the request runs on the loop while the thread waits.
+    """
 
-class SubscribedClient:
-    """A WebSocket client subscribed to a CLIENT_ID or directly to a stream name."""
+    _MAX_REDIRECTS = 5
+    _REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+
+    def __init__(self, user_agent: str, trusted_ips: set[str]) -> None:
+        self.user_agent = user_agent
+        self.trusted_ips = trusted_ips
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._session: Any = None
+        self._guarded_session: Any = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+
+    def _new_session(self, resolver: Any = None) -> Any:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE,
+            resolver=resolver,
+        )
+        return aiohttp.ClientSession(
+            connector=connector, headers={"User-Agent": self.user_agent}
+        )
 
-    def __init__(
-        self, websocket: Any, client_id: str = "", stream_id_direct: str = ""
-    ) -> None:
-        self.websocket = websocket
-        self.client_id = client_id
-        self.stream_id: str | None = stream_id_direct if stream_id_direct else None
-        self.is_stream_subscriber = bool(stream_id_direct)
+    def session(self) -> Any:
+        if self._session is None:
+            self._session = self._new_session()
+        return self._session
+
+    def guarded_session(self) -> Any:
+        if self._guarded_session is None:
+            self._guarded_session = self._new_session(
+                _GuardedResolver(self.trusted_ips)
+            )
+        return self._guarded_session
+
+    async def close(self) -> None:
+        for session in (self._session, self._guarded_session):
+            if session is not None:
+                await session.close()
+        self._session = self._guarded_session = None
+
+    async def get_json(self, url: str, timeout: float = 5) -> Any:
+        """GET `url` and decode JSON; raises on HTTP or network errors."""
+        async with self.session().get(
+            url, timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as resp:
+            resp.raise_for_status()
+            return await resp.json(content_type=None)
+
+    async def download(
+        self, url: str, directory: Path, max_bytes: int, timeout: float = 15
+    ) -> tuple[Path, str, int]:
+        """Stream `url` into a temp file in `directory`, hashing as it goes.
+
+        Returns (temp path, sha256 hex, size); the caller renames or removes
+        the file. Raises BlockedAddressError for restricted hosts and
+        ValueError for bad schemes, statuses, empty or oversized bodies.
+        """
+        session = self.guarded_session()
+        client_timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=5)
+        for _hop in range(self._MAX_REDIRECTS + 1):
+            parsed = urllib.parse.urlparse(url)
+            if parsed.scheme not in ("http", "https"):
+                raise ValueError(f"unsupported scheme: {parsed.scheme}")
+            # IP literals never reach the resolver — check them here
+            try:
+                literal = ipaddress.ip_address(parsed.hostname or "")
+            except ValueError:
+                literal = None
+            if literal is not None and _is_restricted_ip(
+                str(literal), self.trusted_ips
+            ):
+                raise BlockedAddressError(f"restricted IP {literal}")
+            try:
+                async with session.get(
+                    url, allow_redirects=False, timeout=client_timeout
+                ) as resp:
+                    if resp.status in self._REDIRECT_STATUSES:
+                        location = resp.headers.get("Location", "")
+                        url = urllib.parse.urljoin(url, location)
+                        continue
+                    if resp.status != 200:
+                        raise ValueError(f"HTTP {resp.status}")
+                    return await self._stream_to_file(resp, directory, max_bytes)
+            except aiohttp.ClientConnectorError as e:
+                # The resolver's refusal arrives wrapped as a DNS error
+                if isinstance(e.os_error, BlockedAddressError):
+                    raise e.os_error from None
+                raise
+        raise ValueError("too many redirects")
+
+    @staticmethod
+    async def _stream_to_file(
+        resp: Any, directory: Path, max_bytes: int
+    ) -> tuple[Path, str, int]:
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(
+            dir=directory, prefix="download_", suffix=".tmp"
+        )
+        tmp_path = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in resp.content.iter_chunked(65536):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"exceeded size limit ({max_bytes} bytes)")
+                    digest.update(chunk)
+                    f.write(chunk)
+            if not size:
+                raise ValueError("empty body")
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return tmp_path, digest.hexdigest(), size
+
+    def _run(self, coro_fn: Callable[..., Any], *args: Any, timeout: float) -> Any:
+        """Run `coro_fn(*args)` on the client's loop from a worker thread."""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            raise RuntimeError("HTTP client has no running event loop")
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            raise RuntimeError("blocking HTTP call from the event loop thread")
+        future = asyncio.run_coroutine_threadsafe(coro_fn(*args), loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def get_json_sync(self, url: str, timeout: float = 5) -> Any:
+        return self._run(self.get_json, url, timeout, timeout=timeout + 1)
+
+    def download_sync(
+        self, url: str, directory: Path, max_bytes: int, timeout: float = 15
+    ) -> tuple[Path, str, int]:
+        return self._run(
+            self.download, url, directory, max_bytes, timeout, timeout=timeout + 1
+        )
 
 
 # Global state
@@ -175,6 +2268,19 @@ ws_clients_lock = asyncio.Lock()  # CRITICAL: Protect concurrent access
 _service: "MetadataService | None" = None
 
 
+async def _drop_client(sc: SubscribedClient, reason: str) -> None:
+    """Disconnect a client its own writer gave up on."""
+    name = sc.client_id or sc.stream_id
+    logger.warning(f"Dropping WebSocket client '{name}': {reason}")
+    sc.close()
+    async with ws_clients_lock:
+        ws_clients.discard(sc)
+    try:
+        await asyncio.wait_for(sc.websocket.close(), WS_SEND_TIMEOUT)
+    except Exception:
+        pass
+
+
 class MetadataService:
     """Centralized metadata service for all Snapcast streams."""
 
@@ -183,8 +2289,26 @@ class MetadataService:
         self.snapserver_port = SNAPSERVER_RPC_PORT
         self.mpd_host = MPD_HOST
         self.mpd_port = MPD_PORT
+        # One long-lived MPD connection for metadata, artwork and control;
+        # change notifications come from a separate idle connection
+        # (mpd_idle_loop).
+        self.mpd = MpdSession(self.mpd_host, self.mpd_port)
+        # Deduplicates concurrent artwork/tag lookups across streams
+        self._flight = SingleFlight()
+        self._mpd_idle_task: asyncio.Task | None = None
+        # Background warm-up of the upcoming MPD queue (see _start_prefetch)
+        self._prefetch_task: asyncio.Task | None = None
+        self._prefetch_ticket: LookupTicket | None = None
+        self._artwork_gc_task: asyncio.Task | None = None
+        self._artwork_crawl_task: asyncio.Task | None = None
         self.artwork_dir = ARTWORK_DIR
         self.artwork_dir.mkdir(parents=True, exist_ok=True)
+        # MPD library artwork crawl (MPD_ARTWORK_CRAWL), None when disabled
+        self.crawl = (
+            CrawlProgress(self.artwork_dir / "library_crawl.json")
+            if MPD_ARTWORK_CRAWL
+            else None
+        )
 
         # Liveness signal for the /health endpoint. Bumped on every successful
         # poll_loop iteration. Allows /health to report "stale" when the
@@ -194,24 +2318,30 @@ class MetadataService:
 
         # Per-stream metadata state
         self.streams: dict[str, StreamMetadata] = {}
-
-        # Caches (shared across all streams — same album art doesn't need re-fetch)
-        # Bounded to _MAX_CACHE_ENTRIES to prevent unbounded memory growth
-        self.artwork_cache: collections.OrderedDict[str, str] = (
-            collections.OrderedDict()
-        )
-        self.artist_image_cache: collections.OrderedDict[str, str] = (
-            collections.OrderedDict()
-        )
-        self._failed_downloads: collections.OrderedDict[str, None] = (
-            collections.OrderedDict()
-        )
-        self._release_meta_cache: collections.OrderedDict[str, str] = (
-            collections.OrderedDict()
+        # Server tree of the latest poll — background publishers use it for
+        # per-client volume instead of the tree their poll started with
+        self._last_server: dict = {}
+
+        # Caches (shared across all streams — same album art doesn't need re-fetch).
+        # In memory bounded to _MAX_CACHE_ENTRIES each, persisted in LOOKUP_DB
+        # so they survive restarts.
+        self.lookup_store = LookupStore(LOOKUP_DB)
+        self.artwork_cache = LookupCache(self.lookup_store, "artwork")
+        self.artist_image_cache = LookupCache(self.lookup_store, "artist_image")
+        self._failed_downloads = LookupCache(self.lookup_store, "failed_download")
+        self._release_meta_cache = LookupCache(self.lookup_store, "release_meta")
+        self._release_group_cache = LookupCache(self.lookup_store, "release_group")
+        # MPD album source → signature of the embedded picture it came from
+        self._mpd_album_signatures = LookupCache(self.lookup_store, "mpd_album_art")
+        # Source → blob index sized to hold a household's working set in memory
+        self.artwork_store = ArtworkStore(
+            self.artwork_dir,
+            LookupCache(self.lookup_store, "artwork_blob", limit=4096),
+            placeholders=LookupCache(
+                self.lookup_store, "artwork_placeholder", limit=512
+            ),
         )
 
-        self._cache_limit = _MAX_CACHE_ENTRIES
-
         # Trusted IPs: local interfaces + snapserver — artwork from these is allowed
         # even though they're private IPs (SSRF exemption for co-located services)
         self._trusted_ips: set[str] = {"127.0.0.1", "::1"}
@@ -233,12 +2363,14 @@ class MetadataService:
             logger.warning("Could not get hostname IPs for trusted list: %s", e)
         logger.info(f"Trusted IPs for artwork: {self._trusted_ips}")
 
-        # Snapserver persistent socket
-        self._snap_sock: socket.socket | None = None
-        self._snap_buffer: bytes = b""
-        self._snap_lock = threading.Lock()
-        self._last_snap_response: float = 0.0
-        self._snap_stale_threshold: float = 30.0
+        # Snapserver control connection — shared by every caller, one
+        # request id per call (see SnapcastRpcClient)
+        self.rpc = SnapcastRpcClient(
+            self.snapserver_host,
+            self.snapserver_port,
+            on_notification=self._on_snap_notification,
+            on_connection_change=self._on_snap_connection,
+        )
 
         self._mpd_was_connected = False
         self._mpd_last_fail: float = 0.0
@@ -246,10 +2378,29 @@ class MetadataService:
         self._mpd_last_retry_log: float = 0.0
         self._mpd_retry_log_interval: float = 30.0  # log retry attempts every 30s
         self.user_agent = "snapMULTI-MetadataService/1.0"
+        # Pooled outbound HTTP; bound to the event loop in main()
+        self.http = HttpClient(self.user_agent, self._trusted_ips)
+        # MusicBrainz / Wikidata budget, shared by every stream's lookups
+        self.scheduler = RateScheduler(PROVIDER_INTERVALS)
+        self.providers = ProviderHealth(PROVIDER_HOSTS)
+        self.mb_stats = AlbumLookupStats()
         self._server_version = os.environ.get("SNAPMULTI_VERSION", "unknown")
 
         # Client → stream mapping cache (refreshed each poll cycle)
         self._client_stream_map: dict[str, str] = {}
+        # Indexed clients of the latest server tree (see _client_registry)
+        self._registry = ClientRegistry()
+
+        # The one server tree every consumer reads: seeded by each
+        # Server.GetStatus, kept live by notifications (SNAPSERVER_NOTIFICATIONS).
+        # _state_changed wakes the poll loop as soon as a notification lands
+        # instead of waiting for the next POLL_INTERVAL tick.
+        self.server_model = ServerModel()
+        self._state_changed = asyncio.Event()
+        self._resync_needed = asyncio.Event()
+        self._event_task: asyncio.Task | None = None
+        # In-flight Server.GetStatus shared by concurrent stale readers
+        self._status_refresh: asyncio.Future | None = None
 
         # Track elapsed timers for sources without native position reporting
         # {stream_id: {"key": "title|artist", "start": monotonic,
@@ -271,33 +2422,36 @@ class MetadataService:
 
     @staticmethod
     def _cache_set(
-        cache: collections.OrderedDict,
-        key: str,
-        value: str,
-        limit: int = _MAX_CACHE_ENTRIES,
+        cache: LookupCache, key: str, value: str, ttl: float | None = None
     ) -> None:
-        """Set a cache entry, evicting oldest if at capacity. Thread-safe."""
-        with _cache_lock:
-            cache[key] = value
-            cache.move_to_end(key)
-            while len(cache) > limit:
-                cache.popitem(last=False)
+        """Set a cache entry in memory and the lookup store. Thread-safe.
+
+        `ttl` defaults to the cache's positive or negative TTL by value.
+        """
+        cache.set(key, value, ttl)
 
     def _mark_failed(self, url: str) -> None:
-        """Record a failed download URL, bounded to _MAX_CACHE_ENTRIES."""
-        with _cache_lock:
-            self._failed_downloads[url] = None
-            self._failed_downloads.move_to_end(url)
-            while len(self._failed_downloads) > self._cache_limit:
-                self._failed_downloads.popitem(last=False)
+        """Record a failed download URL; retried after LOOKUP_NEGATIVE_TTL."""
+        self._cache_set(self._failed_downloads, url, "")
 
     @staticmethod
-    def _release_meta_cache_value(date: str, original_date: str, genre: str) -> str:
+    def _release_meta_cache_value(
+        date: str,
+        original_date: str,
+        genre: str,
+        release_group: str | None = None,
+        release: str | None = None,
+    ) -> str:
         """Serialize release metadata for cache storage.
 
         Format is pipe-delimited for compactness and backward-compatible parsing.
+        The release-group and release MBIDs are appended once the album has
+        been through release_plan().
         """
-        return f"{date}|{original_date}|{genre}"
+        fields = [date, original_date, genre]
+        if release_group is not None and release is not None:
+            fields += [release_group, release]
+        return "|".join(fields)
 
     @staticmethod
     def _parse_release_meta_cache(cached: str) -> tuple[str, str, str]:
@@ -315,159 +2469,191 @@ class MetadataService:
             return parts[0], "", ""
         return "", "", ""
 
+    @staticmethod
+    def _release_meta_ids(cached: str) -> tuple[str, str] | None:
+        """(release-group MBID, release MBID), or None for pre-planner entries."""
+        parts = cached.split("|")
+        if len(parts) >= 5:
+            return parts[3], parts[4]
+        return None
+
     # ──────────────────────────────────────────────
-    # Socket helpers
+    # Snapserver JSON-RPC
     # ──────────────────────────────────────────────
 
-    def _create_socket(
-        self, host: str, port: int, timeout: int = 5, log_errors: bool = True
-    ) -> socket.socket | None:
-        sock = None
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
-            sock.connect((host, port))
-            return sock
-        except Exception as e:
-            if log_errors:
-                logger.error(f"Failed to connect to {host}:{port}: {e}")
-            if sock is not None:
-                try:
-                    sock.close()
-                except Exception:
-                    pass
+    async def get_server_status(self) -> dict | None:
+        """Fetch the full server tree with Server.GetStatus."""
+        response = await self.rpc.request(
+            "Server.GetStatus", on_response=self._seed_server_model
+        )
+        if not response:
             return None
+        server = (response.get("result") or {}).get("server")
+        if not server:
+            logger.warning("Snapserver returned empty/missing server status")
+            return None
+        return server
+
+    def _seed_server_model(self, response: dict) -> None:
+        # Runs in the RPC reader: responses and notifications share one
+        # ordered connection, so seeding here — before the next line is
+        # read — can't overwrite a notification that followed the response.
+        server = (response.get("result") or {}).get("server")
+        if isinstance(server, dict):
+            self.server_model.reset(server)
+            self.server_model.live = SNAPSERVER_NOTIFICATIONS
+
+    def _on_snap_notification(self, method: str, params: dict) -> None:
+        """Apply a Snapserver notification to the model and wake the poll loop."""
+        if not SNAPSERVER_NOTIFICATIONS:
+            return
+        if self.server_model.apply(method, params):
+            self._state_changed.set()
+        else:
+            logger.debug(f"Notification {method} needs a full resync")
+            self._resync_needed.set()
+
+    def _on_snap_connection(self, connected: bool) -> None:
+        # Anything may have changed while we were away — re-seed on connect;
+        # stop trusting the model the moment notifications can be missed.
+        if connected:
+            self._resync_needed.set()
+        else:
+            self.server_model.invalidate()
 
-    def _get_snap_socket(self) -> socket.socket | None:
-        # Check if existing socket is stale BEFORE reusing
-        if self._snap_sock is not None:
-            time_since_response = time.monotonic() - self._last_snap_response
-            if time_since_response > self._snap_stale_threshold:
-                logger.warning(
-                    f"Snapserver socket stale ({time_since_response:.1f}s), reconnecting"
-                )
-                self._close_snap_socket()
-            else:
-                return self._snap_sock
-
-        self._snap_sock = self._create_socket(
-            self.snapserver_host, self.snapserver_port
-        )
-        if self._snap_sock:
-            self._snap_sock.settimeout(10.0)
-            self._last_snap_response = time.monotonic()
-            logger.info(
-                f"Connected to Snapserver {self.snapserver_host}:{self.snapserver_port}"
-            )
-        return self._snap_sock
+    async def snapserver_event_loop(self) -> None:
+        """Keep `server_model` seeded from Server.GetStatus.
 
-    def _close_snap_socket(self) -> None:
-        if self._snap_sock is not None:
+        Notifications patch the model as they arrive (`_on_snap_notification`);
+        this loop re-seeds it on every (re)connect, whenever a notification
+        can't be applied incrementally, and every SNAPSERVER_RESYNC_INTERVAL
+        seconds to heal anything missed. A connected socket that fails to
+        answer a resync is treated as stale and reconnected.
+        """
+        self.rpc.start()
+        while True:
             try:
-                self._snap_sock.close()
-            except Exception:
+                await asyncio.wait_for(
+                    self._resync_needed.wait(), SNAPSERVER_RESYNC_INTERVAL
+                )
+            except TimeoutError:
                 pass
-            self._snap_sock = None
-            self._snap_buffer = b""
+            self._resync_needed.clear()
+            if not self.rpc.connected:
+                continue
+            if await self.get_server_status() is None:
+                logger.warning("Snapserver resync failed, reconnecting")
+                self.rpc.reconnect()
+                continue
+            self._state_changed.set()
 
-    # ──────────────────────────────────────────────
-    # Snapserver JSON-RPC
-    # ──────────────────────────────────────────────
+    def status_age(self) -> float | None:
+        """Seconds since `server_model` was last known current.
 
-    def send_rpc_request(
-        self, sock: socket.socket, method: str, params: dict | None = None
-    ) -> dict | None:
-        request = {
-            "id": 1,
-            "jsonrpc": "2.0",
-            "method": method,
-            "params": params or {},
-        }
-        try:
-            sock.sendall((json.dumps(request) + "\r\n").encode())
-        except OSError as e:
-            logger.warning(f"Failed to send RPC request: {e}")
+        0 while notifications keep the model live; None before the first
+        successful Server.GetStatus.
+        """
+        model = self.server_model
+        if model.server is None:
             return None
+        if SNAPSERVER_NOTIFICATIONS and model.live:
+            return 0.0
+        return time.monotonic() - model.synced_at
 
-        while True:
-            while b"\r\n" in self._snap_buffer:
-                line, self._snap_buffer = self._snap_buffer.split(b"\r\n", 1)
-                if not line:
-                    continue
-                try:
-                    msg = json.loads(line.decode("utf-8", errors="replace"))
-                except json.JSONDecodeError as e:
-                    logger.warning(
-                        f"Malformed JSON from Snapserver: {line[:100]!r}: {e}"
-                    )
-                    continue
-                if "id" in msg:
-                    self._last_snap_response = time.monotonic()
-                    return msg
-            try:
-                chunk = sock.recv(8192)
-                if not chunk:
-                    return None
-                self._snap_buffer += chunk
-            except TimeoutError:
-                logger.warning("Snapserver socket timeout")
-                return None
-            except OSError as e:
-                logger.warning(f"Snapserver socket error: {e}")
-                return None
-
-    def get_server_status(self) -> dict | None:
-        """Get full server status, with one retry on failure."""
-        with self._snap_lock:
-            if (
-                self._snap_sock is not None
-                and self._last_snap_response > 0
-                and time.monotonic() - self._last_snap_response
-                > self._snap_stale_threshold
-            ):
-                logger.warning("Snapserver connection stale, reconnecting")
-                self._close_snap_socket()
+    async def _current_server_status(
+        self, max_age: float = SNAPSERVER_STATUS_MAX_AGE
+    ) -> dict | None:
+        """The shared server tree, refreshed only when older than `max_age`.
 
-            sock = self._get_snap_socket()
-            if not sock:
-                return None
+        The live notification model costs no RPC and no JSON parse. Without
+        it, the last Server.GetStatus seed is reused while young enough;
+        otherwise one GetStatus runs and concurrent callers (a subscribe
+        storm at boot) await that same request.
+        """
+        age = self.status_age()
+        if age is not None and age <= max_age:
+            return self.server_model.server
+        if self._status_refresh is None or self._status_refresh.done():
+            self._status_refresh = asyncio.ensure_future(self.get_server_status())
+        return await asyncio.shield(self._status_refresh)
+
+    # Coalesce a burst of notifications (volume knob, group reshuffle) into
+    # one poll cycle instead of one cycle per message.
+    _NOTIFY_DEBOUNCE_SEC = 0.1
+
+    async def _wait_for_state_change(self, timeout: float) -> None:
+        """Sleep until the next poll tick or an earlier state-change wakeup
+        (snapserver notification, MPD idle event)."""
+        try:
+            await asyncio.wait_for(self._state_changed.wait(), timeout)
+            await asyncio.sleep(self._NOTIFY_DEBOUNCE_SEC)
+        except TimeoutError:
+            pass
+        self._state_changed.clear()
 
-            status = self.send_rpc_request(sock, "Server.GetStatus")
-            if not status:
-                self._close_snap_socket()
-                sock = self._get_snap_socket()
-                if not sock:
-                    return None
-                status = self.send_rpc_request(sock, "Server.GetStatus")
-            if not status:
-                self._close_snap_socket()
-                return None
+    async def mpd_idle_loop(self) -> None:
+        """Wake the poll loop the moment MPD's player, mixer or options change.
 
-            server = status.get("result", {}).get("server")
-            if not server:
-                logger.warning("Snapserver returned empty/missing server status")
-                return None
-            return server
+        Parks a dedicated connection in `idle player mixer options` (idle
+        connections are exempt from MPD's connection_timeout); every
+        `changed:` answer sets `_state_changed` and re-enters idle. MPD
+        outages are already reported by get_mpd_metadata, so reconnect
+        attempts here only log at debug.
+        """
+        backoff = 1.0
+        while True:
+            writer = None
+            try:
+                reader, writer = await asyncio.open_connection(
+                    self.mpd_host, self.mpd_port
+                )
+                greeting = await asyncio.wait_for(reader.readline(), 5)
+                if not greeting.startswith(b"OK MPD"):
+                    raise ConnectionError(f"unexpected greeting {greeting[:40]!r}")
+                backoff = 1.0
+                while True:
+                    writer.write(b"idle player mixer options\n")
+                    await writer.drain()
+                    changed = False
+                    while True:
+                        line = await reader.readline()
+                        if not line:
+                            raise ConnectionError("connection closed by MPD")
+                        if line.startswith(b"changed:"):
+                            changed = True
+                        elif line.startswith(b"ACK"):
+                            raise ConnectionError(line.decode(errors="replace"))
+                        elif line.rstrip() == b"OK":
+                            break
+                    if changed:
+                        self._state_changed.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"MPD idle connection down: {e}")
+            finally:
+                if writer is not None:
+                    writer.close()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _client_registry(self, server: dict) -> ClientRegistry:
+        """Client registry for `server`, rebuilt only when the tree changed."""
+        version = self.server_model.version if server is self.server_model.server else 0
+        registry = self._registry
+        if registry.server is not server or registry.version != version:
+            registry = ClientRegistry(server, version)
+            self._registry = registry
+        return registry
 
     def _build_client_stream_map(self, server: dict) -> dict[str, str]:
         """Build CLIENT_ID → stream_id mapping from server status."""
-        mapping: dict[str, str] = {}
-        for group in server.get("groups", []):
-            stream_id = group.get("stream_id", "")
-            for client in group.get("clients", []):
-                for identifier in [
-                    client.get("host", {}).get("name", ""),
-                    client.get("config", {}).get("name", ""),
-                    client.get("id", ""),
-                ]:
-                    if identifier:
-                        mapping[identifier] = stream_id
-        return mapping
+        return self._client_registry(server).stream_map()
 
     def _build_server_info(self, server: dict) -> dict:
         """Build server_info payload from current server status."""
         snap_info = server.get("snapserver", {})
-        clients = sum(len(g.get("clients", [])) for g in server.get("groups", []))
+        clients = len(self._client_registry(server).clients)
         active = [
             s["id"] for s in server.get("streams", []) if s.get("status") == "playing"
         ]
@@ -484,27 +2670,13 @@ class MetadataService:
         info = self._build_server_info(server)
         msg = json.dumps(info)
         async with ws_clients_lock:
-            clients_to_remove = set()
-            for sc in list(ws_clients):  # Create list snapshot
-                try:
-                    await sc.websocket.send(msg)
-                except Exception as exc:
-                    logger.debug("server_info send failed, dropping client: %s", exc)
-                    clients_to_remove.add(sc)
-            # Remove failed clients outside iteration
+            # send() only queues, so holding the lock here costs no I/O
+            clients_to_remove = {
+                sc for sc in ws_clients if not sc.send(msg, key="server_info")
+            }
+            # Remove closed clients outside iteration
             ws_clients.difference_update(clients_to_remove)
 
-    @staticmethod
-    def _match_client_id(client_id: str, identifiers: list[str]) -> bool:
-        # Exact match or `snapclient-`-prefix-stripped exact match. Substring matching here would mis-route "Sala" volume to "Sala Grande".
-        if any(client_id == i for i in identifiers if i):
-            return True
-        if client_id.startswith("snapclient-"):
-            stripped = client_id[len("snapclient-") :]
-            if any(stripped == i for i in identifiers if i):
-                return True
-        return False
-
     def _resolve_client_stream(self, client_id: str) -> str | None:
         """Resolve a CLIENT_ID to its stream_id using cached mapping.
 
@@ -551,52 +2723,12 @@ class MetadataService:
 
     def _find_client_volume(self, server: dict, client_id: str) -> dict:
         """Find volume info for a specific client."""
-        for group in server.get("groups", []):
-            for client in group.get("clients", []):
-                identifiers = [
-                    client.get("host", {}).get("name", ""),
-                    client.get("config", {}).get("name", ""),
-                    client.get("id", ""),
-                ]
-                if self._match_client_id(client_id, identifiers):
-                    return client.get("config", {}).get(
-                        "volume", {"percent": 100, "muted": False}
-                    )
-        return {"percent": 100, "muted": False}
+        return self._client_registry(server).volume(client_id)
 
     # ──────────────────────────────────────────────
     # MPD metadata
     # ──────────────────────────────────────────────
 
-    def _read_mpd_response(self, sock: socket.socket) -> bytes:
-        response = b""
-        while True:
-            chunk = sock.recv(4096)
-            if not chunk:
-                break
-            response += chunk
-            if b"OK\n" in response or b"ACK" in response:
-                break
-        return response
-
-    def _parse_mpd_response(self, response: bytes) -> dict[str, str]:
-        lines = response.decode("utf-8", errors="replace").split("\n")
-        return {
-            key: value
-            for line in lines
-            if ": " in line
-            for key, value in [line.split(": ", 1)]
-        }
-
-    def _read_mpd_greeting(self, sock: socket.socket, validate: bool = False) -> bool:
-        try:
-            greeting = sock.recv(1024)
-            if validate and not greeting.startswith(b"OK MPD"):
-                return False
-            return True
-        except OSError:
-            return False
-
     @staticmethod
     def _detect_codec(file_path: str, audio_fmt: str) -> str:
         if file_path.startswith(("http://", "https://")):
@@ -657,10 +2789,10 @@ class MetadataService:
             if now - self._mpd_last_fail < self._mpd_retry_interval:
                 return {"playing": False, "source": "MPD"}
 
-        sock = self._create_socket(
-            self.mpd_host, self.mpd_port, timeout=2, log_errors=False
-        )
-        if not sock:
+        try:
+            # status + currentsong in a single round trip
+            status, song = self.mpd.command_list(["status", "currentsong"])
+        except OSError:
             self._mpd_last_fail = now
             if self._mpd_was_connected:
                 logger.warning(f"MPD connection lost ({self.mpd_host}:{self.mpd_port})")
@@ -671,6 +2803,9 @@ class MetadataService:
                 )
                 self._mpd_last_retry_log = now
             return {"playing": False, "source": "MPD"}
+        except MpdCommandError as e:
+            logger.warning(f"MPD query failed: {e}")
+            return {"playing": False, "source": "MPD"}
 
         try:
             if not self._mpd_was_connected:
@@ -678,21 +2813,12 @@ class MetadataService:
                 self._mpd_was_connected = True
                 self._mpd_last_fail = 0.0
 
-            if not self._read_mpd_greeting(sock):
-                return {"playing": False, "source": "MPD"}
-
-            sock.sendall(b"status\n")
-            status = self._parse_mpd_response(self._read_mpd_response(sock))
-
             if status.get("state", "stop") != "play":
                 return {"playing": False, "source": "MPD"}
 
             elapsed = float(status.get("elapsed", 0))
             duration = float(status.get("duration", 0))
 
-            sock.sendall(b"currentsong\n")
-            song = self._parse_mpd_response(self._read_mpd_response(sock))
-
             title, artist, album = self._extract_radio_metadata(
                 html.unescape(song.get("Title", "")),
                 html.unescape(song.get("Artist", "")),
@@ -723,6 +2849,7 @@ class MetadataService:
                 "sample_rate": sample_rate,
                 "bit_depth": bit_depth,
                 "file": file_path,
+                "mpd_album": self._mpd_album_source(song),
                 "station_name": song.get("Name", ""),
                 "elapsed": int(elapsed),
                 "duration": int(duration),
@@ -732,14 +2859,58 @@ class MetadataService:
                 logger.warning(f"MPD query failed: {e}")
                 self._mpd_was_connected = False
             return {"playing": False, "source": "MPD"}
-        finally:
-            sock.close()
 
     # ──────────────────────────────────────────────
     # MPD embedded artwork
     # ──────────────────────────────────────────────
 
     _MAX_MPD_ARTWORK_BYTES = 10_000_000
+    _MAX_INLINE_ARTWORK_BYTES = 10_000_000
+    _MPD_PICTURE_HEAD = 8192
+
+    # Stored artwork larger than this (bytes) is re-encoded even when its
+    # dimensions are within ARTWORK_MAX_DIMENSION (e.g. lossless PNG scans)
+    _NORMALIZE_ABOVE_BYTES = 1_000_000
+
+    @classmethod
+    def _normalize_artwork(cls, data: bytes) -> tuple[bytes, str]:
+        """Bound artwork before storing it; returns (bytes, extension).
+
+        Oversized images (10 MB embedded PNGs, print-resolution scans) are
+        scaled to ARTWORK_MAX_DIMENSION and re-encoded once here instead of
+        by every display on every track change. Anything Pillow can't read
+        is stored as fetched.
+        """
+        ext = cls._image_extension(data)
+        if Image is None:
+            return data, ext
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                if (
+                    max(img.size) <= ARTWORK_MAX_DIMENSION
+                    and len(data) <= cls._NORMALIZE_ABOVE_BYTES
+                ):
+                    return data, ext
+                img.thumbnail((ARTWORK_MAX_DIMENSION, ARTWORK_MAX_DIMENSION))
+                normalized, ext = _encode_image(img)
+        except Exception as e:
+            logger.debug(f"Artwork left as fetched, cannot decode: {e}")
+            return data, ext
+        logger.debug(f"Normalized artwork {len(data)} → {len(normalized)} bytes")
+        return normalized, ext
+
+    @classmethod
+    def _fits_as_is(cls, path: Path, size: int) -> bool:
+        """True if a downloaded file needs no `_normalize_artwork` pass."""
+        if size > cls._NORMALIZE_ABOVE_BYTES:
+            return False
+        if Image is None:
+            return True
+        try:
+            with Image.open(path) as img:  # reads the header only
+                return max(img.size) <= ARTWORK_MAX_DIMENSION
+        except Exception:
+            return True  # stored as fetched either way
 
     @staticmethod
     def _image_extension(data: bytes) -> str:
@@ -751,146 +2922,526 @@ class MetadataService:
             return ".webp"
         return ".jpg"
 
-    def fetch_mpd_artwork(self, file_path: str) -> str:
-        """Fetch embedded cover art from MPD via readpicture. Returns artwork filename or ""."""
+    @staticmethod
+    def _inline_artwork_source(encoded: str) -> str:
+        """Store source key of inline base64 artwork: its content hash."""
+        return f"inline:{hashlib.sha256(encoded.encode()).hexdigest()}"
+
+    def ingest_artwork_data(self, encoded: str) -> str:
+        """Store base64 artwork sent inline (Snapcast `artData`). Returns filename or ""."""
+        source = self._inline_artwork_source(encoded)
+        return self._flight.do(
+            ("inline", source), self._ingest_artwork_data, source, encoded
+        )
+
+    def _ingest_artwork_data(self, source: str, encoded: str) -> str:
+        cached = self.artwork_store.lookup(source)
+        if cached:
+            return cached
+        if len(encoded) > self._MAX_INLINE_ARTWORK_BYTES * 4 // 3 + 4:
+            logger.warning(
+                f"Inline artwork exceeded size limit ({self._MAX_INLINE_ARTWORK_BYTES} bytes)"
+            )
+            return ""
+        try:
+            data = base64.b64decode(encoded, validate=True)
+        except ValueError as e:
+            logger.warning(f"Malformed inline artwork: {e}")
+            return ""
+        if not data:
+            return ""
+        try:
+            filename = self.artwork_store.put(source, *self._normalize_artwork(data))
+        except OSError as e:
+            logger.warning(f"Inline artwork write/rename failed: {e}")
+            return ""
+        logger.info(f"Got inline artwork ({len(data)} bytes)")
+        return filename
+
+    def fetch_mpd_artwork(self, file_path: str, album: str = "") -> str:
+        """Fetch cover art from MPD for `file_path`. Returns artwork filename or "".
+
+        `album` is the `_mpd_album_source` of the song: tracks of one album
+        share its artwork, so only the first one played transfers it.
+        """
+        return self._flight.do(
+            ("mpd", file_path), self._fetch_mpd_artwork, file_path, album
+        )
+
+    def _fetch_mpd_artwork(self, file_path: str, album: str = "") -> str:
         if not file_path:
             return ""
 
-        art_hash = hashlib.md5(f"mpd:{file_path}".encode()).hexdigest()
-        for ext in (".jpg", ".png", ".gif", ".webp"):
-            cached = self.artwork_dir / f"artwork_{art_hash}{ext}"
-            if cached.exists() and cached.stat().st_size > 0:
-                return f"artwork_{art_hash}{ext}"
+        source = f"mpd:{file_path}"
+        cached = self.artwork_store.lookup(source)
+        if cached:
+            return cached  # this track's own art, different from its album's
 
         # Skip artwork fetch if MPD is known to be down
         if not self._mpd_was_connected and self._mpd_last_fail > 0:
             if time.monotonic() - self._mpd_last_fail < self._mpd_retry_interval:
                 return ""
 
-        sock = self._create_socket(
-            self.mpd_host, self.mpd_port, timeout=2, log_errors=False
-        )
-        if not sock:
+        if any(c in file_path for c in "\n\r\t\x00"):
+            logger.warning("Rejected file path with control characters")
             return ""
 
+        album = album or self._mpd_album_source({"file": file_path})
+        album_art = self.artwork_store.lookup(album) if album else ""
+        if album and not album_art:
+            # Tracks of one album looked up at once (now playing and
+            # prefetch) share a single transfer of the album's picture
+            album_art, seeded_by = self._flight.do(
+                ("mpd-album", album), self._seed_mpd_album_artwork, file_path, album
+            )
+            if seeded_by == file_path:
+                return album_art
+        if album_art and not MPD_ARTWORK_VERIFY:
+            return album_art
+        # The first chunk tells whether this track embeds the album's
+        # picture; only a track with art of its own transfers the rest
+        read = self._read_mpd_artwork(file_path, album if album_art else "")
+        if read is None:
+            return ""
+        image_data, _ = read
+        if not image_data:
+            return album_art
+        return self._store_mpd_artwork(source, file_path, image_data)
+
+    def _seed_mpd_album_artwork(self, file_path: str, album: str) -> tuple[str, str]:
+        """Store `file_path`'s art as its album's; (filename, file_path).
+
+        ("", file_path) if it has none; (filename, "") when another track
+        stored the album's art first.
+        """
+        album_art = self.artwork_store.lookup(album)
+        if album_art:
+            return album_art, ""
+        read = self._read_mpd_artwork(file_path)
+        if read is None or not read[0]:
+            return "", file_path
+        image_data, signature = read
+        filename = self._store_mpd_artwork(album, file_path, image_data)
+        if filename:
+            # "folder": the art came from albumart, the track embeds none
+            self._mpd_album_signatures.set(album, signature or "folder")
+        return filename, file_path
+
+    def _read_mpd_artwork(
+        self, file_path: str, album: str = ""
+    ) -> tuple[bytes | bytearray, str] | None:
+        """Picture for `file_path` (embedded, else its folder's) and signature.
+
+        With `album`, b"" when the track embeds no picture or the album's
+        one, after a single chunk. None if MPD failed.
+        """
         try:
-            sock.settimeout(10)
-            if not self._read_mpd_greeting(sock, validate=True):
-                return ""
+            head = self._read_mpd_picture_head("readpicture", file_path)
+            signature = self._mpd_picture_signature(*head)
+            if album and signature in ("", self._mpd_album_signatures.get(album)):
+                return b"", signature
+            image_data = self._read_mpd_picture("readpicture", file_path, head)
+            if not image_data:
+                image_data = self._read_mpd_picture("albumart", file_path)
+        except OSError as e:
+            logger.warning(f"MPD readpicture failed: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error in MPD readpicture: {e}")
+            return None
+        return image_data, signature
 
-            if any(c in file_path for c in "\n\r\t\x00"):
-                logger.warning("Rejected file path with control characters")
-                return ""
-            safe_path = file_path.replace("\\", "\\\\").replace('"', '\\"')
+    def _store_mpd_artwork(
+        self, source: str, file_path: str, image_data: bytes | bytearray
+    ) -> str:
+        try:
+            filename = self.artwork_store.put(
+                source, *self._normalize_artwork(image_data)
+            )
+        except OSError as e:
+            logger.warning(f"MPD artwork write/rename failed: {e}")
+            return ""
+        logger.info(f"Got MPD artwork ({len(image_data)} bytes) for {file_path}")
+        return filename
 
-            image_data = b""
-            offset = 0
+    def _read_mpd_picture_head(
+        self, command: str, file_path: str
+    ) -> tuple[dict[str, str], bytes | memoryview]:
+        """First chunk of `readpicture` / `albumart` and its fields; b"" if none.
 
-            while True:
-                cmd = f'readpicture "{safe_path}" {offset}\n'
-                sock.sendall(cmd.encode())
-
-                header = b""
-                while (
-                    b"binary:" not in header
-                    and b"OK\n" not in header
-                    and b"ACK" not in header
-                ):
-                    chunk = sock.recv(4096)
-                    if not chunk:
-                        return ""
-                    header += chunk
+        Kept to _MPD_PICTURE_HEAD bytes: enough to tell pictures apart, cheap
+        for the tracks whose album art is already stored.
+        """
+        try:
+            return self.mpd.binary_command(
+                f"{command} {_mpd_quote(file_path)} 0", limit=self._MPD_PICTURE_HEAD
+            )
+        except MpdCommandError:
+            return {}, b""
+
+    def _read_mpd_picture(
+        self,
+        command: str,
+        file_path: str,
+        head: tuple[dict[str, str], bytes | memoryview] | None = None,
+    ) -> bytes | bytearray:
+        """The whole `readpicture` / `albumart` picture for `file_path`; b"" if none.
+
+        `head` is the first chunk if already read. The rest arrives in
+        MPD_BINARY_LIMIT chunks received straight into a buffer of the
+        reported size. Raises OSError if MPD is unreachable.
+        """
+        fields, chunk = head or self._read_mpd_picture_head(command, file_path)
+        size = fields.get("size", "")
+        if not chunk or not size.isdigit():
+            return b""
+        total = int(size)
+        if total > self._MAX_MPD_ARTWORK_BYTES:
+            logger.warning(
+                f"MPD artwork exceeded size limit ({self._MAX_MPD_ARTWORK_BYTES} bytes)"
+            )
+            return b""
+        if len(chunk) >= total:
+            return bytes(chunk)
+        image = bytearray(total)
+        with memoryview(image) as view:
+            view[: len(chunk)] = chunk
+            offset = len(chunk)
+            while offset < total:
+                try:
+                    _fields, chunk = self.mpd.binary_command(
+                        f"{command} {_mpd_quote(file_path)} {offset}",
+                        into=view[offset:],
+                    )
+                except MpdCommandError:
+                    return b""  # e.g. the file changed mid-transfer
+                if not chunk:
+                    return b""
+                offset += len(chunk)
+        return image
+
+    @classmethod
+    def _mpd_picture_signature(
+        cls, fields: dict[str, str], chunk: bytes | memoryview
+    ) -> str:
+        """Cheap identity of an embedded picture: its size and first bytes."""
+        if not chunk:
+            return ""
+        head = chunk[: cls._MPD_PICTURE_HEAD]
+        digest = hashlib.sha256(head).hexdigest()[:16]
+        return f"{fields.get('size', len(chunk))}:{digest}"
 
-                if b"ACK" in header or b"binary:" not in header:
-                    break
+    @staticmethod
+    def _mpd_album_source(song: dict[str, str]) -> str:
+        """ArtworkStore source key shared by the tracks of `song`'s album.
 
-                bin_size = 0
-                for line in header.split(b"\n"):
-                    if line.startswith(b"binary: "):
-                        try:
-                            bin_size = int(line.split(b": ", 1)[1])
-                        except (ValueError, IndexError):
-                            bin_size = 0
-                        break
-                else:
-                    break
+        The MusicBrainz album id if tagged, else album artist + album, else
+        the directory holding the file; "" for streams and loose files.
+        """
+        file_path = song.get("file", "")
+        if not file_path or "://" in file_path:
+            return ""
+        album_id = song.get("MUSICBRAINZ_ALBUMID", "")
+        if album_id:
+            return f"mpd-album:{album_id}"
+        album_artist, album = song.get("AlbumArtist", ""), song.get("Album", "")
+        if album_artist and album:
+            return f"mpd-album:{album_artist.casefold()}|{album.casefold()}"
+        directory = file_path.rpartition("/")[0]
+        return f"mpd-dir:{directory}" if directory else ""
 
-                if bin_size <= 0 or bin_size > self._MAX_MPD_ARTWORK_BYTES:
-                    break
+    # ──────────────────────────────────────────────
+    # MPD queue prefetch
+    # ──────────────────────────────────────────────
 
-                bin_marker = f"binary: {bin_size}\n".encode()
-                marker_pos = header.find(bin_marker)
-                if marker_pos < 0:
-                    break
-                remaining = header[marker_pos + len(bin_marker) :]
+    def _start_prefetch(self) -> None:
+        """Replace any running prefetch round with one for the current queue."""
+        if MPD_PREFETCH_DEPTH <= 0:
+            return
+        if self._prefetch_ticket is not None:
+            self.scheduler.cancel(self._prefetch_ticket)
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+        self._prefetch_ticket = ticket = LookupTicket()
+        self._prefetch_task = asyncio.create_task(self._prefetch(ticket))
+
+    async def _prefetch(self, ticket: LookupTicket) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._prefetch_queue, ticket)
+        except LookupCancelled:
+            pass
+        except Exception as e:
+            logger.debug(f"MPD prefetch failed: {e}")
 
-                while len(remaining) < bin_size:
-                    chunk = sock.recv(min(8192, bin_size - len(remaining)))
-                    if not chunk:
-                        return ""
-                    remaining += chunk
+    def _upcoming_songs(self, depth: int) -> list[dict[str, str]]:
+        """The next `depth` queue entries MPD will play, in order.
 
-                if len(image_data) + bin_size > self._MAX_MPD_ARTWORK_BYTES:
-                    logger.warning(
-                        f"MPD artwork exceeded size limit ({self._MAX_MPD_ARTWORK_BYTES} bytes)"
-                    )
-                    return ""
-
-                image_data += remaining[:bin_size]
-                offset += bin_size
-
-                trail = remaining[bin_size:]
-                while b"OK\n" not in trail:
-                    chunk = sock.recv(1024)
-                    if not chunk:
-                        return ""
-                    trail += chunk
-
-            if len(image_data) > 0:
-                ext = self._image_extension(image_data)
-                filename = f"artwork_{art_hash}{ext}"
-                local_path = self.artwork_dir / filename
-                tmp_path = local_path.parent / (local_path.name + ".tmp")
+        In random mode only `nextsong` is known in advance.
+        """
+        status = self.mpd.command("status")
+        if not status.get("nextsong", "").isdigit():
+            return []
+        length = int(status.get("playlistlength", "0") or 0)
+        current = status.get("song", "")
+        positions = []
+        pos = int(status["nextsong"])
+        count = 1 if status.get("random") == "1" else depth
+        while len(positions) < count and pos < length and str(pos) != current:
+            positions.append(pos)
+            pos += 1
+            if pos == length and status.get("repeat") == "1":
+                pos = 0
+        if not positions:
+            return []
+        return self.mpd.command_list([f"playlistinfo {p}" for p in positions])
+
+    def _prefetch_queue(self, ticket: LookupTicket) -> None:
+        """Warm the caches for the upcoming MPD queue entries, within budget."""
+        started = time.monotonic()
+        token = _lookup_context.set((PRIORITY_PREFETCH, ticket))
+        warmed = 0
+        try:
+            for song in self._upcoming_songs(MPD_PREFETCH_DEPTH):
+                if ticket.cancelled:
+                    return
+                if time.monotonic() - started > MPD_PREFETCH_BUDGET:
+                    logger.debug("MPD prefetch stopped: budget spent")
+                    break
                 try:
-                    with open(tmp_path, "wb") as f:
-                        f.write(image_data)
-                    tmp_path.rename(local_path)
-                except Exception as e:
-                    logger.warning(f"MPD artwork write/rename failed: {e}")
-                    try:
-                        tmp_path.unlink(missing_ok=True)
-                    except Exception:
-                        pass
-                    return ""
-                logger.info(
-                    f"Got MPD artwork ({len(image_data)} bytes) for {file_path}"
+                    self._prefetch_song(song)
+                except ProviderUnavailable as e:
+                    logger.debug(f"MPD prefetch skipped a lookup: {e} unavailable")
+                warmed += 1
+        finally:
+            _lookup_context.reset(token)
+        logger.debug(
+            f"MPD prefetch warmed {warmed} upcoming tracks "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+
+    def _prefetch_song(self, song: dict[str, str]) -> None:
+        """Look up what enrich_artwork / enrich_tags will want for `song`."""
+        file_path = song.get("file", "")
+        if not file_path or "://" in file_path:
+            return  # radio and other streams: nothing stable to warm
+        _title, artist, album = self._extract_radio_metadata(
+            html.unescape(song.get("Title", "")),
+            html.unescape(song.get("Artist", "")),
+            song,
+        )
+        name = self.fetch_mpd_artwork(file_path, self._mpd_album_source(song))
+        if not name and artist and album:
+            url, _source = self.fetch_album_artwork(artist, album)
+            name = self.download_artwork(url) if url else ""
+        if name:
+            self.artwork_store.warm(name)
+        if artist and album:
+            self.enrich_tags(
+                {
+                    "playing": True,
+                    "artist": artist,
+                    "album": album,
+                    "date": song.get("Date", ""),
+                    "genre": song.get("Genre", ""),
+                }
+            )
+
+    # ──────────────────────────────────────────────
+    # MPD library artwork crawl
+    # ──────────────────────────────────────────────
+
+    # Seconds between checks for a changed database once a pass is done (or
+    # the quota is full), and before resuming after MPD went away
+    _CRAWL_RECHECK = 3600
+    _CRAWL_RETRY = 60
+    # Stop adding artwork beyond this share of the store's quota: crawled
+    # images must not evict ones that were actually played
+    _CRAWL_QUOTA_SHARE = 0.9
+
+    async def artwork_crawl_loop(self) -> None:
+        """Crawl the MPD library for album artwork, pass after pass."""
+        assert self.crawl is not None
+        while True:
+            try:
+                complete = await self._crawl_pass(self.crawl)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Library artwork crawl interrupted: {e}")
+                self.crawl.state = "waiting for MPD"
+                complete = False
+            if self.crawl.cursor is not None:
+                self.crawl.save()
+            await asyncio.sleep(self._CRAWL_RECHECK if complete else self._CRAWL_RETRY)
+
+    async def _crawl_pass(self, progress: CrawlProgress) -> bool:
+        """Resume (or start) a pass; True once nothing is left to crawl."""
+        loop = asyncio.get_running_loop()
+        stats = await loop.run_in_executor(None, self.mpd.command, "stats")
+        db_update = stats.get("db_update", "")
+        if progress.cursor is None and db_update == progress.db_update:
+            progress.state = "complete"
+            return True
+        progress.begin(db_update)
+        if progress.scanned == 0:
+            logger.info("Crawling the MPD library for album artwork")
+        walk = self._crawl_walk(progress)
+        while True:
+            status = await loop.run_in_executor(None, self.mpd.command, "status")
+            if "updating_db" in status:
+                progress.state = "paused: MPD is updating its database"
+                await asyncio.sleep(self._CRAWL_RETRY)
+                continue
+            if not self._crawl_has_room():
+                progress.state = "paused: artwork quota nearly full"
+                return True
+            progress.state = "running"
+            item = await loop.run_in_executor(None, next, walk, None)
+            if item is None:
+                break
+            directory, songs = item
+            progress.current = directory
+            stored = await loop.run_in_executor(
+                None, self._crawl_directory, directory, songs
+            )
+            progress.advance(tuple(directory.split("/")) if directory else (), stored)
+            await asyncio.sleep(MPD_ARTWORK_CRAWL_DELAY)
+        progress.finish()
+        logger.info(
+            f"MPD library crawl done: {progress.scanned} directories, "
+            f"{progress.stored} with artwork"
+        )
+        return True
+
+    def _crawl_walk(
+        self, progress: CrawlProgress
+    ) -> Iterator[tuple[str, list[dict[str, str]]]]:
+        """Directories still to crawl with their songs, in sorted pre-order.
+
+        Blocking (one `lsinfo` per directory): advance it from the executor.
+        """
+        stack = [""]
+        while stack:
+            directory = stack.pop()
+            parts = tuple(directory.split("/")) if directory else ()
+            done = progress.done(parts)
+            if done and not progress.holds_cursor(parts):
+                continue  # the whole subtree was crawled before
+            entries = self.mpd.entries_command(f"lsinfo {_mpd_quote(directory)}")
+            stack.extend(
+                sorted(
+                    (e["directory"] for e in entries if "directory" in e), reverse=True
                 )
-                return filename
+            )
+            if not done:
+                yield directory, [e for e in entries if "file" in e]
 
-            return ""
+    def _crawl_directory(self, directory: str, songs: list[dict[str, str]]) -> bool:
+        """Store the artwork of the album in one directory; True if it has any.
+
+        Stored under the album source playback looks up, from the first song.
+        """
+        if not songs:
+            return False
+        source = self._mpd_album_source(songs[0])
+        if not source:
+            return False
+        if self.artwork_store.contains(source):
+            return True
+        file_path = songs[0]["file"]
+        head = self._read_mpd_picture_head("readpicture", file_path)
+        data = self._read_mpd_picture("readpicture", file_path, head)
+        if not data:
+            data = self._read_mpd_picture("albumart", file_path)
+        if not data:
+            return False
+        try:
+            self.artwork_store.put(source, *self._normalize_artwork(data))
         except OSError as e:
-            logger.warning(f"MPD readpicture failed: {e}")
-            return ""
-        except Exception as e:
-            logger.error(f"Unexpected error in MPD readpicture: {e}")
-            return ""
-        finally:
-            sock.close()
+            logger.warning(f"Cannot store artwork of {directory}: {e}")
+            return False
+        self._mpd_album_signatures.set(
+            source, self._mpd_picture_signature(*head) or "folder"
+        )
+        return True
+
+    def _crawl_has_room(self) -> bool:
+        stats = self.artwork_store.stats()
+        share = self._CRAWL_QUOTA_SHARE
+        return (
+            stats["files"] < stats["max_files"] * share
+            and stats["bytes"] < stats["max_bytes"] * share
+        )
+
+    def _referenced_artwork(self) -> set[str]:
+        """Artwork file names published in any stream's current metadata."""
+        names = set()
+        for sm in self.streams.values():
+            for field in ("artwork", "artist_image"):
+                url = (sm.current or {}).get(field) or ""
+                names.add(url.rsplit("/", 1)[-1])
+        return names
+
+    async def artwork_gc_loop(self) -> None:
+        """Hold ARTWORK_DIR to its quota, once at startup and then periodically."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                stats = await loop.run_in_executor(
+                    None, self.artwork_store.collect, self._referenced_artwork()
+                )
+                logger.debug(f"Artwork GC: {stats}")
+            except Exception as e:
+                logger.warning(f"Artwork GC failed: {e}")
+            await asyncio.sleep(ARTWORK_GC_INTERVAL)
 
     # ──────────────────────────────────────────────
     # External artwork APIs
     # ──────────────────────────────────────────────
 
     def _make_api_request(self, url: str, timeout: int = 5) -> dict | list | None:
+        """GET JSON from a provider; None when it answers with an error.
+
+        Raises ProviderUnavailable instead when the provider cannot be reached
+        or its circuit breaker is open, so no "not found" gets cached for it.
+        """
+        breaker = self.providers.for_url(url)
+        if breaker is not None and not breaker.acquire():
+            raise ProviderUnavailable(breaker.name)
         try:
-            req = urllib.request.Request(url, headers={"User-Agent": self.user_agent})
-            with urllib.request.urlopen(req, timeout=timeout) as response:
-                return json.loads(response.read().decode())
+            data = self.http.get_json_sync(url, timeout)
         except Exception as e:
             logger.debug(f"API request failed for {url}: {e}")
-            return None
+            if breaker is not None and _is_outage(e):
+                breaker.failure(repr(e))
+                raise ProviderUnavailable(breaker.name) from e
+            data = None
+        if breaker is not None:
+            breaker.success()
+        return data
+
+    def _rate_limited_request(
+        self, provider: str, url: str, priority: int | None = None
+    ) -> dict | list | None:
+        """`_make_api_request` through the provider's RateScheduler bucket."""
+        breaker = self.providers.breakers.get(provider)
+        if breaker is not None and not breaker.ready():
+            # Down: fail now rather than after waiting for a rate-limit slot
+            raise ProviderUnavailable(provider)
+        return self.scheduler.call(
+            provider, url, self._make_api_request, url, priority=priority
+        )
 
     def fetch_radio_logo(self, station_name: str, stream_url: str) -> str:
+        return self._flight.do(
+            ("radio", station_name, stream_url),
+            self._fetch_radio_logo,
+            station_name,
+            stream_url,
+        )
+
+    def _fetch_radio_logo(self, station_name: str, stream_url: str) -> str:
         if not station_name or len(station_name) > 200:
             return ""
 
@@ -941,63 +3492,131 @@ class MetadataService:
         self._cache_set(self.artwork_cache, cache_key, best_url)
         return best_url
 
-    def fetch_musicbrainz_artwork(self, artist: str, album: str) -> str:
-        _mb_rate_limit()
-        query = urllib.parse.quote(f'artist:"{artist}" AND release:"{album}"')
+    @staticmethod
+    def _clean_album(album: str) -> str:
+        """Drop a truncated parenthetical suffix.
+
+        e.g. "Version 2.0 (20th Annivers" → "Version 2.0"
+        """
+        if "(" in album and ")" not in album:
+            return album[: album.rfind("(")].rstrip()
+        return album
+
+    def _musicbrainz_get(
+        self, album_key: str, url: str, priority: int | None = None
+    ) -> dict | list | None:
+        """Rate-limited MusicBrainz request, charged to `album_key` in mb_stats."""
+        started = time.monotonic()
+        data = self._rate_limited_request("musicbrainz", url, priority)
+        self.mb_stats.record(album_key, time.monotonic() - started)
+        return data
+
+    def release_plan(self, artist: str, clean_album: str) -> str:
+        """Release metadata for an album, from one MusicBrainz search.
+
+        Artwork and tags both read this cached value, so an album costs one
+        search however many stages and streams ask for it. Entries written
+        before the planner lack the release ids and are searched again.
+        """
+        cache_key = f"{artist}|{clean_album}"
+        cached = self._release_meta_cache.get(cache_key)
+        if cached is not None and self._release_meta_ids(cached) is not None:
+            return cached
+        return self._flight.do(
+            ("release", cache_key), self._search_release, artist, clean_album
+        )
+
+    def _search_release(self, artist: str, clean_album: str) -> str:
+        cache_key = f"{artist}|{clean_album}"
+        cached = self._release_meta_cache.get(cache_key)
+        if cached is not None and self._release_meta_ids(cached) is not None:
+            return cached
+        query = urllib.parse.quote(f'artist:"{artist}" AND release:"{clean_album}"')
         url = f"https://musicbrainz.org/ws/2/release/?query={query}&fmt=json&limit=5"
-        data = self._make_api_request(url)
-        if not data or not isinstance(data, dict):
-            return ""
-        for release in data.get("releases", []):
-            score = release.get("score", 0)
-            if score < 80:
-                continue
-            # Cache release metadata (date, genre) for enrich_tags()
-            # Clean album name to match enrich_tags() cache key
-            clean = album
-            if "(" in clean and ")" not in clean:
-                clean = clean[: clean.rfind("(")].rstrip()
-            cache_key = f"{artist}|{clean}"
-            date = release.get("date", "")
-            original_date = ""
-            tags = release.get("tags", [])
-            genre = tags[0].get("name", "") if tags else ""
-            release_group = release.get("release-group", {})
-            release_group_id = (
-                release_group.get("id", "") if isinstance(release_group, dict) else ""
-            )
-            if release_group_id:
-                original_date = self.fetch_musicbrainz_release_group_first_date(
-                    release_group_id
-                )
-            self._cache_set(
-                self._release_meta_cache,
-                cache_key,
-                self._release_meta_cache_value(date, original_date, genre),
-            )
-            mbid = release.get("id")
-            if mbid:
-                return f"https://coverartarchive.org/release/{mbid}/front-500"
+        data = self._musicbrainz_get(cache_key, url)
+        if data is None:
+            # Request failed, not "no match" — leave the cache alone
+            return self._release_meta_cache_value("", "", "")
+        releases = data.get("releases", []) if isinstance(data, dict) else []
+        candidates = [r for r in releases if r.get("score", 0) >= 80]
+        if not candidates:
+            cached = self._release_meta_cache_value("", "", "", "", "")
+            self._cache_set(self._release_meta_cache, cache_key, cached)
+            return cached
+        # Best score wins; ties keep MusicBrainz's order
+        best = max(candidates, key=lambda r: (bool(r.get("id")), r.get("score", 0)))
+        tags = best.get("tags", [])
+        release_group = best.get("release-group", {})
+        release_group_id = (
+            release_group.get("id", "") if isinstance(release_group, dict) else ""
+        )
+        # Another album of the same release group may have resolved it already
+        original_date = (
+            self._release_group_cache.get(release_group_id, "")
+            if release_group_id
+            else ""
+        )
+        cached = self._release_meta_cache_value(
+            best.get("date", ""),
+            original_date,
+            tags[0].get("name", "") if tags else "",
+            release_group_id,
+            best.get("id", ""),
+        )
+        self._cache_set(self._release_meta_cache, cache_key, cached)
+        return cached
+
+    def fetch_musicbrainz_artwork(self, artist: str, album: str) -> str:
+        """Cover Art Archive URL of the album's best MusicBrainz release.
+
+        The release-group date is left to enrich_tags(), so artwork is not
+        held up by a second rate-limited request.
+        """
+        plan = self.release_plan(artist, self._clean_album(album))
+        ids = self._release_meta_ids(plan)
+        if ids and ids[1]:
+            return f"https://coverartarchive.org/release/{ids[1]}/front-500"
         return ""
 
     def fetch_musicbrainz_release_group_first_date(self, release_group_id: str) -> str:
         """Fetch the earliest known release date for a release group."""
         if not release_group_id:
             return ""
-        _mb_rate_limit()
         url = f"https://musicbrainz.org/ws/2/release-group/{release_group_id}?fmt=json"
-        data = self._make_api_request(url)
+        data = self._rate_limited_request("musicbrainz", url, priority=PRIORITY_TAGS)
         if not data or not isinstance(data, dict):
             return ""
         value = str(data.get("first-release-date", "") or "").strip()
         return value
 
+    def _release_group_date(self, release_group_id: str, album_key: str) -> str:
+        """First release date of a release group, resolved once and cached."""
+        cached = self._release_group_cache.get(release_group_id)
+        if cached is not None:
+            return cached
+        return self._flight.do(
+            ("release-group", release_group_id),
+            self._lookup_release_group_date,
+            release_group_id,
+            album_key,
+        )
+
+    def _lookup_release_group_date(self, release_group_id: str, album_key: str) -> str:
+        cached = self._release_group_cache.get(release_group_id)
+        if cached is not None:
+            return cached
+        started = time.monotonic()
+        date = self.fetch_musicbrainz_release_group_first_date(release_group_id)
+        self.mb_stats.record(album_key, time.monotonic() - started)
+        self._cache_set(self._release_group_cache, release_group_id, date)
+        return date
+
     def enrich_tags(self, metadata: dict[str, Any]) -> None:
         """Fill in missing date/original_date/genre from MusicBrainz release data.
 
-        Uses cached data from fetch_musicbrainz_artwork() — no extra API calls
-        when artwork was already looked up. Only makes a new query if no cached
-        release metadata exists.
+        Reads the release plan fetch_musicbrainz_artwork() already made — no
+        extra search when artwork was looked up. The release-group date is
+        resolved here, once per release group.
         """
         if not metadata.get("playing"):
             return
@@ -1013,56 +3632,22 @@ class MetadataService:
         if not artist or not album:
             return
 
-        # Clean album name: remove truncated parenthetical suffixes
-        # e.g. "Version 2.0 (20th Annivers" → "Version 2.0"
-        clean_album = album
-        if "(" in clean_album and ")" not in clean_album:
-            clean_album = clean_album[: clean_album.rfind("(")].rstrip()
-
+        clean_album = self._clean_album(album)
         cache_key = f"{artist}|{clean_album}"
         cached = self._release_meta_cache.get(cache_key)
-
         if cached is None:
-            # No cached data — trigger a MusicBrainz lookup
-            _mb_rate_limit()
-            query = urllib.parse.quote(f'artist:"{artist}" AND release:"{clean_album}"')
-            url = (
-                f"https://musicbrainz.org/ws/2/release/?query={query}&fmt=json&limit=5"
-            )
-            data = self._make_api_request(url)
-            if data and isinstance(data, dict):
-                for release in data.get("releases", []):
-                    if release.get("score", 0) >= 80:
-                        date = release.get("date", "")
-                        original_date = ""
-                        tags = release.get("tags", [])
-                        genre = tags[0].get("name", "") if tags else ""
-                        release_group = release.get("release-group", {})
-                        release_group_id = (
-                            release_group.get("id", "")
-                            if isinstance(release_group, dict)
-                            else ""
-                        )
-                        if release_group_id:
-                            original_date = (
-                                self.fetch_musicbrainz_release_group_first_date(
-                                    release_group_id
-                                )
-                            )
-                        cached = self._release_meta_cache_value(
-                            date, original_date, genre
-                        )
-                        self._cache_set(self._release_meta_cache, cache_key, cached)
-                        break
-            if cached is None:
+            cached = self.release_plan(artist, clean_album)
+
+        date, original_date, genre = self._parse_release_meta_cache(cached)
+        ids = self._release_meta_ids(cached)
+        if not original_date and ids and ids[0] and not metadata.get("original_date"):
+            original_date = self._release_group_date(ids[0], cache_key)
+            if original_date:
                 self._cache_set(
                     self._release_meta_cache,
                     cache_key,
-                    self._release_meta_cache_value("", "", ""),
+                    self._release_meta_cache_value(date, original_date, genre, *ids),
                 )
-                return
-
-        date, original_date, genre = self._parse_release_meta_cache(cached)
         if not metadata.get("date") and date:
             metadata["date"] = date
         if not metadata.get("original_date") and original_date:
@@ -1091,12 +3676,15 @@ class MetadataService:
         return base_url
 
     def fetch_artist_image(self, artist: str) -> str:
+        return self._flight.do(("artist", artist), self._fetch_artist_image, artist)
+
+    def _fetch_artist_image(self, artist: str) -> str:
         if not artist or artist in self.artist_image_cache:
             return self.artist_image_cache.get(artist, "")
 
         query = urllib.parse.quote(f'artist:"{artist}"')
         url = f"https://musicbrainz.org/ws/2/artist/?query={query}&fmt=json&limit=1"
-        data = self._make_api_request(url)
+        data = self._rate_limited_request("musicbrainz", url)
         if (
             not data
             or not isinstance(data, dict)
@@ -1110,10 +3698,8 @@ class MetadataService:
             self._cache_set(self.artist_image_cache, artist, "")
             return ""
 
-        _mb_rate_limit()
-
         url = f"https://musicbrainz.org/ws/2/artist/{artist_mbid}?inc=url-rels&fmt=json"
-        data = self._make_api_request(url)
+        data = self._rate_limited_request("musicbrainz", url)
         if not data or not isinstance(data, dict):
             self._cache_set(self.artist_image_cache, artist, "")
             return ""
@@ -1123,10 +3709,8 @@ class MetadataService:
             self._cache_set(self.artist_image_cache, artist, "")
             return ""
 
-        _mb_rate_limit()
-
         url = f"https://www.wikidata.org/wiki/Special:EntityData/{wikidata_id}.json"
-        data = self._make_api_request(url)
+        data = self._rate_limited_request("wikidata", url)
         if not data or not isinstance(data, dict):
             self._cache_set(self.artist_image_cache, artist, "")
             return ""
@@ -1150,22 +3734,18 @@ class MetadataService:
 
     def fetch_album_artwork(self, artist: str, album: str) -> tuple[str, str]:
         """Fetch album artwork. Returns (url, source) tuple."""
+        return self._flight.do(
+            ("album", artist, album), self._fetch_album_artwork, artist, album
+        )
+
+    def _fetch_album_artwork(self, artist: str, album: str) -> tuple[str, str]:
         if not artist or not album:
             return "", ""
 
         cache_key = f"{artist}|{album}"
-        if cache_key in self.artwork_cache:
-            cached = self.artwork_cache[cache_key]
-            # Expired failed lookup — retry after 1 hour
-            if cached.startswith("|failed|"):
-                try:
-                    failed_at = int(cached.split("|")[2])
-                    if time.monotonic() - failed_at < 3600:
-                        return "", ""
-                except (IndexError, ValueError):
-                    pass
-                self.artwork_cache.pop(cache_key, None)
-            elif "|" in cached:
+        cached = self.artwork_cache.get(cache_key)
+        if cached is not None:
+            if "|" in cached:
                 url, source = cached.split("|", 1)
                 return url, source
             elif cached:
@@ -1173,23 +3753,31 @@ class MetadataService:
             else:
                 return "", ""
 
-        # Priority: MusicBrainz (album-specific, scored) then iTunes
-        artwork_url = self.fetch_musicbrainz_artwork(artist, album)
-        if artwork_url:
-            self._cache_set(self.artwork_cache, cache_key, f"{artwork_url}|musicbrainz")
-            logger.info("Found MusicBrainz artwork for %s - %s", artist, album)
-            return artwork_url, "musicbrainz"
-
-        artwork_url = self._fetch_itunes_artwork(artist, album)
-        if artwork_url:
-            self._cache_set(self.artwork_cache, cache_key, f"{artwork_url}|itunes")
-            logger.info("Found iTunes artwork for %s - %s", artist, album)
-            return artwork_url, "itunes"
+        # Priority: MusicBrainz (album-specific, scored) then iTunes. A
+        # provider that is down is skipped, and nothing is cached on its
+        # behalf: the album is looked up again once it is back.
+        unavailable: list[str] = []
+        for source, fetch in (
+            ("musicbrainz", self.fetch_musicbrainz_artwork),
+            ("itunes", self._fetch_itunes_artwork),
+        ):
+            try:
+                artwork_url = fetch(artist, album)
+            except ProviderUnavailable as e:
+                unavailable.extend(e.providers)
+                continue
+            if artwork_url:
+                if not unavailable:
+                    self._cache_set(
+                        self.artwork_cache, cache_key, f"{artwork_url}|{source}"
+                    )
+                logger.info("Found %s artwork for %s - %s", source, artist, album)
+                return artwork_url, source
 
+        if unavailable:
+            raise ProviderUnavailable(*unavailable)
         # Cache miss with TTL — retry after 1 hour (don't cache failures forever)
-        self._cache_set(
-            self.artwork_cache, cache_key, f"|failed|{int(time.monotonic())}"
-        )
+        self._cache_set(self.artwork_cache, cache_key, "", ttl=3600)
         return "", ""
 
     def _fetch_itunes_artwork(self, artist: str, album: str) -> str:
@@ -1225,8 +3813,19 @@ class MetadataService:
             cache_key: Optional override for the cache hash. Use when the same
                 URL serves different content (e.g. shairport-sync /cover.jpg).
         """
+        return self._flight.do(
+            ("url", cache_key or url), self._download_artwork, url, cache_key
+        )
+
+    def _download_artwork(self, url: str, cache_key: str) -> str:
+        if not url:
+            return ""
+        # Already stored — answered from memory before any DNS or disk work
         fail_key = cache_key or url
-        if not url or fail_key in self._failed_downloads:
+        cached = self.artwork_store.lookup(fail_key)
+        if cached:
+            return cached
+        if fail_key in self._failed_downloads:
             return ""
 
         parsed = urllib.parse.urlparse(url)
@@ -1235,192 +3834,103 @@ class MetadataService:
             self._mark_failed(fail_key)
             return ""
 
-        # Block private/loopback IPs (SSRF protection)
-        # Exception: allow IPs belonging to this host (snapserver, shairport-sync,
-        # and other co-located services serve artwork on local interfaces).
-        # Resolve once and connect to the resolved IP to prevent DNS rebinding
-        resolved_ip = None
+        breaker = self.providers.for_url(url)
+        if breaker is not None and not breaker.acquire():
+            raise ProviderUnavailable(breaker.name)
+        # SSRF protection lives in the HTTP client: private/loopback/...
+        # addresses are refused unless they belong to this host (snapserver,
+        # shairport-sync and other co-located services serve artwork on local
+        # interfaces), and the connection uses the very addresses checked.
         try:
-            blocked_addr = None
-            for _family, _, _, _, sockaddr in socket.getaddrinfo(
-                parsed.hostname or "", None, socket.AF_UNSPEC
-            ):
-                addr = sockaddr[0]
-                ip = ipaddress.ip_address(addr)
-                if (
-                    ip.is_private
-                    or ip.is_loopback
-                    or ip.is_link_local
-                    or ip.is_multicast
-                    or ip.is_reserved
-                ):
-                    if addr in self._trusted_ips:
-                        logger.debug(f"Allowing artwork from trusted local IP: {addr}")
-                        resolved_ip = addr
-                        break
-                    else:
-                        blocked_addr = addr
-                        break
-                else:
-                    resolved_ip = addr
-                    break
-            if blocked_addr:
-                logger.warning(
-                    f"Blocked artwork download to restricted IP: {blocked_addr}"
-                )
-                self._mark_failed(fail_key)
-                return ""
-        except (socket.gaierror, ValueError, OSError) as e:
-            logger.warning(f"Cannot resolve artwork host {parsed.hostname}: {e}")
+            tmp_path, digest, size = self.http.download_sync(
+                url, self.artwork_dir, self._MAX_ARTWORK_BYTES
+            )
+        except BlockedAddressError as e:
+            logger.warning(f"Blocked artwork download: {e}")
             self._mark_failed(fail_key)
+            if breaker is not None:
+                breaker.release()  # nothing was sent, the probe is still owed
             return ""
+        except Exception as e:
+            logger.error(f"Failed to download artwork from {parsed.hostname}: {e!r}")
+            if not _is_outage(e):
+                self._mark_failed(fail_key)
+                if breaker is not None:
+                    breaker.success()  # it answered, just not with artwork
+            elif breaker is not None:
+                breaker.failure(repr(e))
+                raise ProviderUnavailable(breaker.name) from e
+            # Unreachable: not marked failed, the next play tries again
+            return ""
+        if breaker is not None:
+            breaker.success()
 
         try:
-            url_hash = hashlib.md5((cache_key or url).encode()).hexdigest()
-
-            # Check if already downloaded with any extension
-            for ext in (".jpg", ".png", ".gif", ".webp"):
-                existing = self.artwork_dir / f"artwork_{url_hash}{ext}"
-                if existing.exists() and existing.stat().st_size > 0:
-                    return existing.name
-
-            # Use resolved IP to prevent DNS rebinding (TOCTOU).
-            # Only for HTTP — HTTPS certificate checks protect against rebinding.
-            if resolved_ip and parsed.hostname and parsed.scheme == "http":
-                ip_for_url = f"[{resolved_ip}]" if ":" in resolved_ip else resolved_ip
-                fetch_url = url.replace(parsed.hostname, ip_for_url, 1)
-                req = urllib.request.Request(
-                    fetch_url,
-                    headers={"User-Agent": self.user_agent, "Host": parsed.hostname},
-                )
+            with open(tmp_path, "rb") as f:
+                ext = self._image_extension(f.read(16))
+            if self._fits_as_is(tmp_path, size):
+                filename = self.artwork_store.put_file(fail_key, tmp_path, digest, ext)
             else:
-                req = urllib.request.Request(
-                    url, headers={"User-Agent": self.user_agent}
+                data = tmp_path.read_bytes()
+                tmp_path.unlink()
+                filename = self.artwork_store.put(
+                    fail_key, *self._normalize_artwork(data)
                 )
-            with urllib.request.urlopen(req, timeout=5) as response:
-                data = b""
-                dl_start = time.monotonic()
-                while len(data) < self._MAX_ARTWORK_BYTES:
-                    if time.monotonic() - dl_start > 15:
-                        logger.warning("Artwork download total timeout (15s)")
-                        self._mark_failed(fail_key)
-                        return ""
-                    chunk = response.read(8192)
-                    if not chunk:
-                        break
-                    data += chunk
-
-                if len(data) >= self._MAX_ARTWORK_BYTES:
-                    logger.warning(
-                        f"Artwork exceeded size limit ({self._MAX_ARTWORK_BYTES} bytes)"
-                    )
-                    self._mark_failed(fail_key)
-                    return ""
-
-                if len(data) > 0:
-                    ext = self._image_extension(data)
-                    filename = f"artwork_{url_hash}{ext}"
-                    local_path = self.artwork_dir / filename
-                    tmp_path = local_path.parent / (local_path.name + ".tmp")
-                    with open(tmp_path, "wb") as f:
-                        f.write(data)
-                    tmp_path.rename(local_path)
-                    logger.info(
-                        f"Downloaded artwork ({len(data)} bytes) to {local_path}"
-                    )
-                    return filename
-                else:
-                    logger.warning("Downloaded empty artwork")
-                    self._mark_failed(fail_key)
-                    return ""
-        except Exception as e:
-            logger.error(f"Failed to download artwork: {e}")
+        except OSError as e:
+            logger.error(f"Failed to store artwork: {e}")
+            tmp_path.unlink(missing_ok=True)
             self._mark_failed(fail_key)
-            try:
-                for tmp in self.artwork_dir.glob(f"artwork_{url_hash}*.tmp"):
-                    tmp.unlink(missing_ok=True)
-            except Exception:
-                pass
             return ""
+        logger.info(f"Downloaded artwork ({size} bytes) to {filename}")
+        return filename
 
     # ──────────────────────────────────────────────
     # Playback control (bidirectional)
     # ──────────────────────────────────────────────
 
-    def toggle_playback(self) -> bool:
-        """Toggle play/pause via MPD."""
-        sock = self._create_socket(self.mpd_host, self.mpd_port, log_errors=False)
-        if not sock:
-            return False
-        try:
-            if not self._read_mpd_greeting(sock):
-                return False
-            sock.sendall(b"status\n")
-            status = self._parse_mpd_response(self._read_mpd_response(sock))
-            state = status.get("state", "stop")
-            if state == "play":
-                sock.sendall(b"pause 1\n")
-                logger.info("MPD: paused")
-            else:
-                sock.sendall(b"play\n")
-                logger.info("MPD: playing")
-            self._read_mpd_response(sock)
-            return True
-        except Exception as e:
-            logger.warning(f"MPD playback toggle failed: {e}")
-            return False
-        finally:
-            sock.close()
-
-    def set_client_volume(self, client_id: str, volume: int) -> bool:
-        """Set volume for a specific client (0-100)."""
-        with self._snap_lock:
-            if (
-                self._snap_sock is not None
-                and self._last_snap_response > 0
-                and time.monotonic() - self._last_snap_response
-                > self._snap_stale_threshold
-            ):
-                self._close_snap_socket()
-
-            sock = self._get_snap_socket()
-            if not sock:
-                return False
-
-            status = self.send_rpc_request(sock, "Server.GetStatus")
-            if not status:
-                return False
-
-            server = status.get("result", {}).get("server", {})
-            snap_client_id = None
-            for group in server.get("groups", []):
-                for client in group.get("clients", []):
-                    identifiers = [
-                        client.get("host", {}).get("name", ""),
-                        client.get("config", {}).get("name", ""),
-                        client.get("id", ""),
-                    ]
-                    if self._match_client_id(client_id, identifiers):
-                        snap_client_id = client.get("id")
-                        break
-                if snap_client_id:
-                    break
-
-            if not snap_client_id:
-                logger.warning(f"Client {client_id} not found for volume control")
-                return False
+    def toggle_playback(self) -> bool:
+        """Toggle play/pause via MPD."""
+        try:
+            # Hold the session so no poll slips between status and the toggle
+            with self.mpd.lock:
+                status = self.mpd.command("status")
+                if status.get("state", "stop") == "play":
+                    self.mpd.command("pause 1")
+                    logger.info("MPD: paused")
+                else:
+                    self.mpd.command("play")
+                    logger.info("MPD: playing")
+            return True
+        except (OSError, MpdCommandError) as e:
+            logger.warning(f"MPD playback toggle failed: {e}")
+            return False
 
-            volume = max(0, min(100, volume))
-            params = {
-                "id": snap_client_id,
-                "volume": {"percent": volume, "muted": False},
-            }
-            response = self.send_rpc_request(sock, "Client.SetVolume", params)
-            if response and "result" in response:
-                logger.info(f"Set client {client_id} volume to {volume}%")
-                return True
+    async def set_client_volume(self, client_id: str, volume: int) -> bool:
+        """Set volume for a specific client (0-100)."""
+        server = await self._current_server_status()
+        if not server:
+            return False
+
+        record = self._client_registry(server).lookup(client_id)
+        snap_client_id = record.id if record else None
+        if not snap_client_id:
+            logger.warning(f"Client {client_id} not found for volume control")
             return False
 
+        volume = max(0, min(100, volume))
+        params = {
+            "id": snap_client_id,
+            "volume": {"percent": volume, "muted": False},
+        }
+        response = await self.rpc.request("Client.SetVolume", params)
+        if response and "result" in response:
+            logger.info(f"Set client {client_id} volume to {volume}%")
+            # Keep the shared tree current so the next knob step reads
+            # this volume without another GetStatus.
+            self.server_model.apply("Client.OnVolumeChanged", params)
+            return True
+        return False
+
     # ──────────────────────────────────────────────
     # Source-specific position enrichment
     # ──────────────────────────────────────────────
@@ -1432,9 +3942,7 @@ class MetadataService:
         """
         try:
             url = f"http://{GO_LIBRESPOT_HOST}:{GO_LIBRESPOT_PORT}/status"
-            req = urllib.request.Request(url, headers={"User-Agent": self.user_agent})
-            with urllib.request.urlopen(req, timeout=2) as response:
-                data = json.loads(response.read().decode())
+            data = self.http.get_json_sync(url, timeout=2)
             if data.get("stopped") or data.get("paused"):
                 return None
             track = data.get("track", {})
@@ -1511,9 +4019,11 @@ class MetadataService:
         "artwork",
         "artist_image",
         "artwork_source",
+        "art_data",
+        "art_key",
         "elapsed",
     }
-    _INTERNAL_FIELDS = {"file", "station_name"}
+    _INTERNAL_FIELDS = {"art_data", "art_key", "file", "mpd_album", "station_name"}
 
     def _metadata_changed(self, new: dict, old: dict) -> bool:
         if not old:
@@ -1544,6 +4054,10 @@ class MetadataService:
         artwork = meta.get("artUrl", "")
         if artwork and "://snapcast:" in artwork:
             artwork = artwork.replace("://snapcast:", f"://{self.snapserver_host}:")
+        # Image bytes sent inline by a stream plugin (meta_shairport.py)
+        art_data = meta.get("artData")
+        if not isinstance(art_data, dict) or not isinstance(art_data.get("data"), str):
+            art_data = {}
 
         uri_query = stream.get("uri", {}).get("query", {})
         snap_codec = uri_query.get("codec", "")
@@ -1565,6 +4079,12 @@ class MetadataService:
             "artist": artist,
             "album": meta.get("album", ""),
             "artwork": artwork,
+            "art_data": art_data.get("data", ""),
+            "art_key": (
+                self._inline_artwork_source(art_data["data"])
+                if art_data.get("data")
+                else ""
+            ),
             "stream_id": stream.get("id", ""),
             "source": stream.get("id", ""),
             "codec": snap_codec.upper() if snap_codec else "",
@@ -1584,6 +4104,63 @@ class MetadataService:
             return ""
         return f"http://{get_external_host()}:{HTTP_PORT}/artwork/{filename}"
 
+    @staticmethod
+    def _artwork_cache_key(url: str, metadata: dict[str, Any]) -> str:
+        """download_artwork cache key for a source URL ("" = the URL itself).
+
+        shairport-sync serves every cover at the same /cover.jpg.
+        """
+        if "/cover.jpg" in url and metadata.get("title"):
+            return f"{url}|{metadata.get('title', '')}|{metadata.get('artist', '')}"
+        return ""
+
+    def _stored_artwork(self, metadata: dict[str, Any]) -> dict[str, str]:
+        """The artwork enrich_artwork would settle on, if it is already stored.
+
+        Store index and cache reads only, so a track change can go out with
+        its art without waiting on artwork I/O: no inline decode, no MPD
+        round trip. An MPD track is given its album's art unverified; the
+        enrichment that follows corrects it if the track embeds its own.
+        {} if nothing is stored yet.
+        """
+        if not metadata.get("playing"):
+            return {}
+        name = source = ""
+        url = metadata.get("artwork", "")
+        is_radio = metadata.get("codec") == "RADIO"
+        if metadata.get("art_key"):
+            name, source = self.artwork_store.lookup(metadata["art_key"]), "snapcast"
+        if not name and url:
+            key = self._artwork_cache_key(url, metadata) or url
+            name, source = self.artwork_store.lookup(key), "snapcast"
+        elif not name and metadata.get("source") == "MPD" and not is_radio:
+            file_path = metadata.get("file", "")
+            album = metadata.get("mpd_album", "")
+            if file_path:
+                name = self.artwork_store.lookup(f"mpd:{file_path}")
+            if not name and album:
+                name = self.artwork_store.lookup(album)
+            source = "embedded" if name else ""
+        if not name and not url:
+            cached = ""
+            if is_radio and metadata.get("station_name"):
+                cached = self.artwork_cache.get(f"radio|{metadata['station_name']}")
+                source = "radio-browser"
+            elif metadata.get("artist") and metadata.get("album"):
+                cached = self.artwork_cache.get(
+                    f"{metadata['artist']}|{metadata['album']}"
+                )
+            album_url, _, album_source = (cached or "").partition("|")
+            name = self.artwork_store.lookup(album_url) if album_url else ""
+            source = album_source or source
+        if not name:
+            return {}
+        stored = {"artwork": self._artwork_url(name), "artwork_source": source}
+        placeholder = self.artwork_store.placeholder(name, compute=False)
+        if placeholder:
+            stored["artwork_placeholder"] = placeholder
+        return stored
+
     def enrich_artwork(self, metadata: dict[str, Any]) -> None:
         """Fetch/download artwork for a metadata dict. Mutates in place.
 
@@ -1592,63 +4169,91 @@ class MetadataService:
         2. MusicBrainz Cover Art Archive (album-specific, score >= 80)
         3. iTunes Search API (album-specific, validated)
         4. Radio-Browser logo (radio streams only)
-        5. artist_image (generic artist photo — last resort)
-        6. Default radio placeholder (radio streams only)
+        5. Default radio placeholder (radio streams only)
+
+        The artist photo (and its last-resort use as artwork) is a separate
+        stage, enrich_artist_image — it is the slowest lookup in the chain.
         """
         if not metadata.get("playing"):
             return
 
-        artwork_url = metadata.get("artwork", "")
+        artwork_url = source_artwork = metadata.get("artwork", "")
         artwork_source = "snapcast" if artwork_url else ""
         is_radio = metadata.get("codec") == "RADIO"
 
+        # Artwork bytes the source sent inline beat any URL to fetch them from
+        inline_art = ""
+        if metadata.get("art_data"):
+            inline_art = self.ingest_artwork_data(metadata["art_data"])
+        elif metadata.get("art_key"):
+            # Sent with an earlier flush of this track and stored then
+            inline_art = self.artwork_store.lookup(metadata["art_key"])
+        if inline_art:
+            metadata["artwork"] = self._artwork_url(inline_art)
+            artwork_source = "snapcast"
+            artwork_url = None  # skip further lookups
+
         # For MPD files, try embedded cover art first
         if not artwork_url and metadata.get("source") == "MPD" and not is_radio:
-            mpd_art = self.fetch_mpd_artwork(metadata.get("file", ""))
+            mpd_art = self.fetch_mpd_artwork(
+                metadata.get("file", ""), metadata.get("mpd_album", "")
+            )
             if mpd_art:
                 metadata["artwork"] = self._artwork_url(mpd_art)
                 artwork_source = "embedded"
                 artwork_url = None  # skip further lookups
 
-        if not artwork_url and not metadata.get("artwork"):
-            logger.debug(
-                "No artwork from source for %s - %s (%s), trying fallback",
-                metadata.get("artist"),
-                metadata.get("album"),
-                metadata.get("source"),
-            )
-            if is_radio and metadata.get("station_name"):
-                artwork_url = self.fetch_radio_logo(
-                    metadata["station_name"], metadata.get("file", "")
-                )
-                if artwork_url:
-                    artwork_source = "radio-browser"
-            elif metadata.get("artist") and metadata.get("album"):
-                artwork_url, artwork_source = self.fetch_album_artwork(
-                    metadata["artist"], metadata["album"]
+        # A provider that is down ends the lookups here; the radio default
+        # still applies and the stream retries once the provider is back.
+        try:
+            if not artwork_url and not metadata.get("artwork"):
+                logger.debug(
+                    "No artwork from source for %s - %s (%s), trying fallback",
+                    metadata.get("artist"),
+                    metadata.get("album"),
+                    metadata.get("source"),
                 )
+                if is_radio and metadata.get("station_name"):
+                    artwork_url = self.fetch_radio_logo(
+                        metadata["station_name"], metadata.get("file", "")
+                    )
+                    if artwork_url:
+                        artwork_source = "radio-browser"
+                elif metadata.get("artist") and metadata.get("album"):
+                    artwork_url, artwork_source = self.fetch_album_artwork(
+                        metadata["artist"], metadata["album"]
+                    )
 
-        # Download external artwork locally
-        if artwork_url:
-            cache_key = ""
-            if "/cover.jpg" in artwork_url and metadata.get("title"):
-                cache_key = (
-                    f"{artwork_url}|{metadata.get('title', '')}"
-                    f"|{metadata.get('artist', '')}"
+            # Download external artwork locally
+            if artwork_url:
+                local_file = self.download_artwork(
+                    artwork_url,
+                    cache_key=self._artwork_cache_key(artwork_url, metadata),
+                )
+                metadata["artwork"] = (
+                    self._artwork_url(local_file) if local_file else ""
                 )
-            local_file = self.download_artwork(artwork_url, cache_key=cache_key)
-            metadata["artwork"] = self._artwork_url(local_file) if local_file else ""
 
-        # Fallback: radio logo
-        if not metadata.get("artwork") and is_radio and metadata.get("station_name"):
-            logo_url = self.fetch_radio_logo(
-                metadata["station_name"], metadata.get("file", "")
-            )
-            if logo_url:
-                local_file = self.download_artwork(logo_url)
-                if local_file:
-                    metadata["artwork"] = self._artwork_url(local_file)
-                    artwork_source = "radio-browser"
+            # Fallback: radio logo
+            if (
+                not metadata.get("artwork")
+                and is_radio
+                and metadata.get("station_name")
+            ):
+                logo_url = self.fetch_radio_logo(
+                    metadata["station_name"], metadata.get("file", "")
+                )
+                if logo_url:
+                    local_file = self.download_artwork(logo_url)
+                    if local_file:
+                        metadata["artwork"] = self._artwork_url(local_file)
+                        artwork_source = "radio-browser"
+        except ProviderUnavailable as e:
+            self._provider_unavailable(e)
+            if metadata.get("artwork") == source_artwork:
+                # Never publish a remote URL we could not fetch
+                metadata["artwork"] = ""
+                artwork_source = ""
 
         # Final radio fallback
         if not metadata.get("artwork") and is_radio:
@@ -1657,29 +4262,55 @@ class MetadataService:
             )
             artwork_source = "default"
 
-        # Artist image (not for radio) — download through SSRF-safe pipeline
-        if not is_radio and metadata.get("artist"):
-            artist_image_url = self.fetch_artist_image(metadata["artist"])
-            if artist_image_url:
-                cached = self.download_artwork(artist_image_url)
-                if cached:
-                    artist_image_served = (
-                        f"http://{get_external_host()}:{HTTP_PORT}/artwork/{cached}"
-                    )
-                    metadata["artist_image"] = artist_image_served
-                    # Last resort: use artist_image as artwork if nothing else found
-                    if not metadata.get("artwork"):
-                        logger.info(
-                            "No album artwork for %s - %s, using artist image",
-                            metadata.get("artist"),
-                            metadata.get("album"),
-                        )
-                        metadata["artwork"] = artist_image_served
-                        artwork_source = "artist_image"
-
         metadata["artwork_source"] = artwork_source
+        self._attach_placeholder(metadata)
         self._log_artwork_chain_hit(metadata, artwork_source)
 
+    def enrich_artist_image(self, metadata: dict[str, Any]) -> None:
+        """Add the artist photo; also the artwork of last resort. Mutates in place."""
+        if not metadata.get("playing") or metadata.get("codec") == "RADIO":
+            return
+        if not metadata.get("artist"):
+            return
+        # Download through the SSRF-safe pipeline
+        artist_image_url = self.fetch_artist_image(metadata["artist"])
+        if not artist_image_url:
+            return
+        cached = self.download_artwork(artist_image_url)
+        if not cached:
+            return
+        artist_image_served = self._artwork_url(cached)
+        metadata["artist_image"] = artist_image_served
+        # Last resort: use artist_image as artwork if nothing else found
+        if not metadata.get("artwork"):
+            logger.info(
+                "No album artwork for %s - %s, using artist image",
+                metadata.get("artist"),
+                metadata.get("album"),
+            )
+            metadata["artwork"] = artist_image_served
+            metadata["artwork_source"] = "artist_image"
+            self._attach_placeholder(metadata)
+            self._log_artwork_chain_hit(metadata, "artist_image")
+
+    @staticmethod
+    def _provider_unavailable(e: ProviderUnavailable) -> None:
+        """Note on the running job's ticket that a lookup was cut short."""
+        ticket = _lookup_context.get()[1]
+        if ticket is not None:
+            ticket.unavailable.update(e.providers)
+        logger.debug(f"Lookup skipped, provider unavailable: {e}")
+
+    def _attach_placeholder(self, metadata: dict[str, Any]) -> None:
+        """Set `artwork_placeholder` for artwork served from our store."""
+        artwork = metadata.get("artwork", "")
+        name = artwork.rsplit("/artwork/", 1)[-1] if "/artwork/" in artwork else ""
+        placeholder = self.artwork_store.placeholder(name) if name else None
+        if placeholder:
+            metadata["artwork_placeholder"] = placeholder
+        else:
+            metadata.pop("artwork_placeholder", None)
+
     def _log_artwork_chain_hit(self, metadata: dict[str, Any], source: str) -> None:
         """Emit one INFO log per (stream, track, source) transition; skip snapcast/empty."""
         if not source or source == "snapcast":
@@ -1708,14 +4339,30 @@ class MetadataService:
     # ──────────────────────────────────────────────
 
     async def poll_loop(self) -> None:
-        """Main loop: poll Snapserver, enrich metadata, broadcast to clients."""
-        loop = asyncio.get_running_loop()
+        """Main loop: read Snapserver state, enrich metadata, broadcast to clients.
+
+        Wakes on every snapserver notification (see snapserver_event_loop)
+        and MPD idle event (mpd_idle_loop), and otherwise ticks every
+        POLL_INTERVAL seconds for sources whose position is only available
+        by polling (MPD, go-librespot).
+        """
         consecutive_errors = 0
-        server_info_counter = 0
+        last_server_info = time.monotonic()
+
+        if SNAPSERVER_NOTIFICATIONS and self._event_task is None:
+            self._event_task = asyncio.create_task(self.snapserver_event_loop())
+        if self._mpd_idle_task is None:
+            self._mpd_idle_task = asyncio.create_task(self.mpd_idle_loop())
+        if self._artwork_gc_task is None:
+            self._artwork_gc_task = asyncio.create_task(self.artwork_gc_loop())
+        if self.crawl is not None and self._artwork_crawl_task is None:
+            self._artwork_crawl_task = asyncio.create_task(self.artwork_crawl_loop())
 
         while True:
             try:
-                server = await loop.run_in_executor(None, self.get_server_status)
+                # The poll owns the shared tree: refresh it every cycle
+                # unless notifications are keeping it live.
+                server = await self._current_server_status(max_age=0)
                 if not server:
                     await asyncio.sleep(5)
                     continue
@@ -1725,6 +4372,7 @@ class MetadataService:
                 # AND talking to snapserver" from "container alive, snapserver
                 # silent for N seconds". `time` already imported at module top.
                 self.last_successful_poll_at = time.time()
+                self._last_server = server
 
                 # Rebuild client → stream mapping (only if changed)
                 new_map = self._build_client_stream_map(server)
@@ -1747,123 +4395,56 @@ class MetadataService:
                     elif resolved:
                         sc.stream_id = resolved
 
-                # Process each stream
-                for stream in server.get("streams", []):
-                    stream_id = stream.get("id", "")
-                    if not stream_id:
-                        continue
-
-                    if stream_id not in self.streams:
-                        self.streams[stream_id] = StreamMetadata(stream_id)
-                    sm = self.streams[stream_id]
-
-                    metadata = await loop.run_in_executor(
-                        None, self._extract_stream_metadata, stream
-                    )
-
-                    # Enrich MPD stream with richer metadata
-                    if metadata.get("source") == "MPD":
-                        mpd_meta = await loop.run_in_executor(
-                            None, self.get_mpd_metadata
-                        )
-                        if mpd_meta.get("playing"):
-                            if not mpd_meta.get("title") and mpd_meta.get(
-                                "station_name"
-                            ):
-                                mpd_meta["title"] = mpd_meta["station_name"]
-                            metadata = mpd_meta
-
-                    # Enrich non-MPD streams with position data
-                    if metadata.get("source") != "MPD":
-                        track_key = (
-                            f"{metadata.get('title', '')}|{metadata.get('artist', '')}"
-                        )
-                        is_playing = metadata.get("playing", False) and track_key != "|"
-
-                        if stream_id == "Spotify" and is_playing:
-                            # Accurate position from go-librespot API
-                            spotify_pos = await loop.run_in_executor(
-                                None, self.get_spotify_position
-                            )
-                            if spotify_pos is not None:
-                                metadata["elapsed"] = spotify_pos[0]
-                                metadata["duration"] = spotify_pos[1]
-
-                        # AirPlay, Tidal, etc.: estimate from local clock.
-                        # estimated is None when the track was already playing
-                        # before metadata-service started — we have no reliable
-                        # anchor for "track start" so emitting a wrong elapsed
-                        # would mislead the client UI (progress bar at 0:00
-                        # when the song is half-way through). Drop the field
-                        # entirely so the client renders elapsed as unknown.
-                        estimated = self._estimate_elapsed(
-                            stream_id, track_key, is_playing
+                # Process streams concurrently: the cycle is bounded by the
+                # slowest stream, not the sum of every stream's lookups
+                streams = [st for st in server.get("streams", []) if st.get("id")]
+                results = await asyncio.gather(
+                    *(self._process_stream(st, server) for st in streams),
+                    return_exceptions=True,
+                )
+                failures = [r for r in results if isinstance(r, Exception)]
+                for stream, result in zip(streams, results):
+                    if isinstance(result, Exception):
+                        logger.error(
+                            f"[{stream['id']}] Stream processing failed: {result}"
                         )
-                        if is_playing and metadata.get("elapsed", 0) <= 0:
-                            if estimated is None:
-                                metadata.pop("elapsed", None)
-                            else:
-                                metadata["elapsed"] = estimated
-
-                    # Enrich with artwork and tags
-                    await loop.run_in_executor(None, self.enrich_artwork, metadata)
-                    await loop.run_in_executor(None, self.enrich_tags, metadata)
-
-                    # Check for changes
-                    changed = self._metadata_changed(metadata, sm.current)
-                    volatile_changed = not changed and any(
-                        metadata.get(f) != sm.current.get(f)
-                        for f in self._VOLATILE_FIELDS
-                    )
-
-                    if changed:
-                        title = metadata.get("title", "N/A")
-                        artist = metadata.get("artist", "N/A")
-                        logger.info(f"[{stream_id}] Updated: {title} - {artist}")
-
-                    if changed or volatile_changed:
-                        sm.current = metadata
-                        # Write per-stream metadata.json (atomic)
-                        meta_file = self.artwork_dir / f"metadata_{stream_id}.json"
-                        try:
-                            tmp_file = meta_file.parent / (meta_file.name + ".tmp")
-                            with open(tmp_file, "w") as f:
-                                json.dump(self._output_metadata(metadata), f, indent=2)
-                            tmp_file.rename(meta_file)
-                        except Exception as e:
-                            logger.error(
-                                f"Failed to write metadata for {stream_id}: {e}"
-                            )
-                            try:
-                                tmp_file.unlink(missing_ok=True)
-                            except Exception:
-                                pass
-
-                        # Broadcast to subscribed clients
-                        await self._broadcast_to_stream(stream_id, metadata, server)
+                if failures:
+                    raise failures[0]
 
-                # Send current metadata to clients that just switched streams
+                # Send current metadata to clients that just switched streams,
+                # or whose volume changed since their last message (a paused
+                # or anchored stream has no periodic update to carry it)
                 stream_switch_failures: set[SubscribedClient] = set()
-                for sc in stream_switched_clients:
+                for sc in ws_clients.copy():
+                    if sc.is_stream_subscriber or not sc.stream_id:
+                        continue
+                    switched = sc in stream_switched_clients
+                    volume_info = self._find_client_volume(server, sc.client_id)
+                    volume = (
+                        volume_info.get("percent", 100),
+                        volume_info.get("muted", False),
+                    )
+                    if not switched and sc.volume_sent in (None, volume):
+                        continue
                     sm = self.streams.get(sc.stream_id)
                     if sm and sm.current:
-                        volume_info = self._find_client_volume(server, sc.client_id)
                         output = {
-                            **self._output_metadata(sm.current),
-                            "volume": volume_info.get("percent", 100),
-                            "muted": volume_info.get("muted", False),
+                            **self._stream_output(
+                                sm.stream_id, sm.current, sc.anchored
+                            ),
+                            "volume": volume[0],
+                            "muted": volume[1],
                         }
-                        try:
-                            await sc.websocket.send(json.dumps(output))
-                        except Exception:
+                        if sc.send(json.dumps(output), key="metadata"):
+                            sc.volume_sent = volume
+                        else:
                             stream_switch_failures.add(sc)
                 if stream_switch_failures:
                     async with ws_clients_lock:
                         ws_clients.difference_update(stream_switch_failures)
 
-                server_info_counter += 1
-                if server_info_counter >= 20:  # ~60s at 3s poll interval
-                    server_info_counter = 0
+                if time.monotonic() - last_server_info >= 60:
+                    last_server_info = time.monotonic()
                     await self._broadcast_server_info(server)
 
                 consecutive_errors = 0
@@ -1879,33 +4460,351 @@ class MetadataService:
                     f"Poll loop error ({consecutive_errors}/{_POLL_LOOP_MAX_ERRORS}): {e}"
                 )
 
-            await asyncio.sleep(3)
+            await self._wait_for_state_change(POLL_INTERVAL)
 
-    async def _broadcast_to_stream(
-        self, stream_id: str, metadata: dict, server: dict
-    ) -> None:
-        """Broadcast metadata to all clients subscribed to this stream."""
+    async def _process_stream(self, stream: dict, server: dict) -> None:
+        """Extract and publish one stream's metadata; enrichment follows."""
+        loop = asyncio.get_running_loop()
+        stream_id = stream["id"]
+
+        if stream_id not in self.streams:
+            self.streams[stream_id] = StreamMetadata(stream_id)
+        sm = self.streams[stream_id]
+
+        metadata = await loop.run_in_executor(
+            None, self._extract_stream_metadata, stream
+        )
+
+        # Enrich MPD stream with richer metadata
+        if metadata.get("source") == "MPD":
+            mpd_meta = await loop.run_in_executor(None, self.get_mpd_metadata)
+            if mpd_meta.get("playing"):
+                if not mpd_meta.get("title") and mpd_meta.get("station_name"):
+                    mpd_meta["title"] = mpd_meta["station_name"]
+                metadata = mpd_meta
+
+        # Enrich non-MPD streams with position data
+        if metadata.get("source") != "MPD":
+            track_key = f"{metadata.get('title', '')}|{metadata.get('artist', '')}"
+            is_playing = metadata.get("playing", False) and track_key != "|"
+
+            if stream_id == "Spotify" and is_playing:
+                # Accurate position from go-librespot API
+                spotify_pos = await loop.run_in_executor(
+                    None, self.get_spotify_position
+                )
+                if spotify_pos is not None:
+                    metadata["elapsed"] = spotify_pos[0]
+                    metadata["duration"] = spotify_pos[1]
+
+            # AirPlay, Tidal, etc.: estimate from local clock.
+            # estimated is None when the track was already playing
+            # before metadata-service started — we have no reliable
+            # anchor for "track start" so emitting a wrong elapsed
+            # would mislead the client UI (progress bar at 0:00
+            # when the song is half-way through). Drop the field
+            # entirely so the client renders elapsed as unknown.
+            estimated = self._estimate_elapsed(stream_id, track_key, is_playing)
+            if is_playing and metadata.get("elapsed", 0) <= 0:
+                if estimated is None:
+                    metadata.pop("elapsed", None)
+                else:
+                    metadata["elapsed"] = estimated
+
+        # Inline artwork sent with an earlier flush of this track still
+        # applies to flushes that no longer carry it
+        track = tuple(metadata.get(f, "") for f in ("title", "artist", "album"))
+        if metadata.get("art_key"):
+            sm.inline_art = (track, metadata["art_key"])
+        elif sm.inline_art[0] == track:
+            metadata["art_key"] = sm.inline_art[1]
+
+        # Two-phase publish: the text goes out now with whatever enrichment
+        # this track already has; artwork/tags/artist image resolve in the
+        # background and are pushed as follow-up updates.
+        key = self._enrichment_key(metadata)
+        pending = dict(metadata)
+        if key != sm.enrich_key:
+            if sm.enrich_task is not None:
+                sm.enrich_task.cancel()
+            if sm.lookup_ticket is not None:
+                # Skipped: free the MusicBrainz budget for the new track
+                self.scheduler.cancel(sm.lookup_ticket)
+                sm.lookup_ticket = None
+            sm.enrich_key = key
+            sm.enriched = {}
+            sm.enrich_task = None
+            sm.deferred = set()
+            if metadata.get("source") == "MPD" and metadata.get("file"):
+                # Before this track's own lookups start, so any still queued
+                # for it by the previous round are re-issued at its priority
+                self._start_prefetch()
+            # Art already stored goes out with the text; only a real miss
+            # waits for the enrichment's follow-up update
+            stored = await loop.run_in_executor(None, self._stored_artwork, pending)
+            if sm.enrich_key == key and not sm.enriched:
+                sm.enriched = stored
+        if metadata.get("playing"):
+            # The raw source artwork URL is replaced by its local copy once
+            # downloaded; until then the track goes out without artwork
+            metadata["artwork"] = ""
+        self._apply_enrichment(metadata, sm.enriched)
+
+        # Check for changes
+        changed = self._metadata_changed(metadata, sm.current)
+        volatile_changed = not changed and any(
+            metadata.get(f) != sm.current.get(f)
+            for f in self._VOLATILE_FIELDS - {"elapsed"}
+        )
+        discontinuity = self._update_anchor(sm, metadata, changed)
+
+        if changed:
+            title = metadata.get("title", "N/A")
+            artist = metadata.get("artist", "N/A")
+            logger.info(f"[{stream_id}] Updated: {title} - {artist}")
+
+        if changed or volatile_changed or discontinuity:
+            await self._publish(sm, metadata, server)
+        elif metadata.get("elapsed") != sm.current.get("elapsed"):
+            # Steady-state position tick: only legacy subscribers need it —
+            # anchored ones extrapolate — and it is not worth an SD write.
+            sm.current = metadata
+            await self._broadcast_to_stream(
+                stream_id, metadata, server, elapsed_only=True
+            )
+
+        # Lookups cut short by a provider outage run again as soon as one of
+        # those providers lets a probe through (see CircuitBreaker)
+        if (
+            sm.deferred
+            and sm.enrich_task is not None
+            and sm.enrich_task.done()
+            and self.providers.any_ready(sm.deferred)
+        ):
+            sm.deferred = set()
+            sm.enrich_task = None
+
+        # Paused tracks keep what they have; enrichment starts on first play
+        if metadata.get("playing") and sm.enrich_task is None:
+            sm.lookup_ticket = LookupTicket()
+            sm.enrich_task = asyncio.create_task(
+                self._enrich_stream(sm, key, pending, sm.lookup_ticket)
+            )
+
+    # Fields filled in by the enrichment stages, and the stages themselves in
+    # the order they run: album artwork first (what the displays wait for),
+    # tags next (usually free — the artwork lookup caches release data),
+    # the artist photo last (three rate-limited MusicBrainz/Wikidata calls).
+    _ARTWORK_FIELDS = (
+        "artwork",
+        "artwork_source",
+        "artwork_placeholder",
+        "artist_image",
+    )
+    _TAG_FIELDS = ("date", "original_date", "genre")
+    _ENRICH_STAGES = ("enrich_artwork", "enrich_tags", "enrich_artist_image")
+    _STAGE_PRIORITY = {
+        "enrich_artwork": PRIORITY_ARTWORK,
+        "enrich_tags": PRIORITY_TAGS,
+        "enrich_artist_image": PRIORITY_ARTIST_IMAGE,
+    }
+
+    def _update_anchor(self, sm: StreamMetadata, metadata: dict, changed: bool) -> bool:
+        """Re-anchor the stream's position if it jumped; True when it did.
+
+        A discontinuity is a track/state change (`changed`), a new rate
+        (pause/resume), elapsed appearing or disappearing, or the reported
+        elapsed drifting more than ELAPSED_DRIFT_SEC from the extrapolated
+        anchor (seek, stall).
+        """
+        elapsed = metadata.get("elapsed")
+        if elapsed is None:
+            had_anchor = sm.anchor is not None
+            sm.anchor = None
+            return had_anchor
+        now = time.time()
+        rate = 1.0 if metadata.get("playing") else 0.0
+        if sm.anchor is not None and not changed:
+            anchor_elapsed, anchor_at, anchor_rate = sm.anchor
+            predicted = anchor_elapsed + anchor_rate * (now - anchor_at)
+            if anchor_rate == rate and abs(elapsed - predicted) <= ELAPSED_DRIFT_SEC:
+                return False
+        sm.anchor = (float(elapsed), now, rate)
+        return True
+
+    def _stream_output(self, stream_id: str, metadata: dict, anchored: bool) -> dict:
+        """Client-facing metadata; anchored subscribers also get the anchor."""
         output = self._output_metadata(metadata)
-        clients_to_remove: set[SubscribedClient] = set()
+        sm = self.streams.get(stream_id)
+        if anchored and sm is not None and sm.anchor is not None:
+            anchor_elapsed, anchor_at, rate = sm.anchor
+            output["elapsed"] = round(anchor_elapsed, 3)
+            output["elapsed_at"] = round(anchor_at, 3)
+            output["rate"] = rate
+        return output
+
+    @staticmethod
+    def _enrichment_key(metadata: dict) -> tuple:
+        """Identity of everything the enrichment chain depends on.
+
+        Includes the raw source artwork URL and the hash of inline artwork,
+        so a source that changes its art for the same track gets re-enriched.
+        """
+        return tuple(
+            metadata.get(f, "")
+            for f in (
+                "source",
+                "title",
+                "artist",
+                "album",
+                "artwork",
+                "art_key",
+                "file",
+                "station_name",
+                "codec",
+            )
+        )
+
+    def _apply_enrichment(self, metadata: dict, enriched: dict) -> None:
+        for field in self._ARTWORK_FIELDS:
+            if field in enriched:
+                metadata[field] = enriched[field]
+        # Tags only fill gaps — what the source reports wins
+        for field in self._TAG_FIELDS:
+            if enriched.get(field) and not metadata.get(field):
+                metadata[field] = enriched[field]
+
+    def _run_stage(
+        self, stage: str, metadata: dict, ticket: LookupTicket | None
+    ) -> None:
+        """Run one enrichment stage (in the executor) under its lookup context."""
+        token = _lookup_context.set((self._STAGE_PRIORITY[stage], ticket))
+        try:
+            try:
+                getattr(self, stage)(metadata)
+            except LookupCancelled:
+                if ticket is None or ticket.cancelled:
+                    raise
+                # Joined another stream's in-flight lookup (SingleFlight)
+                # whose track was skipped — ours is still wanted, go again
+                getattr(self, stage)(metadata)
+        finally:
+            _lookup_context.reset(token)
+
+    async def _enrich_stream(
+        self,
+        sm: StreamMetadata,
+        key: tuple,
+        metadata: dict,
+        ticket: LookupTicket | None = None,
+    ) -> None:
+        """Run the enrichment stages for one track, publishing after each.
 
-        for sc in ws_clients.copy():
-            if sc.stream_id != stream_id:
+        `metadata` is a private copy of the raw poll result. Cancelled when
+        the stream moves to another track; a stage already running in the
+        executor then finishes, but its result is dropped by the key check,
+        and its rate-limited requests still queued are dropped via `ticket`.
+        Providers found down along the way are left in `sm.deferred`.
+        """
+        loop = asyncio.get_running_loop()
+        unavailable: set[str] = set()
+        for stage in self._ENRICH_STAGES:
+            try:
+                await loop.run_in_executor(
+                    None, self._run_stage, stage, metadata, ticket
+                )
+            except LookupCancelled:
+                logger.debug(f"[{sm.stream_id}] {stage} dropped: track skipped")
+                return
+            except ProviderUnavailable as e:
+                logger.debug(f"[{sm.stream_id}] {stage} deferred: {e} unavailable")
+                unavailable.update(e.providers)
+                continue
+            except Exception as e:
+                logger.warning(f"[{sm.stream_id}] {stage} failed: {e}")
+                continue
+            if sm.enrich_key != key:
+                return
+            enriched = {
+                f: metadata[f]
+                for f in self._ARTWORK_FIELDS + self._TAG_FIELDS
+                if f in metadata
+            }
+            if enriched == sm.enriched:
                 continue
+            sm.enriched = enriched
+            updated = dict(sm.current)
+            self._apply_enrichment(updated, enriched)
+            if updated != sm.current:
+                await self._publish(sm, updated, self._last_server)
+        if ticket is not None:
+            unavailable |= ticket.unavailable
+        if unavailable and sm.enrich_key == key:
+            sm.deferred = unavailable
+
+    async def _publish(self, sm: StreamMetadata, metadata: dict, server: dict) -> None:
+        """Make `metadata` current: write metadata_<stream>.json, broadcast."""
+        stream_id = sm.stream_id
+        sm.current = metadata
+        # Write per-stream metadata.json (atomic)
+        meta_file = self.artwork_dir / f"metadata_{stream_id}.json"
+        try:
+            tmp_file = meta_file.parent / (meta_file.name + ".tmp")
+            with open(tmp_file, "w") as f:
+                json.dump(self._output_metadata(metadata), f, indent=2)
+            tmp_file.rename(meta_file)
+        except Exception as e:
+            logger.error(f"Failed to write metadata for {stream_id}: {e}")
+            try:
+                tmp_file.unlink(missing_ok=True)
+            except Exception:
+                pass
+
+        # Broadcast to subscribed clients
+        await self._broadcast_to_stream(stream_id, metadata, server)
+
+    async def _broadcast_to_stream(
+        self, stream_id: str, metadata: dict, server: dict, elapsed_only: bool = False
+    ) -> None:
+        """Broadcast metadata to all clients subscribed to this stream.
+
+        The shared payload is serialized once per variant (plain/anchored);
+        room subscribers get their `volume`/`muted` spliced onto that JSON
+        from the client registry (one dict lookup each). Messages are
+        queued on each client's outbox, replacing any unsent metadata
+        frame. `elapsed_only` updates skip anchored subscribers.
+        """
+        targets = [
+            sc
+            for sc in ws_clients.copy()
+            if sc.stream_id == stream_id and not (elapsed_only and sc.anchored)
+        ]
+        if not targets:
+            return
 
+        encoded: dict[bool, str] = {}
+        registry: ClientRegistry | None = None
+        clients_to_remove: set[SubscribedClient] = set()
+        for sc in targets:
+            if sc.anchored not in encoded:
+                encoded[sc.anchored] = json.dumps(
+                    self._stream_output(stream_id, metadata, sc.anchored)
+                )
+            payload = encoded[sc.anchored]
             # Stream subscribers get raw metadata; regular clients get per-client volume
             if sc.is_stream_subscriber:
-                client_output = output
+                if not sc.send(payload, key="metadata"):
+                    clients_to_remove.add(sc)
+                continue
+            if registry is None:
+                registry = self._client_registry(server)
+            volume = registry.volume(sc.client_id)
+            if sc.send(self._with_volume(payload, volume), key="metadata"):
+                sc.volume_sent = (
+                    volume.get("percent", 100),
+                    volume.get("muted", False),
+                )
             else:
-                volume_info = self._find_client_volume(server, sc.client_id)
-                client_output = {
-                    **output,
-                    "volume": volume_info.get("percent", 100),
-                    "muted": volume_info.get("muted", False),
-                }
-
-            try:
-                await sc.websocket.send(json.dumps(client_output))
-            except Exception:
                 clients_to_remove.add(sc)
 
         # Mutate ws_clients under the lock — same invariant as
@@ -1914,6 +4813,17 @@ class MetadataService:
             async with ws_clients_lock:
                 ws_clients.difference_update(clients_to_remove)
 
+    @staticmethod
+    def _with_volume(payload: str, volume: dict) -> str:
+        """Append volume/muted to a serialized metadata object."""
+        suffix = (
+            f'"volume": {json.dumps(volume.get("percent", 100))}, '
+            f'"muted": {json.dumps(bool(volume.get("muted", False)))}}}'
+        )
+        if payload == "{}":
+            return "{" + suffix
+        return payload[:-1] + ", " + suffix
+
     async def handle_control_command(self, client_id: str, message: str) -> None:
         """Handle control commands from a subscribed client."""
         try:
@@ -1929,13 +4839,11 @@ class MetadataService:
                 delta = cmd.get("delta", 0)
                 if isinstance(delta, (int, float)) and delta:
                     # Get current volume, then adjust
-                    server = await loop.run_in_executor(None, self.get_server_status)
+                    server = await self._current_server_status()
                     if server:
                         vol = self._find_client_volume(server, client_id)
                         new_vol = int(max(0, min(100, vol.get("percent", 50) + delta)))
-                        await loop.run_in_executor(
-                            None, self.set_client_volume, client_id, new_vol
-                        )
+                        await self.set_client_volume(client_id, new_vol)
             elif cmd_type == "seek":
                 logger.debug(f"Seek command ignored: {cmd.get('delta')}")
         except json.JSONDecodeError as e:
@@ -1969,24 +4877,23 @@ async def ws_handler(websocket: Any) -> None:
             # Subscription message
             if "subscribe" in data:
                 client_id = str(data["subscribe"])[:256]
+                anchored = data.get("elapsed_mode") == "anchored"
                 # ws_clients is iterated under ws_clients_lock by
                 # _broadcast_server_info; mutate under the same lock so
                 # an iteration in flight cannot raise "Set changed size
                 # during iteration".
                 async with ws_clients_lock:
                     if sc:
+                        sc.close()
                         ws_clients.discard(sc)
-                    sc = SubscribedClient(websocket, client_id)
+                    sc = SubscribedClient(websocket, client_id, anchored=anchored)
                     ws_clients.add(sc)
                 logger.info(f"Client {client_addr} subscribed as '{client_id}'")
 
                 # Resolve stream and send current metadata immediately
                 if _service:
                     stream_id = _service._resolve_client_stream(client_id)
-                    loop = asyncio.get_running_loop()
-                    server = await loop.run_in_executor(
-                        None, _service.get_server_status
-                    )
+                    server = await _service._current_server_status()
                     if stream_id:
                         sc.stream_id = stream_id
                         sm = _service.streams.get(stream_id)
@@ -1997,24 +4904,32 @@ async def ws_handler(websocket: Any) -> None:
                                 else {}
                             )
                             output = {
-                                **_service._output_metadata(sm.current),
+                                **_service._stream_output(
+                                    stream_id, sm.current, anchored
+                                ),
                                 "volume": volume.get("percent", 100),
                                 "muted": volume.get("muted", False),
                             }
-                            await websocket.send(json.dumps(output))
+                            sc.send(json.dumps(output), key="metadata")
+                            sc.volume_sent = (output["volume"], output["muted"])
                     if server:
-                        await websocket.send(
-                            json.dumps(_service._build_server_info(server))
+                        sc.send(
+                            json.dumps(_service._build_server_info(server)),
+                            key="server_info",
                         )
                 continue
 
             # Stream subscription (controller clients — no client-ID resolution, no volume)
             if "subscribe_stream" in data:
                 stream_name = str(data["subscribe_stream"])[:256]
+                anchored = data.get("elapsed_mode") == "anchored"
                 async with ws_clients_lock:
                     if sc:
+                        sc.close()
                         ws_clients.discard(sc)
-                    sc = SubscribedClient(websocket, stream_id_direct=stream_name)
+                    sc = SubscribedClient(
+                        websocket, stream_id_direct=stream_name, anchored=anchored
+                    )
                     ws_clients.add(sc)
                 logger.info(
                     f"Client {client_addr} subscribed to stream '{stream_name}'"
@@ -2026,16 +4941,19 @@ async def ws_handler(websocket: Any) -> None:
                             f"Client {client_addr} subscribed to unknown stream '{stream_name}'"
                         )
                     elif sm.current:
-                        await websocket.send(
-                            json.dumps(_service._output_metadata(sm.current))
+                        sc.send(
+                            json.dumps(
+                                _service._stream_output(
+                                    stream_name, sm.current, anchored
+                                )
+                            ),
+                            key="metadata",
                         )
-                    loop = asyncio.get_running_loop()
-                    server = await loop.run_in_executor(
-                        None, _service.get_server_status
-                    )
+                    server = await _service._current_server_status()
                     if server:
-                        await websocket.send(
-                            json.dumps(_service._build_server_info(server))
+                        sc.send(
+                            json.dumps(_service._build_server_info(server)),
+                            key="server_info",
                         )
                 continue
 
@@ -2047,6 +4965,7 @@ async def ws_handler(websocket: Any) -> None:
         pass
     finally:
         if sc:
+            sc.close()
             async with ws_clients_lock:
                 ws_clients.discard(sc)
         logger.info(f"WebSocket client disconnected: {client_addr}")
@@ -2058,43 +4977,103 @@ async def ws_handler(websocket: Any) -> None:
 
 
 async def handle_artwork(request: web.Request) -> web.StreamResponse:
-    """Serve artwork files from the artwork directory."""
-    filename = request.match_info["filename"]
-    # Sanitize: only allow alphanumeric, dash, underscore, dot
-    if not all(c.isalnum() or c in "-_." for c in filename):
-        return web.Response(status=400, text="Invalid filename")
-    # Prevent path traversal
-    if ".." in filename or "/" in filename:
-        return web.Response(status=400, text="Invalid filename")
+    """Serve artwork from the content-addressed store.
 
-    filepath = ARTWORK_DIR / filename
-    if not filepath.exists():
-        return web.Response(status=404)
+    A blob name is the hash of its bytes, so responses are immutable:
+    clients cache them for a year and revalidate (if ever) with the strong
+    ETag, answered with 304 without touching the file.
 
-    # Only serve image files (prevent leaking metadata_*.json)
-    ext = filepath.suffix.lower()
-    if ext not in {".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg"}:
+    `?size=N` serves a copy scaled to fit N×N. `?format=rgb565|bgra&w=&h=`
+    (optionally `&compress=zlib`) serves raw framebuffer pixels at exactly
+    w×h, for displays that blit them straight into their mmap.
+    """
+    filename = request.match_info["filename"]
+    # Only store-issued names are served (also rules out path traversal and
+    # metadata_*.json / the lookup database living in the same directory)
+    store = _service.artwork_store if _service else None
+    if store is None or filename not in store:
         return web.Response(status=404)
 
-    # Detect content type
     content_types = {
         ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
         ".png": "image/png",
         ".gif": "image/gif",
         ".webp": "image/webp",
-        ".svg": "image/svg+xml",
     }
-    content_type = content_types.get(ext, "application/octet-stream")
 
-    return web.FileResponse(
-        filepath,
-        headers={
-            "Content-Type": content_type,
-            "Cache-Control": "public, max-age=3600",
-            "Access-Control-Allow-Origin": "*",
-        },
-    )
+    def int_arg(key: str, high: int) -> int | None:
+        value = request.query.get(key, "")
+        if (
+            value.isdigit()
+            and len(value) <= 6
+            and ARTWORK_MIN_VARIANT <= int(value) <= high
+        ):
+            return int(value)
+        return None
+
+    etag = store.etag(filename)
+    path = store.directory / filename
+    # (single-flight key, generator, *args) when a variant is requested
+    variant_call: tuple | None = None
+    fmt = request.query.get("format", "")
+    if fmt:
+        width = int_arg("w", ARTWORK_RAW_MAX_DIMENSION)
+        height = int_arg("h", ARTWORK_RAW_MAX_DIMENSION)
+        compress = request.query.get("compress", "")
+        if (
+            fmt not in store.RAW_FORMATS
+            or width is None
+            or height is None
+            or compress not in ("", "zlib")
+        ):
+            return web.Response(status=400, text="Invalid raw artwork request")
+        if Image is None:
+            return web.Response(status=501, text="Raw artwork needs Pillow")
+        spec = f"{width}x{height}-{fmt}" + ("-zlib" if compress else "")
+        etag = f'{etag[:-1]}-{spec}"'
+        variant_call = (
+            ("raw", filename, spec),
+            store.raw_variant,
+            filename,
+            fmt,
+            width,
+            height,
+            bool(compress),
+        )
+    elif "size" in request.query:
+        size = int_arg("size", 999_999)
+        if size is None:
+            return web.Response(status=400, text="Invalid size")
+        # Stored originals are already bounded by ARTWORK_MAX_DIMENSION: a
+        # display asking for a larger panel gets that
+        size = min(size, ARTWORK_MAX_DIMENSION)
+        etag = f'{etag[:-1]}-{size}"'
+        variant_call = (("variant", filename, size), store.variant, filename, size)
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "ETag": etag,
+        "Access-Control-Allow-Origin": "*",
+    }
+    store.touch(filename)
+    if_none_match = request.headers.get("If-None-Match", "")
+    if etag in if_none_match or if_none_match.strip() == "*":
+        return web.Response(status=304, headers=headers)
+
+    loop = asyncio.get_running_loop()
+    try:
+        if variant_call:
+            # Concurrent requests for the same variant share one conversion
+            variant = await loop.run_in_executor(
+                None, _service._flight.do, *variant_call
+            )
+            path = variant or path
+        # Not FileResponse: it replaces our ETag with an mtime/size one
+        body = await loop.run_in_executor(None, path.read_bytes)
+    except Exception as e:
+        logger.warning(f"Cannot serve artwork {filename}: {e}")
+        return web.Response(status=404)
+    headers["Content-Type"] = content_types.get(path.suffix, "application/octet-stream")
+    return web.Response(body=body, headers=headers)
 
 
 async def handle_defaults(request: web.Request) -> web.StreamResponse:
@@ -2172,7 +5151,12 @@ async def handle_health(request: web.Request) -> web.Response:
     base = {
         "status": "ok",
         "version": os.environ.get("SNAPMULTI_VERSION", "unknown"),
-        "capabilities": ["subscribe_stream", "server_info"],
+        "capabilities": [
+            "subscribe_stream",
+            "server_info",
+            "elapsed_anchored",
+            *(["artwork_size", "artwork_raw"] if Image is not None else []),
+        ],
     }
 
     if _service is None:
@@ -2242,24 +5226,14 @@ async def handle_version(request: web.Request) -> web.Response:
         # Claim the slot before await to prevent concurrent API calls (TOCTOU).
         _latest_version_cache["checked_at"] = time.time()
         try:
-            import aiohttp as _aiohttp
-
-            async with _aiohttp.ClientSession() as session:
-                async with session.get(
-                    "https://api.github.com/repos/lollonet/snapMULTI/releases/latest",
-                    timeout=_aiohttp.ClientTimeout(total=10),
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        latest = data.get("tag_name", "").lstrip("v")
-                        _latest_version_cache["version"] = latest
-                    else:
-                        logger.debug(
-                            "GitHub API returned %d for version check", resp.status
-                        )
-                        _latest_version_cache["checked_at"] = (
-                            0.0  # reset so next call retries
-                        )
+            if _service is None:
+                raise RuntimeError("service not running")
+            data = await _service.http.get_json(
+                "https://api.github.com/repos/lollonet/snapMULTI/releases/latest",
+                timeout=10,
+            )
+            latest = data.get("tag_name", "").lstrip("v")
+            _latest_version_cache["version"] = latest
         except Exception as exc:
             logger.debug("Version check failed: %s", exc)
             _latest_version_cache["checked_at"] = 0.0  # reset so next call retries
@@ -2369,7 +5343,18 @@ def _parse_snapcast_clients(rpc_result: dict) -> list[dict]:
 
 
 async def _fetch_snapcast_clients(timeout_s: float = 3.0) -> list[dict] | None:
-    """POST `Server.GetStatus` to localhost snapserver; return clients or None on error."""
+    """Snapcast clients for /status, or None when snapserver is unreachable.
+
+    Read from the running service's shared server tree (refreshed if older
+    than the cache TTL); only without a service does this POST
+    `Server.GetStatus` to the localhost HTTP endpoint itself.
+    """
+    if _service is not None:
+        server = await _service._current_server_status(
+            max_age=_SNAPCLIENTS_CACHE_TTL_SECONDS
+        )
+        return _parse_snapcast_clients({"server": server}) if server else None
+
     now = time.time()
     cached = _snapclients_cache.get("data")
     if cached is not None and (now - cached[0]) < _SNAPCLIENTS_CACHE_TTL_SECONDS:
@@ -2459,6 +5444,122 @@ def _render_snapcast_clients_section(clients: list[dict] | None) -> str:
     )
 
 
+def _render_artwork_cache_section(stats: dict | None) -> str:
+    """Render the Artwork Cache section: usage against quota and evictions.
+
+    Empty string without stats (no running service). Over quota is only
+    possible when every remaining image is currently published, so it is a
+    warning rather than a failure.
+    """
+    if stats is None:
+        return ""
+    mib = 1024 * 1024
+    over = stats["bytes"] > stats["max_bytes"] or stats["files"] > stats["max_files"]
+    icon_class, icon = ("warn", "⚠") if over else ("pass", "✓")
+    if stats["collected_at"]:
+        last_run = datetime.fromtimestamp(stats["collected_at"]).strftime("%H:%M")
+    else:
+        last_run = "not yet"
+    rows = [
+        f'<li class="r-{icon_class}"><span class="icon">{icon}</span>'
+        f"{stats['files']} / {stats['max_files']} files · "
+        f"{stats['bytes'] / mib:.1f} / {stats['max_bytes'] / mib:.0f} MB</li>",
+        '<li class="r-info"><span class="icon">ℹ</span>'
+        f"Evicted since start: {stats['evicted_files']} files · "
+        f"{stats['evicted_bytes'] / mib:.1f} MB · last collection {last_run}</li>",
+    ]
+    return f"<section><h2>Artwork Cache</h2><ul>{''.join(rows)}</ul></section>"
+
+
+def _render_musicbrainz_section(stats: dict | None) -> str:
+    """Render the MusicBrainz section: requests and time per album looked up.
+
+    Empty string without stats (no running service) or before the first
+    lookup. Time includes waiting for the provider's rate-limit slot.
+    """
+    if not stats or not stats["albums"]:
+        return ""
+    rows = [
+        '<li class="r-info"><span class="icon">ℹ</span>'
+        f"{stats['albums']} albums · {stats['requests']} requests · "
+        f"{stats['requests'] / stats['albums']:.1f} requests and "
+        f"{stats['seconds'] / stats['albums']:.1f} s per album</li>"
+    ]
+    for entry in stats["recent"]:
+        album = html.escape(entry["album"].replace("|", " — "))
+        rows.append(
+            '<li class="r-info"><span class="icon">·</span>'
+            f"{album}: {entry['requests']} requests · {entry['seconds']:.1f} s</li>"
+        )
+    return f"<section><h2>MusicBrainz</h2><ul>{''.join(rows)}</ul></section>"
+
+
+def _render_providers_section(stats: dict | None) -> str:
+    """Render the Metadata Providers section: one circuit breaker per row.
+
+    Empty string without stats (no running service). An open breaker is a
+    warning — lookups skip that provider and retry when it comes back.
+    """
+    if stats is None:
+        return ""
+    rows = []
+    for name, b in stats.items():
+        if b["state"] == CircuitBreaker.CLOSED:
+            icon_class, icon, text = "pass", "✓", "reachable"
+        elif b["state"] == CircuitBreaker.HALF_OPEN:
+            icon_class, icon, text = "info", "ℹ", "probing"
+        else:
+            icon_class, icon = "warn", "⚠"
+            text = (
+                f"unreachable, next try in {b['retry_in']:.0f}s · "
+                f"{html.escape(b['last_error'])}"
+            )
+        if b["trips"]:
+            text += f" · down {b['trips']}× since start"
+        if b["short_circuited"]:
+            text += f", {b['short_circuited']} lookups skipped"
+        rows.append(
+            f'<li class="r-{icon_class}"><span class="icon">{icon}</span>'
+            f"{html.escape(name)}: {text}</li>"
+        )
+    return f"<section><h2>Metadata Providers</h2><ul>{''.join(rows)}</ul></section>"
+
+
+def _render_library_crawl_section(stats: dict | None) -> str:
+    """Render the Library Artwork section: progress of the MPD crawl.
+
+    Empty string when the crawl is disabled (MPD_ARTWORK_CRAWL unset).
+    """
+    if stats is None:
+        return ""
+    state = stats["state"]
+    if state == "complete":
+        icon_class, icon = "pass", "✓"
+    elif state.startswith("paused") or state.startswith("waiting"):
+        icon_class, icon = "warn", "⚠"
+    else:
+        icon_class, icon = "info", "ℹ"
+    rows = [
+        f'<li class="r-{icon_class}"><span class="icon">{icon}</span>'
+        f"{html.escape(state.capitalize())} · {stats['scanned']} folders scanned, "
+        f"{stats['stored']} with artwork</li>"
+    ]
+    if stats["current"] and state == "running":
+        rows.append(
+            '<li class="r-info"><span class="icon">·</span>'
+            f"Now: {html.escape(stats['current'])}</li>"
+        )
+    if stats["finished_at"]:
+        finished = datetime.fromtimestamp(stats["finished_at"]).strftime(
+            "%Y-%m-%d %H:%M"
+        )
+        rows.append(
+            '<li class="r-info"><span class="icon">ℹ</span>'
+            f"Last full pass finished {finished}</li>"
+        )
+    return f"<section><h2>Library Artwork</h2><ul>{''.join(rows)}</ul></section>"
+
+
 _PROFILE_SERVICE_LIMITS: tuple[tuple[str, str], ...] = (
     ("snapserver", "SNAPSERVER_MEM_LIMIT"),
     ("airplay", "AIRPLAY_MEM_LIMIT"),
@@ -2772,6 +5873,10 @@ def _status_to_html(
     age_s: float | None,
     snapclients: list[dict] | None = None,
     show_snapclients: bool = False,
+    artwork_stats: dict | None = None,
+    musicbrainz_stats: dict | None = None,
+    provider_stats: dict | None = None,
+    crawl_stats: dict | None = None,
 ) -> str:
     """Render the snapshot to a beginner-friendly HTML page.
 
@@ -2971,6 +6076,10 @@ def _status_to_html(
     # already in the Compose / Snapcast sections.
     if show_snapclients:
         sec_html_parts.append(_render_snapcast_clients_section(snapclients))
+    sec_html_parts.append(_render_artwork_cache_section(artwork_stats))
+    sec_html_parts.append(_render_musicbrainz_section(musicbrainz_stats))
+    sec_html_parts.append(_render_providers_section(provider_stats))
+    sec_html_parts.append(_render_library_crawl_section(crawl_stats))
 
     # NOTE: the Resource Profile section was folded into Containers above —
     # _render_resource_profile_section() is still exported for the unit test
@@ -3185,7 +6294,14 @@ async def handle_status(request: web.Request) -> web.Response:
     # placeholder — no point doing the RPC then).
     snapclients = await _fetch_snapcast_clients() if data is not None else None
     body = _status_to_html(
-        data, age_s, snapclients=snapclients, show_snapclients=data is not None
+        data,
+        age_s,
+        snapclients=snapclients,
+        show_snapclients=data is not None,
+        artwork_stats=_service.artwork_store.stats() if _service else None,
+        musicbrainz_stats=_service.mb_stats.stats() if _service else None,
+        provider_stats=_service.providers.stats() if _service else None,
+        crawl_stats=_service.crawl.stats() if _service and _service.crawl else None,
     )
     return web.Response(
         text=body,
@@ -3324,7 +6440,7 @@ async def main() -> None:
     global _service
 
     # Clean stale metadata and orphaned tmp files from previous session
-    for pattern in ("metadata_*.json", "*.tmp"):
+    for pattern in ("metadata_*.json", "*.tmp", "variants/*.tmp"):
         for f in ARTWORK_DIR.glob(pattern):
             try:
                 f.unlink()
@@ -3333,6 +6449,7 @@ async def main() -> None:
                 pass
 
     _service = MetadataService()
+    _service.http.bind(asyncio.get_running_loop())
 
     logger.info("Starting snapMULTI Metadata Service")
     logger.info(f"  Snapserver: {SNAPSERVER_HOST}:{SNAPSERVER_RPC_PORT}")
@@ -3373,7 +6490,10 @@ async def main() -> None:
     logger.info(f"HTTP server listening on port {HTTP_PORT}")
 
     # Start polling loop
-    await _service.poll_loop()
+    try:
+        await _service.poll_loop()
+    finally:
+        await _service.http.close()
 
 
 async def _async_main() -> None:
@@ -21,17 +21,26 @@ from typing import Any
 
 METADATA_PIPE = os.environ.get("METADATA_PIPE", "/audio/shairport-metadata")
 COVER_ART_PORT = int(os.environ.get("COVER_ART_PORT", "5858"))
+# Cover art goes to snapserver inline as base64 `artData` (snapserver serves
+# it over its own HTTP and the metadata service stores the bytes directly).
+# "0" falls back to /tmp/cover.jpg served on COVER_ART_PORT as `artUrl`.
+COVER_ART_INLINE = os.environ.get("COVER_ART_INLINE", "1") == "1"
 
 metadata: dict[str, str | list[str] | float] = {
     "artist": [],
     "album": "",
     "title": "",
     "artUrl": "",
+    "artData": {},
     "duration": 0.0,
     "genre": [],
     "composer": [],
 }
 cover_art_path = "/tmp/cover.jpg"
+# base64 of the last artData sent: snapserver keeps the metadata it got and
+# echoes it to every control client, so the picture only goes out when it
+# changes, not with every flush
+sent_art_data = ""
 
 
 def send(msg: dict) -> None:
@@ -57,6 +66,7 @@ def log(level: str, msg: str) -> None:
 
 def send_metadata() -> None:
     """Send current metadata to snapserver."""
+    global sent_art_data
     props: dict[str, str | list[str] | float] = {}
     if metadata["title"]:
         props["title"] = metadata["title"]
@@ -66,6 +76,10 @@ def send_metadata() -> None:
         props["album"] = metadata["album"]
     if metadata["artUrl"]:
         props["artUrl"] = metadata["artUrl"]
+    art_data = metadata.get("artData") or {}
+    if art_data and art_data["data"] != sent_art_data:
+        props["artData"] = art_data
+    sent_art_data = art_data.get("data", "")
     if metadata["duration"]:
         props["duration"] = metadata["duration"]
     if metadata["genre"]:
@@ -160,6 +174,16 @@ def parse_item(item_data: bytes) -> None:
         metadata["genre"] = [data]
     elif code == "ascp" and isinstance(data, str) and data:
         metadata["composer"] = [data]
+    elif (
+        code == "PICT"
+        and isinstance(data, bytes)
+        and len(data) > 0
+        and COVER_ART_INLINE
+    ):
+        metadata["artData"] = {
+            "data": base64.b64encode(data).decode("ascii"),
+            "extension": "png" if data.startswith(b"\x89PNG") else "jpg",
+        }
     elif code == "PICT" and isinstance(data, bytes) and len(data) > 0:
         try:
             tmp_path = str(cover_art_path) + ".tmp"
@@ -190,6 +214,7 @@ def parse_item(item_data: bytes) -> None:
     elif code == "pend":
         metadata["artist"], metadata["album"] = [], ""
         metadata["title"], metadata["artUrl"], metadata["duration"] = "", "", 0.0
+        metadata["artData"] = {}
         metadata["genre"], metadata["composer"] = [], []
         send_metadata()
 
@@ -275,9 +300,10 @@ def main() -> None:
     send({"jsonrpc": "2.0", "method": "Plugin.Stream.Ready"})
 
     # Start cover art server in background (this one can be a daemon thread)
-    cover_thread = Thread(target=start_cover_server, daemon=True)
-    cover_thread.start()
-    log("info", f"Cover server started on port {COVER_ART_PORT}")
+    if not COVER_ART_INLINE:
+        cover_thread = Thread(target=start_cover_server, daemon=True)
+        cover_thread.start()
+        log("info", f"Cover server started on port {COVER_ART_PORT}")
 
     # Buffers with safety caps to prevent unbounded growth
     stdin_buffer = ""
@@ -33,8 +33,10 @@ def _reset_module_state():
         "genre": [],
         "composer": [],
         "artUrl": "",
+        "artData": {},
         "duration": 0.0,
     }
+    meta_shairport.sent_art_data = ""
     yield
 
 
@@ -159,6 +159,59 @@ class TestParseItem:
         assert meta_shairport.metadata["genre"] == []
         assert meta_shairport.metadata["composer"] == []
 
+    def test_cover_art_sent_inline(self, capture_stdout):
+        png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 16
+        meta_shairport.parse_item(_xml_item("50494354", _b64_bytes(png)))  # 'PICT'
+        assert meta_shairport.metadata["artData"] == {
+            "data": _b64_bytes(png),
+            "extension": "png",
+        }
+        assert meta_shairport.metadata["artUrl"] == ""
+
+        meta_shairport.metadata["title"] = "Idioteque"
+        meta_shairport.send_metadata()
+        props = [
+            m
+            for m in capture_stdout
+            if m.get("method") == "Plugin.Stream.Player.Properties"
+        ]
+        assert props[0]["params"]["metadata"]["artData"]["extension"] == "png"
+
+        meta_shairport.parse_item(_xml_item("70656e64"))  # 'pend'
+        assert meta_shairport.metadata["artData"] == {}
+
+    def test_cover_art_sent_only_when_it_changes(self, capture_stdout):
+        def flushes():
+            return [
+                m["params"]["metadata"]
+                for m in capture_stdout
+                if m.get("method") == "Plugin.Stream.Player.Properties"
+            ]
+
+        png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 16
+        meta_shairport.metadata["title"] = "Idioteque"
+        meta_shairport.parse_item(_xml_item("50494354", _b64_bytes(png)))
+        meta_shairport.send_metadata()
+        meta_shairport.send_metadata()  # same picture: text only
+        assert ["artData" in f for f in flushes()] == [True, False]
+
+        # After playback ends the same picture is news again
+        meta_shairport.parse_item(_xml_item("70656e64"))  # 'pend'
+        meta_shairport.metadata["title"] = "Idioteque"
+        meta_shairport.parse_item(_xml_item("50494354", _b64_bytes(png)))
+        meta_shairport.send_metadata()
+        assert "artData" in flushes()[-1]
+
+    def test_cover_art_served_over_http_when_not_inline(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(meta_shairport, "COVER_ART_INLINE", False)
+        monkeypatch.setattr(meta_shairport, "cover_art_path", str(tmp_path / "c.jpg"))
+        monkeypatch.setenv("COVER_ART_HOST", "10.0.0.42")
+        jpeg = b"\xff\xd8\xff" + b"\x00" * 16
+        meta_shairport.parse_item(_xml_item("50494354", _b64_bytes(jpeg)))
+        assert (tmp_path / "c.jpg").read_bytes() == jpeg
+        assert meta_shairport.metadata["artUrl"] == "http://10.0.0.42:5858/cover.jpg"
+        assert meta_shairport.metadata["artData"] == {}
+
     def test_mden_triggers_send(self, capture_stdout):
         # mden = metadata ended → flush via send_metadata
         meta_shairport.metadata["title"] = "Now Playing"
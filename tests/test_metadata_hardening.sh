@@ -8,7 +8,8 @@
 #   `await loop.run_in_executor()` so there's no actual concurrency.
 #   Adding a threading.Lock around _cache_set + _mark_failed prevents
 #   future code (e.g. asyncio.gather) from corrupting the OrderedDict
-#   internal doubly-linked list.
+#   internal doubly-linked list. Both now write through LookupCache,
+#   whose in-memory OrderedDict is mutated only under the same lock.
 #
 # Bug 3 — fuzzy match removed; "Sala" / "Sala Grande" no longer collide.
 #   The previous \b-bounded fuzzy matched "Sala" inside "Sala Grande"
@@ -20,7 +21,8 @@
 #   _resolve_client_stream was hardened, but _find_client_volume and
 #   set_client_volume kept `client_id in i or i in client_id` substring
 #   matching — so volume routing could still hit the wrong room. Fix:
-#   shared `_match_client_id` helper used by all three call sites.
+#   both go through `ClientRegistry.lookup`, an exact-match index that
+#   applies the same `snapclient-` prefix rule.
 #
 # Bug 4 — MusicBrainz rate limiter releases lock before sleeping.
 #   Old code held threading.Lock during time.sleep(1.1), serialising
@@ -51,11 +53,17 @@ echo "=== Bug 1 — defensive cache lock ==="
 assert 'grep -qE "^_cache_lock = threading\\.Lock\\(\\)" "$SVC"' \
        '_cache_lock module-level threading.Lock declared'
 
-assert 'grep -A 10 "def _cache_set" "$SVC" | grep -qE "with _cache_lock:"' \
-       '_cache_set acquires _cache_lock'
+assert 'grep -A 10 "def _cache_set" "$SVC" | grep -qF "cache.set(key, value"' \
+       '_cache_set writes through LookupCache.set'
 
-assert 'grep -A 10 "def _mark_failed" "$SVC" | grep -qE "with _cache_lock:"' \
-       '_mark_failed acquires _cache_lock'
+assert 'grep -A 4 "def _mark_failed" "$SVC" | grep -qF "self._cache_set(self._failed_downloads"' \
+       '_mark_failed writes through _cache_set'
+
+assert 'grep -A 6 "def _remember" "$SVC" | grep -qE "with _cache_lock:"' \
+       'LookupCache._remember acquires _cache_lock'
+
+assert 'grep -A 3 "def pop" "$SVC" | grep -qE "with _cache_lock:"' \
+       'LookupCache.pop acquires _cache_lock'
 
 echo
 echo "=== Bug 3 — fuzzy match removed ==="
@@ -125,19 +133,24 @@ fi
 echo
 echo "=== Bug 3b — volume routing uses exact match ==="
 
-assert 'grep -qE "def _match_client_id\\(" "$SVC"' \
-       '_match_client_id helper defined'
+registry_block=$(grep -A 60 "^class ClientRegistry" "$SVC")
+
+assert 'echo "$registry_block" | grep -qE "def lookup\\(self, client_id"' \
+       'ClientRegistry.lookup defined'
+
+assert 'echo "$registry_block" | grep -qF "snapclient-"' \
+       'ClientRegistry.lookup handles snapclient- prefix'
 
-# All three call sites must use the helper. Substring matching anywhere
-# below would let "Sala" hit "Sala Grande" on the volume path.
+# Both volume paths must resolve through the registry. Substring matching
+# anywhere below would let "Sala" hit "Sala Grande" on the volume path.
 find_vol_block=$(grep -A 20 "def _find_client_volume" "$SVC")
-set_vol_block=$(grep -A 30 "    def set_client_volume" "$SVC")
+set_vol_block=$(grep -A 30 "def set_client_volume" "$SVC")
 
-assert 'echo "$find_vol_block" | grep -qF "_match_client_id(client_id"' \
-       '_find_client_volume uses _match_client_id helper'
+assert 'echo "$find_vol_block" | grep -qF "_client_registry(server).volume(client_id"' \
+       '_find_client_volume resolves through the client registry'
 
-assert 'echo "$set_vol_block" | grep -qF "_match_client_id(client_id"' \
-       'set_client_volume uses _match_client_id helper'
+assert 'echo "$set_vol_block" | grep -qF "_client_registry(server).lookup(client_id"' \
+       'set_client_volume resolves through the client registry'
 
 assert '! echo "$find_vol_block" | grep -qE "client_id in i or i in client_id"' \
        '_find_client_volume no longer substring-matches'
@@ -186,26 +199,34 @@ else
 fi
 
 echo
-echo "=== Bug 4 — MB rate limiter releases lock before sleep ==="
-
-mb_block=$(grep -A 20 "^def _mb_rate_limit" "$SVC")
-
-# The slot must be reserved under the lock by forward-dating the timestamp.
-assert 'echo "$mb_block" | grep -qF "_mb_last_request = now + wait"' \
-       'rate limiter forward-dates _mb_last_request to reserve slot'
-
-# Sleep MUST be outside the lock block (after the `with _mb_lock:` closes).
-sleep_lineno=$(grep -nE "^[[:space:]]*time\\.sleep\\(wait\\)" "$SVC" | head -1 | cut -d: -f1)
-lock_close_lineno=$(awk '
-    /^def _mb_rate_limit/ {in_func=1}
-    in_func && /^[[:space:]]+with _mb_lock:/ {start=NR; in_block=1; next}
-    in_func && in_block && /^[[:space:]]{0,4}[a-zA-Z]/ {print NR-1; exit}
+echo "=== Bug 4 — MB rate limiter never sleeps holding the lock ==="
+
+assert 'grep -q "^class RateScheduler" "$SVC"' \
+       'RateScheduler replaces the module-level MB limiter'
+assert '! grep -q "_mb_rate_limit" "$SVC"' \
+       'no leftover _mb_rate_limit callers'
+assert 'grep -qE "^PROVIDER_INTERVALS = .*\"wikidata\"" "$SVC"' \
+       'Wikidata has its own rate bucket'
+
+# The dispatcher waits on the condition (which releases the lock) and runs the
+# request only after leaving the `with self._cond:` block.
+dispatch_block=$(awk '
+    /^    def _dispatch\(/ {in_func=1; next}
+    in_func && /^    def |^class / {exit}
+    in_func {print}
 ' "$SVC")
-if [[ -n "$sleep_lineno" && -n "$lock_close_lineno" && "$sleep_lineno" -gt "$lock_close_lineno" ]]; then
-    echo "  PASS: time.sleep(wait) at line $sleep_lineno is AFTER lock closes at line $lock_close_lineno"
+wait_lineno=$(echo "$dispatch_block" | grep -n "self\._cond\.wait(" | head -1 | cut -d: -f1)
+run_lineno=$(echo "$dispatch_block" | grep -n "request\.fn(" | head -1 | cut -d: -f1)
+lock_close_lineno=$(echo "$dispatch_block" | awk '
+    /^[[:space:]]+with self\._cond:/ {match($0, /^ */); indent=RLENGTH; in_block=1; next}
+    in_block && /[^[:space:]]/ {match($0, /^ */); if (RLENGTH <= indent) {print NR-1; exit}}
+')
+if [[ -n "$wait_lineno" && -n "$run_lineno" && -n "$lock_close_lineno" \
+      && "$wait_lineno" -lt "$lock_close_lineno" && "$run_lineno" -gt "$lock_close_lineno" ]]; then
+    echo "  PASS: dispatcher waits on the condition and runs the request after the lock closes"
     pass=$((pass + 1))
 else
-    echo "  FAIL: sleep ordering wrong (sleep=$sleep_lineno, lock_close=$lock_close_lineno)"
+    echo "  FAIL: dispatch ordering wrong (wait=$wait_lineno, run=$run_lineno, lock_close=$lock_close_lineno)"
     fail=$((fail + 1))
 fi
 
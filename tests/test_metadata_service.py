@@ -9,6 +9,12 @@ from pathlib import Path
 
 import pytest
 
+try:  # the fixture stubs aiohttp; HttpClient tests need the real one
+    import aiohttp as real_aiohttp
+    from aiohttp import web as real_web
+except ImportError:
+    real_aiohttp = real_web = None
+
 
 MODULE_PATH = (
     Path(__file__).resolve().parent.parent
@@ -89,34 +95,55 @@ def metadata_service_module(monkeypatch, tmp_path):
 
 @pytest.fixture()
 def service(metadata_service_module, monkeypatch):
-    monkeypatch.setattr(metadata_service_module, "_mb_rate_limit", lambda: None)
+    monkeypatch.setattr(
+        metadata_service_module,
+        "PROVIDER_INTERVALS",
+        dict.fromkeys(metadata_service_module.PROVIDER_INTERVALS, 0.0),
+    )
     return metadata_service_module.MetadataService()
 
 
 class TestReleaseMetaCaching:
-    def test_fetch_musicbrainz_artwork_caches_original_date(self, service, monkeypatch):
+    @staticmethod
+    def _fake_musicbrainz(requests, releases=None):
+        if releases is None:
+            releases = [
+                {
+                    "score": 100,
+                    "id": "rel-1",
+                    "date": "2011-09-26",
+                    "tags": [{"name": "rock"}],
+                    "release-group": {"id": "rg-1"},
+                }
+            ]
+
         def fake_api(url: str, timeout: int = 5):
+            requests.append(url)
             if "/ws/2/release/?" in url:
-                return {
-                    "releases": [
-                        {
-                            "score": 100,
-                            "id": "rel-1",
-                            "date": "2011-09-26",
-                            "tags": [{"name": "rock"}],
-                            "release-group": {"id": "rg-1"},
-                        }
-                    ]
-                }
+                return {"releases": releases}
             if "/ws/2/release-group/rg-1" in url:
                 return {"first-release-date": "1979-11-30"}
             raise AssertionError(f"unexpected URL: {url}")
 
-        monkeypatch.setattr(service, "_make_api_request", fake_api)
+        return fake_api
+
+    def test_artwork_defers_release_group_date_to_tags(self, service, monkeypatch):
+        requests = []
+        monkeypatch.setattr(
+            service, "_make_api_request", self._fake_musicbrainz(requests)
+        )
 
         artwork_url = service.fetch_musicbrainz_artwork("Pink Floyd", "The Wall")
 
         assert artwork_url == "https://coverartarchive.org/release/rel-1/front-500"
+        assert len(requests) == 1  # the search only
+        metadata = {"playing": True, "artist": "Pink Floyd", "album": "The Wall"}
+        service.enrich_tags(metadata)
+
+        assert len(requests) == 2  # + the release group, no second search
+        assert metadata["date"] == "2011-09-26"
+        assert metadata["original_date"] == "1979-11-30"
+        assert metadata["genre"] == "rock"
         cached = service._release_meta_cache["Pink Floyd|The Wall"]
         assert service._parse_release_meta_cache(cached) == (
             "2011-09-26",
@@ -124,6 +151,98 @@ class TestReleaseMetaCaching:
             "rock",
         )
 
+    def test_release_group_date_resolved_once(self, service, monkeypatch):
+        requests = []
+        monkeypatch.setattr(
+            service, "_make_api_request", self._fake_musicbrainz(requests)
+        )
+
+        for album in ("The Wall", "The Wall (Remastered)"):
+            metadata = {"playing": True, "artist": "Pink Floyd", "album": album}
+            service.enrich_tags(metadata)
+            assert metadata["original_date"] == "1979-11-30"
+
+        # Two editions, two searches, but their shared release group once
+        assert len(requests) == 3
+        release_group_requests = [u for u in requests if "release-group/" in u]
+        assert len(release_group_requests) == 1
+
+    def test_picks_best_scoring_release(self, service, monkeypatch):
+        releases = [
+            {"score": 85, "id": "rel-weak", "date": "2001"},
+            {"score": 98, "id": "rel-best", "date": "1979"},
+            {"score": 98, "id": "rel-tie", "date": "1980"},
+            {"score": 40, "id": "rel-miss"},
+        ]
+        requests = []
+        monkeypatch.setattr(
+            service, "_make_api_request", self._fake_musicbrainz(requests, releases)
+        )
+
+        url = service.fetch_musicbrainz_artwork("Pink Floyd", "The Wall (20th Annivers")
+
+        assert url == "https://coverartarchive.org/release/rel-best/front-500"
+        assert "The%20Wall%22" in requests[0]  # searched the cleaned title
+        cached = service._release_meta_cache["Pink Floyd|The Wall"]
+        assert service._parse_release_meta_cache(cached)[0] == "1979"
+
+    def test_no_match_is_cached(self, service, monkeypatch):
+        requests = []
+        monkeypatch.setattr(
+            service,
+            "_make_api_request",
+            self._fake_musicbrainz(requests, [{"score": 50, "id": "x"}]),
+        )
+
+        assert service.fetch_musicbrainz_artwork("A", "B") == ""
+        assert service.fetch_musicbrainz_artwork("A", "B") == ""
+        service.enrich_tags({"playing": True, "artist": "A", "album": "B"})
+
+        assert len(requests) == 1
+
+    def test_pre_planner_entry_searched_again_for_artwork(self, service, monkeypatch):
+        service._release_meta_cache["Pink Floyd|The Wall"] = (
+            service._release_meta_cache_value("2011-09-26", "1979-11-30", "rock")
+        )
+        requests = []
+        monkeypatch.setattr(
+            service, "_make_api_request", self._fake_musicbrainz(requests)
+        )
+
+        url = service.fetch_musicbrainz_artwork("Pink Floyd", "The Wall")
+
+        assert url.endswith("/rel-1/front-500")
+        assert len(requests) == 1
+
+    def test_stats_charge_requests_to_album(self, service, monkeypatch):
+        monkeypatch.setattr(service, "_make_api_request", self._fake_musicbrainz([]))
+
+        service.fetch_musicbrainz_artwork("Pink Floyd", "The Wall")
+        service.enrich_tags(
+            {"playing": True, "artist": "Pink Floyd", "album": "The Wall"}
+        )
+
+        stats = service.mb_stats.stats()
+        assert stats["albums"] == 1
+        assert stats["requests"] == 2
+        assert stats["recent"][0]["album"] == "Pink Floyd|The Wall"
+        assert stats["recent"][0]["requests"] == 2
+
+    def test_status_section_renders_stats(self, metadata_service_module):
+        mod = metadata_service_module
+        stats = mod.AlbumLookupStats(recent=1)
+        stats.record("A|<One>", 1.0)
+        stats.record("B|Two", 2.0)
+        stats.record("B|Two", 1.0)
+
+        html = mod._render_musicbrainz_section(stats.stats())
+
+        assert "2 albums · 3 requests · 1.5 requests and 2.0 s per album" in html
+        assert "B — Two: 2 requests · 3.0 s" in html
+        assert "One" not in html  # only the most recent album is kept
+        assert mod._render_musicbrainz_section(None) == ""
+        assert mod._render_musicbrainz_section(mod.AlbumLookupStats().stats()) == ""
+
     def test_output_metadata_keeps_original_date(self, service):
         metadata = {
             "title": "Comfortably Numb",
@@ -1077,3 +1196,2870 @@ class TestArtworkChainTelemetry:
         with caplog.at_level("INFO"):
             service._log_artwork_chain_hit(radio, "default")
         assert "Artwork served via default" in caplog.text
+
+
+class TestServerModelNotifications:
+    """The notification-driven server model must track Snapserver state
+    without a Server.GetStatus per poll, and must ask for a resync whenever
+    a notification references something it cannot patch incrementally.
+    """
+
+    @staticmethod
+    def _server() -> dict:
+        return {
+            "groups": [
+                {
+                    "id": "g1",
+                    "stream_id": "MPD",
+                    "clients": [
+                        {
+                            "id": "c1",
+                            "host": {"name": "kitchen"},
+                            "config": {
+                                "name": "",
+                                "volume": {"percent": 40, "muted": False},
+                            },
+                        }
+                    ],
+                }
+            ],
+            "streams": [
+                {"id": "MPD", "status": "playing", "properties": {}},
+                {"id": "Spotify", "status": "idle", "properties": {}},
+            ],
+        }
+
+    def _model(self, metadata_service_module):
+        model = metadata_service_module.ServerModel()
+        model.reset(self._server())
+        return model
+
+    def test_stream_properties_replaced(self, metadata_service_module):
+        model = self._model(metadata_service_module)
+        old_stream = model.server["streams"][0]
+        props = {"metadata": {"title": "Time", "artist": ["Pink Floyd"]}}
+
+        assert model.apply("Stream.OnProperties", {"id": "MPD", "properties": props})
+
+        assert model.server["streams"][0]["properties"] == props
+        # Readers holding the previous dict never see a half-applied update
+        assert old_stream["properties"] == {}
+
+    def test_client_volume_changed(self, metadata_service_module):
+        model = self._model(metadata_service_module)
+        volume = {"percent": 75, "muted": True}
+
+        assert model.apply("Client.OnVolumeChanged", {"id": "c1", "volume": volume})
+
+        client = model.server["groups"][0]["clients"][0]
+        assert client["config"]["volume"] == volume
+        assert client["host"]["name"] == "kitchen"
+
+    def test_group_stream_changed(self, metadata_service_module):
+        model = self._model(metadata_service_module)
+        old_group = model.server["groups"][0]
+
+        assert model.apply(
+            "Group.OnStreamChanged", {"id": "g1", "stream_id": "Spotify"}
+        )
+        assert model.apply("Group.OnMute", {"id": "g1", "mute": True})
+        assert model.apply("Group.OnNameChanged", {"id": "g1", "name": "Downstairs"})
+
+        group = model.server["groups"][0]
+        assert group["stream_id"] == "Spotify"
+        assert group["muted"] is True
+        assert group["name"] == "Downstairs"
+        assert group["clients"] == old_group["clients"]
+        # Group patches replace the dict too, like stream and client ones
+        assert old_group["stream_id"] == "MPD"
+        assert "muted" not in old_group and "name" not in old_group
+
+    def test_server_update_replaces_tree(self, metadata_service_module):
+        model = self._model(metadata_service_module)
+        fresh = {"groups": [], "streams": [{"id": "AirPlay"}]}
+
+        assert model.apply("Server.OnUpdate", {"server": fresh})
+
+        assert model.server is fresh
+
+    def test_unknown_objects_request_resync(self, metadata_service_module):
+        model = self._model(metadata_service_module)
+
+        assert not model.apply("Stream.OnProperties", {"id": "Tidal"})
+        assert not model.apply("Client.OnVolumeChanged", {"id": "nope"})
+        assert not model.apply("Group.OnStreamChanged", {"id": "nope"})
+        assert not model.apply("Plugin.Unknown", {})
+
+    def test_unseeded_model_requests_resync(self, metadata_service_module):
+        model = metadata_service_module.ServerModel()
+        assert not model.apply("Client.OnVolumeChanged", {"id": "c1"})
+
+    def test_poll_uses_live_model_without_rpc(self, service, monkeypatch):
+        import asyncio
+
+        def boom():
+            raise AssertionError("GetStatus must not run while the model is live")
+
+        monkeypatch.setattr(service, "get_server_status", boom)
+        service.server_model.reset(self._server())
+        service.server_model.live = True
+
+        server = asyncio.run(service._current_server_status())
+
+        assert server is service.server_model.server
+
+    def test_poll_falls_back_when_model_not_live(self, service, monkeypatch):
+        import asyncio
+
+        polled = self._server()
+
+        async def get_status():
+            return polled
+
+        monkeypatch.setattr(service, "get_server_status", get_status)
+        service.server_model.reset(self._server())
+        service.server_model.invalidate()
+
+        assert asyncio.run(service._current_server_status(max_age=0)) is polled
+
+    def test_event_loop_seeds_and_applies_notifications(self, service):
+        """End-to-end over a real socket: GetStatus seed, then a pushed
+        Stream.OnProperties wakes the poll loop and lands in the model."""
+        import asyncio
+        import json as _json
+
+        server_tree = self._server()
+
+        async def scenario():
+            async def handle(reader, writer):
+                request = _json.loads(await reader.readline())
+                writer.write(
+                    (
+                        _json.dumps(
+                            {
+                                "id": request["id"],
+                                "jsonrpc": "2.0",
+                                "result": {"server": server_tree},
+                            }
+                        )
+                        + "\r\n"
+                    ).encode()
+                )
+                writer.write(
+                    (
+                        _json.dumps(
+                            {
+                                "jsonrpc": "2.0",
+                                "method": "Stream.OnProperties",
+                                "params": {
+                                    "id": "MPD",
+                                    "properties": {"metadata": {"title": "Money"}},
+                                },
+                            }
+                        )
+                        + "\r\n"
+                    ).encode()
+                )
+                await writer.drain()
+                await asyncio.sleep(5)
+
+            srv = await asyncio.start_server(handle, "127.0.0.1", 0)
+            service.rpc.host = "127.0.0.1"
+            service.rpc.port = srv.sockets[0].getsockname()[1]
+            task = asyncio.create_task(service.snapserver_event_loop())
+            try:
+                for _ in range(100):
+                    stream = (
+                        service.server_model.server
+                        and (service.server_model.server["streams"][0])
+                    )
+                    if stream and stream["properties"]:
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                task.cancel()
+                await service.rpc.close()
+                srv.close()
+            return stream
+
+        stream = asyncio.run(scenario())
+
+        assert stream["properties"]["metadata"]["title"] == "Money"
+        assert service._state_changed.is_set()
+
+
+class TestSnapcastRpcClient:
+    """One Snapserver connection shared by concurrent callers, routed by id."""
+
+    @staticmethod
+    async def _serve(handler):
+        import asyncio
+
+        srv = await asyncio.start_server(handler, "127.0.0.1", 0)
+        return srv, srv.sockets[0].getsockname()[1]
+
+    def test_concurrent_requests_routed_by_id(self, metadata_service_module):
+        """Responses arrive in reverse order; each caller still gets its own."""
+        import asyncio
+        import json as _json
+
+        async def handle(reader, writer):
+            requests = [_json.loads(await reader.readline()) for _ in range(3)]
+            for req in reversed(requests):
+                response = {"id": req["id"], "jsonrpc": "2.0", "result": req["method"]}
+                writer.write((_json.dumps(response) + "\r\n").encode())
+            await writer.drain()
+            await asyncio.sleep(5)
+
+        async def scenario():
+            srv, port = await self._serve(handle)
+            rpc = metadata_service_module.SnapcastRpcClient("127.0.0.1", port)
+            try:
+                return await asyncio.gather(
+                    rpc.request("A.One"), rpc.request("B.Two"), rpc.request("C.Three")
+                )
+            finally:
+                await rpc.close()
+                srv.close()
+
+        responses = asyncio.run(scenario())
+
+        assert [r["result"] for r in responses] == ["A.One", "B.Two", "C.Three"]
+
+    def test_notifications_go_to_callback(self, metadata_service_module):
+        import asyncio
+        import json as _json
+
+        seen = []
+
+        async def handle(reader, writer):
+            notification = {
+                "jsonrpc": "2.0",
+                "method": "Client.OnVolumeChanged",
+                "params": {"id": "c1", "volume": {"percent": 40, "muted": False}},
+            }
+            writer.write((_json.dumps(notification) + "\r\n").encode())
+            req = _json.loads(await reader.readline())
+            writer.write(
+                (_json.dumps({"id": req["id"], "result": {}}) + "\r\n").encode()
+            )
+            await writer.drain()
+            await asyncio.sleep(5)
+
+        async def scenario():
+            srv, port = await self._serve(handle)
+            rpc = metadata_service_module.SnapcastRpcClient(
+                "127.0.0.1", port, on_notification=lambda m, p: seen.append((m, p))
+            )
+            try:
+                return await rpc.request("Server.GetRPCVersion")
+            finally:
+                await rpc.close()
+                srv.close()
+
+        response = asyncio.run(scenario())
+
+        assert response["result"] == {}
+        assert seen == [
+            (
+                "Client.OnVolumeChanged",
+                {"id": "c1", "volume": {"percent": 40, "muted": False}},
+            )
+        ]
+
+    def test_disconnect_fails_pending_request(self, metadata_service_module):
+        import asyncio
+
+        async def handle(reader, writer):
+            await reader.readline()
+            writer.close()
+
+        async def scenario():
+            srv, port = await self._serve(handle)
+            rpc = metadata_service_module.SnapcastRpcClient("127.0.0.1", port)
+            try:
+                return await rpc.request("Server.GetStatus", timeout=5)
+            finally:
+                await rpc.close()
+                srv.close()
+
+        assert asyncio.run(scenario()) is None
+
+    def test_server_closing_at_once_is_backed_off(self, metadata_service_module):
+        """Accept-then-close (snapserver starting/stopping) is no tight loop."""
+        import asyncio
+
+        accepted = []
+        changes = []
+
+        async def handle(reader, writer):
+            accepted.append(1)
+            writer.close()
+
+        async def scenario():
+            srv, port = await self._serve(handle)
+            rpc = metadata_service_module.SnapcastRpcClient(
+                "127.0.0.1", port, on_connection_change=changes.append
+            )
+            rpc.start()
+            try:
+                await asyncio.sleep(1.5)
+            finally:
+                await rpc.close()
+                srv.close()
+
+        asyncio.run(scenario())
+
+        # Connects at 0 s and after the 1 s backoff; not hundreds of times
+        assert 1 <= len(accepted) <= 2
+        assert len(changes) <= 2 * len(accepted)
+
+    def test_unreachable_server_returns_none(self, metadata_service_module):
+        import asyncio
+        import socket as _socket
+
+        with _socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+
+        async def scenario():
+            rpc = metadata_service_module.SnapcastRpcClient("127.0.0.1", port)
+            rpc.CONNECT_WAIT = 0.2
+            try:
+                return await rpc.request("Server.GetStatus")
+            finally:
+                await rpc.close()
+
+        assert asyncio.run(scenario()) is None
+
+    def test_set_client_volume_uses_rpc(self, service, monkeypatch):
+        import asyncio
+
+        sent = []
+
+        async def fake_request(method, params=None, timeout=10.0):
+            sent.append((method, params))
+            return {"id": 1, "result": {"volume": params["volume"]}}
+
+        async def status():
+            return {
+                "groups": [
+                    {
+                        "clients": [
+                            {
+                                "id": "aa:bb",
+                                "host": {"name": "living-room"},
+                                "config": {"name": ""},
+                            }
+                        ]
+                    }
+                ]
+            }
+
+        monkeypatch.setattr(service.rpc, "request", fake_request)
+        monkeypatch.setattr(service, "_current_server_status", status)
+
+        assert asyncio.run(service.set_client_volume("living-room", 130))
+        assert sent == [
+            (
+                "Client.SetVolume",
+                {"id": "aa:bb", "volume": {"percent": 100, "muted": False}},
+            )
+        ]
+
+
+class _FakeMpd:
+    """Minimal threaded MPD protocol server for MpdSession tests.
+
+    `responses` maps a command name to a callable returning the raw body
+    (bytes, without the final OK) for that command's full text.
+    """
+
+    def __init__(self, responses, close_after=None):
+        import socket as _socket
+        import threading as _threading
+
+        self.responses = responses
+        self.close_after = close_after
+        self.connections = 0
+        self.commands = []
+        self._srv = _socket.socket()
+        self._srv.bind(("127.0.0.1", 0))
+        self._srv.listen()
+        self.port = self._srv.getsockname()[1]
+        _threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        import threading as _threading
+
+        while True:
+            try:
+                conn, _ = self._srv.accept()
+            except OSError:
+                return
+            self.connections += 1
+            _threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _reply(self, command):
+        self.commands.append(command)
+        name = command.split(" ", 1)[0]
+        return self.responses[name](command)
+
+    def _serve(self, conn):
+        conn.sendall(b"OK MPD 0.23.5\n")
+        reader = conn.makefile("rb")
+        served = 0
+        batch = None
+        for raw in reader:
+            command = raw.decode().rstrip("\n")
+            if command == "command_list_ok_begin":
+                batch = []
+                continue
+            if batch is not None and command != "command_list_end":
+                batch.append(command)
+                continue
+            out = b""
+            for c in [command] if batch is None else batch:
+                reply = self._reply(c)
+                if reply.startswith(b"ACK"):
+                    out += reply  # MPD stops at the failing command
+                    break
+                out += reply + (b"" if batch is None else b"list_OK\n")
+            else:
+                out += b"OK\n"
+            batch = None
+            conn.sendall(out)
+            served += 1
+            if self.close_after and served >= self.close_after:
+                break
+        conn.close()
+
+    def close(self):
+        self._srv.close()
+
+
+class TestMpdSession:
+    """Persistent, batched MPD connection shared by metadata/artwork/control."""
+
+    _STATUS = b"state: play\nelapsed: 12.5\nduration: 200.0\naudio: 44100:16:2\n"
+    _SONG = b"file: a/b.flac\nTitle: Money\nArtist: Pink Floyd\nAlbum: DSOTM\n"
+
+    def _responses(self):
+        return {
+            "status": lambda c: self._STATUS,
+            "currentsong": lambda c: self._SONG,
+        }
+
+    def test_metadata_batched_on_one_persistent_connection(self, service):
+        mpd = _FakeMpd(self._responses())
+        service.mpd = service.mpd.__class__("127.0.0.1", mpd.port)
+        try:
+            first = service.get_mpd_metadata()
+            second = service.get_mpd_metadata()
+        finally:
+            service.mpd.close()
+            mpd.close()
+
+        assert first["title"] == "Money" and first["elapsed"] == 12
+        assert second == first
+        assert mpd.connections == 1
+        assert mpd.commands == ["status", "currentsong"] * 2
+
+    def test_reconnects_when_mpd_drops_idle_connection(self, service):
+        mpd = _FakeMpd(self._responses(), close_after=1)
+        service.mpd = service.mpd.__class__("127.0.0.1", mpd.port)
+        try:
+            service.get_mpd_metadata()
+            again = service.get_mpd_metadata()
+        finally:
+            service.mpd.close()
+            mpd.close()
+
+        assert again["playing"] is True
+        assert mpd.connections == 2
+
+    def test_ack_raises_command_error(self, metadata_service_module):
+        mpd = _FakeMpd({"bogus": lambda c: b"ACK [5@0] {} unknown command\n"})
+        session = metadata_service_module.MpdSession("127.0.0.1", mpd.port)
+        try:
+            with pytest.raises(metadata_service_module.MpdCommandError):
+                session.command("bogus")
+        finally:
+            session.close()
+            mpd.close()
+
+    @staticmethod
+    def _picture_responses(image, binarylimit=True):
+        limit = [8192]  # MPD's default chunk
+
+        def readpicture(command):
+            offset = int(command.rsplit(" ", 1)[1])
+            part = image[offset : offset + limit[0]]
+            return (
+                f"size: {len(image)}\ntype: image/png\nbinary: {len(part)}\n".encode()
+                + part
+                + b"\n"
+            )
+
+        def set_limit(command):
+            if not binarylimit:
+                return b'ACK [5@0] {} unknown command "binarylimit"\n'
+            limit[0] = int(command.split()[1])
+            return b""
+
+        return {"readpicture": readpicture, "binarylimit": set_limit}
+
+    def test_readpicture_chunks_reassembled(self, service):
+        image = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 2000
+
+        mpd = _FakeMpd(self._picture_responses(image))
+        service.mpd = service.mpd.__class__("127.0.0.1", mpd.port, binary_limit=65536)
+        try:
+            filename = service.fetch_mpd_artwork("a/b.flac")
+        finally:
+            service.mpd.close()
+            mpd.close()
+
+        assert filename.endswith(".png")
+        assert (service.artwork_dir / filename).read_bytes() == image
+        # An 8 KiB head, then the rest in 64 KiB chunks
+        assert [c.split()[0] for c in mpd.commands[:5]] == [
+            "binarylimit",
+            "readpicture",
+            "binarylimit",
+            "readpicture",
+            "readpicture",
+        ]
+        assert mpd.commands[2] == "binarylimit 65536"
+        assert len(mpd.commands) == 2 + 1 + -(-(len(image) - 8192) // 65536)
+        assert mpd.connections == 1
+
+    def test_readpicture_without_binarylimit_support(self, service):
+        image = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 100
+
+        mpd = _FakeMpd(self._picture_responses(image, binarylimit=False))
+        service.mpd = service.mpd.__class__("127.0.0.1", mpd.port)
+        try:
+            filename = service.fetch_mpd_artwork("a/b.flac")
+        finally:
+            service.mpd.close()
+            mpd.close()
+
+        assert (service.artwork_dir / filename).read_bytes() == image
+        # Asked once, then MPD's default chunks
+        assert [c.split()[0] for c in mpd.commands].count("binarylimit") == 1
+        assert mpd.commands.count('readpicture "a/b.flac" 8192') == 1
+        assert mpd.connections == 1
+
+    def test_idle_loop_wakes_poll_loop(self, service):
+        import asyncio
+
+        async def scenario():
+            async def handle(reader, writer):
+                writer.write(b"OK MPD 0.23.5\n")
+                assert (await reader.readline()).startswith(b"idle player")
+                writer.write(b"changed: player\nOK\n")
+                await writer.drain()
+                await reader.readline()
+                await asyncio.sleep(5)
+
+            srv = await asyncio.start_server(handle, "127.0.0.1", 0)
+            service.mpd_host = "127.0.0.1"
+            service.mpd_port = srv.sockets[0].getsockname()[1]
+            task = asyncio.create_task(service.mpd_idle_loop())
+            try:
+                await asyncio.wait_for(service._state_changed.wait(), 2)
+            finally:
+                task.cancel()
+                srv.close()
+
+        asyncio.run(scenario())
+
+        assert service._state_changed.is_set()
+
+
+class TestConcurrentStreamEnrichment:
+    """Streams enrich in parallel; identical lookups share one execution."""
+
+    def test_single_flight_shares_in_flight_call(self, metadata_service_module):
+        import threading
+        import time as _time
+
+        flight = metadata_service_module.SingleFlight()
+        calls = []
+
+        def lookup(artist):
+            calls.append(artist)
+            _time.sleep(0.2)
+            return f"art-{artist}"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(flight.do(("album", "x"), lookup, "x"))
+            )
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert calls == ["x"]
+        assert results == ["art-x"] * 4
+        assert flight.shared == 3
+
+    def test_single_flight_propagates_exception_and_forgets_key(
+        self, metadata_service_module
+    ):
+        flight = metadata_service_module.SingleFlight()
+
+        def boom():
+            raise ValueError("nope")
+
+        with pytest.raises(ValueError):
+            flight.do("k", boom)
+        assert flight.do("k", lambda: 42) == 42
+
+    def test_duplicate_downloads_collapse(self, service, monkeypatch):
+        import concurrent.futures
+        import time as _time
+
+        downloads = []
+
+        def slow_download(url, cache_key):
+            downloads.append(url)
+            _time.sleep(0.2)
+            return "artwork_abc.jpg"
+
+        monkeypatch.setattr(service, "_download_artwork", slow_download)
+        with concurrent.futures.ThreadPoolExecutor(3) as pool:
+            names = list(pool.map(service.download_artwork, ["https://x/a.jpg"] * 3))
+
+        assert names == ["artwork_abc.jpg"] * 3
+        assert downloads == ["https://x/a.jpg"]
+
+    def test_poll_cycle_bounded_by_slowest_stream(self, service, monkeypatch):
+        import asyncio
+        import time as _time
+
+        extract = service._extract_stream_metadata
+
+        def slow_extract(stream):
+            _time.sleep(0.3)
+            return extract(stream)
+
+        monkeypatch.setattr(service, "_extract_stream_metadata", slow_extract)
+        streams = [
+            {
+                "id": name,
+                "status": "playing",
+                "properties": {"metadata": {"title": name, "artist": "A"}},
+            }
+            for name in ("Spotify", "AirPlay", "Tidal", "Radio")
+        ]
+
+        async def scenario():
+            start = _time.monotonic()
+            await asyncio.gather(
+                *(service._process_stream(st, {"groups": []}) for st in streams)
+            )
+            return _time.monotonic() - start
+
+        elapsed = asyncio.run(scenario())
+
+        assert elapsed < 0.9
+        assert set(service.streams) == {"Spotify", "AirPlay", "Tidal", "Radio"}
+
+
+class TestTwoPhasePublish:
+    """Track text goes out at once; artwork and tags follow as updates."""
+
+    _STREAM = {
+        "id": "Spotify",
+        "status": "playing",
+        "properties": {
+            "metadata": {"title": "Money", "artist": "Pink Floyd", "album": "DSOTM"}
+        },
+    }
+
+    @staticmethod
+    def _capture(service, monkeypatch):
+        sent = []
+
+        async def broadcast(stream_id, metadata, server):
+            sent.append(dict(metadata))
+
+        monkeypatch.setattr(service, "_broadcast_to_stream", broadcast)
+        return sent
+
+    def test_text_published_before_artwork_resolves(self, service, monkeypatch):
+        import asyncio
+        import threading
+
+        sent = self._capture(service, monkeypatch)
+        release = threading.Event()
+
+        def slow_artwork(metadata):
+            release.wait(2)
+            metadata["artwork"] = "http://host/artwork/a.jpg"
+            metadata["artwork_source"] = "musicbrainz"
+
+        def tags(metadata):
+            metadata["genre"] = "Rock"
+
+        monkeypatch.setattr(service, "enrich_artwork", slow_artwork)
+        monkeypatch.setattr(service, "enrich_tags", tags)
+        monkeypatch.setattr(service, "enrich_artist_image", lambda metadata: None)
+
+        async def scenario():
+            await service._process_stream(self._STREAM, {})
+            first = list(sent)
+            release.set()
+            await service.streams["Spotify"].enrich_task
+            return first
+
+        first = asyncio.run(scenario())
+
+        assert len(first) == 1
+        assert first[0]["title"] == "Money" and first[0]["artwork"] == ""
+        assert sent[1]["artwork"] == "http://host/artwork/a.jpg"
+        assert sent[2]["genre"] == "Rock"
+        assert service.streams["Spotify"].current["genre"] == "Rock"
+
+    def test_stored_artwork_goes_out_with_the_text(self, service, monkeypatch):
+        import asyncio
+
+        sent = self._capture(service, monkeypatch)
+        url = "https://caa/dsotm.jpg"
+        name = service.artwork_store.put(
+            url, TestArtworkVariants._image((100, 100)), ".png"
+        )
+        service.artwork_cache.set("Pink Floyd|DSOTM", f"{url}|musicbrainz")
+        monkeypatch.setattr(service, "enrich_tags", lambda metadata: None)
+        monkeypatch.setattr(service, "enrich_artist_image", lambda metadata: None)
+
+        async def scenario():
+            await service._process_stream(self._STREAM, {})
+            await service.streams["Spotify"].enrich_task
+
+        asyncio.run(scenario())
+
+        # One publish, already with the art: no blank flash, no second write
+        assert len(sent) == 1
+        assert sent[0]["artwork"].endswith(f"/artwork/{name}")
+        assert sent[0]["artwork_source"] == "musicbrainz"
+        assert "artwork_placeholder" in sent[0]
+
+    def test_stored_artwork_peek_does_no_artwork_io(self, service, monkeypatch):
+        import base64
+
+        def no_io(*args, **kwargs):
+            raise AssertionError("the peek must not transfer or ingest artwork")
+
+        monkeypatch.setattr(service.mpd, "binary_command", no_io)
+        monkeypatch.setattr(service, "_ingest_artwork_data", no_io)
+        image = TestArtworkVariants._image((100, 100))
+        name = service.artwork_store.put("mpd-dir:Pink Floyd/DSOTM", image, ".png")
+        track = {
+            "playing": True,
+            "source": "MPD",
+            "file": "Pink Floyd/DSOTM/03 Time.flac",
+            "mpd_album": "mpd-dir:Pink Floyd/DSOTM",
+        }
+
+        # Album art is offered unverified; enrichment checks the track later
+        stored = service._stored_artwork(track)
+        assert stored["artwork"].endswith(f"/artwork/{name}")
+        assert stored["artwork_source"] == "embedded"
+
+        # Inline bytes not stored yet are left for enrichment to ingest
+        inline = {"playing": True, "art_data": base64.b64encode(image).decode()}
+        assert service._stored_artwork(inline) == {}
+
+    def test_enrichment_carried_over_between_polls(self, service, monkeypatch):
+        import asyncio
+
+        sent = self._capture(service, monkeypatch)
+        runs = []
+
+        def artwork(metadata):
+            runs.append(1)
+            metadata["artwork"] = "http://host/artwork/a.jpg"
+
+        monkeypatch.setattr(service, "enrich_artwork", artwork)
+        monkeypatch.setattr(service, "enrich_tags", lambda metadata: None)
+        monkeypatch.setattr(service, "enrich_artist_image", lambda metadata: None)
+
+        async def scenario():
+            await service._process_stream(self._STREAM, {})
+            await service.streams["Spotify"].enrich_task
+            await service._process_stream(self._STREAM, {})
+
+        asyncio.run(scenario())
+
+        assert runs == [1]
+        assert len(sent) == 2
+        assert service.streams["Spotify"].current["artwork"].endswith("a.jpg")
+
+    def test_track_change_drops_stale_enrichment(self, service, monkeypatch):
+        import asyncio
+        import threading
+
+        self._capture(service, monkeypatch)
+        release = threading.Event()
+
+        def artwork(metadata):
+            if metadata["title"] == "Money":
+                release.wait(2)
+            metadata["artwork"] = f"http://host/artwork/{metadata['title']}.jpg"
+
+        monkeypatch.setattr(service, "enrich_artwork", artwork)
+        monkeypatch.setattr(service, "enrich_tags", lambda metadata: None)
+        monkeypatch.setattr(service, "enrich_artist_image", lambda metadata: None)
+        next_track = {
+            **self._STREAM,
+            "properties": {"metadata": {"title": "Time", "artist": "Pink Floyd"}},
+        }
+
+        async def scenario():
+            await service._process_stream(self._STREAM, {})
+            stale = service.streams["Spotify"].enrich_task
+            await service._process_stream(next_track, {})
+            release.set()
+            await service.streams["Spotify"].enrich_task
+            await asyncio.sleep(0.05)
+            return stale
+
+        stale = asyncio.run(scenario())
+
+        assert stale.cancelled()
+        current = service.streams["Spotify"].current
+        assert current["title"] == "Time"
+        assert current["artwork"] == "http://host/artwork/Time.jpg"
+
+    def test_artist_image_is_last_resort_artwork(self, service, monkeypatch):
+        monkeypatch.setattr(service, "fetch_artist_image", lambda a: "https://x/a.jpg")
+        monkeypatch.setattr(service, "download_artwork", lambda url: "artwork_a.jpg")
+        metadata = {"playing": True, "artist": "Pink Floyd", "artwork": ""}
+
+        service.enrich_artist_image(metadata)
+
+        assert metadata["artist_image"].endswith("/artwork/artwork_a.jpg")
+        assert metadata["artwork"] == metadata["artist_image"]
+        assert metadata["artwork_source"] == "artist_image"
+
+
+async def _drain_outboxes():
+    """Let per-client writer tasks flush their queued messages."""
+    import asyncio
+
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+class TestAnchoredElapsed:
+    """elapsed_mode "anchored": position re-sent only on discontinuities."""
+
+    class _WS:
+        def __init__(self):
+            self.sent = []
+
+        async def send(self, message):
+            import json as _json
+
+            self.sent.append(_json.loads(message))
+
+    @staticmethod
+    def _stream(position, status="playing"):
+        return {
+            "id": "Spotify",
+            "status": status,
+            "properties": {
+                "position": position,
+                "metadata": {"title": "Money", "artist": "Pink Floyd"},
+            },
+        }
+
+    def _setup(self, metadata_service_module, service, monkeypatch):
+        for stage in ("enrich_artwork", "enrich_tags", "enrich_artist_image"):
+            monkeypatch.setattr(service, stage, lambda metadata: None)
+        monkeypatch.setattr(service, "get_spotify_position", lambda: None)
+        legacy, anchored = self._WS(), self._WS()
+        metadata_service_module.ws_clients.update(
+            {
+                metadata_service_module.SubscribedClient(
+                    legacy, stream_id_direct="Spotify"
+                ),
+                metadata_service_module.SubscribedClient(
+                    anchored, stream_id_direct="Spotify", anchored=True
+                ),
+            }
+        )
+        return legacy, anchored
+
+    def test_steady_playback_only_updates_legacy_clients(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        legacy, anchored = self._setup(metadata_service_module, service, monkeypatch)
+        writes = []
+        meta_file = service.artwork_dir / "metadata_Spotify.json"
+
+        async def scenario():
+            await service._process_stream(self._stream(10), {})
+            await _drain_outboxes()
+            writes.append(meta_file.stat().st_mtime_ns)
+            sm = service.streams["Spotify"]
+            elapsed, at, rate = sm.anchor
+            sm.anchor = (elapsed, at - 3, rate)  # three seconds later…
+            meta_file.unlink()
+            await service._process_stream(self._stream(13), {})
+            await _drain_outboxes()
+
+        asyncio.run(scenario())
+
+        assert [m["elapsed"] for m in legacy.sent] == [10, 13]
+        assert len(anchored.sent) == 1
+        assert anchored.sent[0]["elapsed"] == 10
+        assert anchored.sent[0]["rate"] == 1.0
+        assert "elapsed_at" in anchored.sent[0]
+        assert "elapsed_at" not in legacy.sent[0]
+        assert not meta_file.exists()  # elapsed-only tick: no rewrite
+
+    def test_seek_and_pause_are_discontinuities(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        _, anchored = self._setup(metadata_service_module, service, monkeypatch)
+
+        async def scenario():
+            for stream in (
+                self._stream(10),
+                self._stream(95),
+                self._stream(95, status="idle"),
+            ):
+                await service._process_stream(stream, {})
+                await _drain_outboxes()
+
+        asyncio.run(scenario())
+
+        assert [(m["elapsed"], m["rate"]) for m in anchored.sent] == [
+            (10, 1.0),
+            (95, 1.0),
+            (95, 0.0),
+        ]
+
+    def test_small_drift_within_threshold_keeps_anchor(
+        self, metadata_service_module, service
+    ):
+        sm = metadata_service_module.StreamMetadata("S")
+        metadata = {"playing": True, "elapsed": 10}
+
+        assert service._update_anchor(sm, metadata, changed=False)
+        anchor = sm.anchor
+        assert not service._update_anchor(sm, {**metadata, "elapsed": 11}, False)
+        assert sm.anchor == anchor
+        assert service._update_anchor(sm, {"playing": True}, False)
+        assert sm.anchor is None
+
+
+class TestBroadcastFanOut:
+    """One serialization per stream; volume spliced per room subscriber."""
+
+    class _WS:
+        def __init__(self, fail=False):
+            self.sent = []
+            self.fail = fail
+
+        async def send(self, message):
+            if self.fail:
+                raise ConnectionError("gone")
+            self.sent.append(message)
+
+    _SERVER = {
+        "groups": [
+            {
+                "clients": [
+                    {
+                        "id": "aa",
+                        "host": {"name": "kitchen"},
+                        "config": {
+                            "name": "",
+                            "volume": {"percent": 40, "muted": False},
+                        },
+                    },
+                    {
+                        "id": "bb",
+                        "host": {"name": "den"},
+                        "config": {"name": "", "volume": {"percent": 7, "muted": True}},
+                    },
+                ]
+            }
+        ]
+    }
+
+    def test_payload_serialized_once_and_volumes_spliced(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+        import json as _json
+
+        mod = metadata_service_module
+        room_ids = ["kitchen", "snapclient-den", "unknown"] * 10
+        rooms = [self._WS() for _ in room_ids]
+        stream_ws = self._WS()
+        mod.ws_clients.update(
+            mod.SubscribedClient(ws, client_id=cid, stream_id_direct="")
+            for ws, cid in zip(rooms, room_ids)
+        )
+        for sc in mod.ws_clients:
+            sc.stream_id = "MPD"
+        mod.ws_clients.add(mod.SubscribedClient(stream_ws, stream_id_direct="MPD"))
+
+        dumps_calls = []
+        real_dumps = mod.json.dumps
+
+        def counting_dumps(obj, *a, **k):
+            dumps_calls.append(obj)
+            return real_dumps(obj, *a, **k)
+
+        monkeypatch.setattr(mod.json, "dumps", counting_dumps)
+        metadata = {"title": "Money", "playing": True, "file": "internal"}
+
+        async def scenario():
+            await service._broadcast_to_stream("MPD", metadata, self._SERVER)
+            await _drain_outboxes()
+
+        asyncio.run(scenario())
+
+        assert sum(isinstance(o, dict) for o in dumps_calls) == 1
+        assert _json.loads(stream_ws.sent[0]) == {"title": "Money", "playing": True}
+        for ws, cid in zip(rooms, room_ids):
+            message = _json.loads(ws.sent[0])
+            expected = service._find_client_volume(self._SERVER, cid)
+            assert message["volume"] == expected["percent"]
+            assert message["muted"] == expected["muted"]
+            assert message["title"] == "Money" and "file" not in message
+
+    def test_failed_send_drops_only_that_client(self, metadata_service_module, service):
+        import asyncio
+
+        mod = metadata_service_module
+        good, bad = self._WS(), self._WS(fail=True)
+        mod.ws_clients.update(
+            {
+                mod.SubscribedClient(good, stream_id_direct="MPD"),
+                mod.SubscribedClient(bad, stream_id_direct="MPD"),
+            }
+        )
+
+        async def scenario():
+            await service._broadcast_to_stream("MPD", {"title": "x"}, {})
+            await _drain_outboxes()
+
+        asyncio.run(scenario())
+
+        assert [sc.websocket for sc in mod.ws_clients] == [good]
+        assert len(good.sent) == 1
+
+    def test_with_volume_handles_empty_object(self, service):
+        import json as _json
+
+        merged = service._with_volume("{}", {"percent": 5, "muted": True})
+        assert _json.loads(merged) == {"volume": 5, "muted": True}
+
+
+class TestClientRegistry:
+    """Clients indexed once per server-tree version, exact-match lookups."""
+
+    _SERVER = {
+        "groups": [
+            {
+                "id": "g1",
+                "stream_id": "MPD",
+                "clients": [
+                    {
+                        "id": "aa",
+                        "host": {"name": "pi-sala"},
+                        "config": {
+                            "name": "Sala Grande",
+                            "volume": {"percent": 40, "muted": False},
+                        },
+                    },
+                    {
+                        "id": "bb",
+                        "host": {"name": "pi-cucina"},
+                        "config": {
+                            "name": "Sala",
+                            "volume": {"percent": 7, "muted": True},
+                        },
+                    },
+                ],
+            },
+            {
+                "id": "g2",
+                "stream_id": "Spotify",
+                "clients": [
+                    {
+                        "id": "cc",
+                        "host": {"name": "pi-sala"},
+                        "config": {"name": "Studio"},
+                    },
+                ],
+            },
+        ]
+    }
+
+    def test_lookup_exact_and_snapclient_alias(self, metadata_service_module):
+        reg = metadata_service_module.ClientRegistry(self._SERVER)
+        assert reg.lookup("Sala").id == "bb"
+        assert reg.lookup("Sala Grande").id == "aa"
+        assert reg.lookup("snapclient-pi-cucina").id == "bb"
+        assert reg.lookup("cc").id == "cc"
+        assert reg.lookup("Sal") is None
+        assert reg.lookup("") is None
+        assert reg.volume("Sala") == {"percent": 7, "muted": True}
+        assert reg.volume("nobody") == {"percent": 100, "muted": False}
+
+    def test_duplicate_identifier_first_in_tree_wins(self, metadata_service_module):
+        reg = metadata_service_module.ClientRegistry(self._SERVER)
+        assert reg.lookup("pi-sala").id == "aa"
+        assert reg.stream_map()["pi-sala"] == "MPD"
+        assert reg.stream_map()["Studio"] == "Spotify"
+
+    def test_reverse_indexes(self, metadata_service_module):
+        reg = metadata_service_module.ClientRegistry(self._SERVER)
+        assert [r.id for r in reg.by_stream["MPD"]] == ["aa", "bb"]
+        assert [r.id for r in reg.by_group["g2"]] == ["cc"]
+        assert len(reg.clients) == 3
+
+    def test_rebuilt_only_when_model_version_changes(self, service):
+        model = service.server_model
+        model.reset(self._SERVER)
+        first = service._client_registry(model.server)
+        assert service._client_registry(model.server) is first
+
+        model.apply(
+            "Client.OnVolumeChanged",
+            {"id": "bb", "volume": {"percent": 55, "muted": False}},
+        )
+        second = service._client_registry(model.server)
+        assert second is not first
+        assert second.volume("Sala") == {"percent": 55, "muted": False}
+
+    def test_foreign_tree_gets_its_own_registry(self, service):
+        service.server_model.reset(self._SERVER)
+        service._client_registry(self._SERVER)
+        other = {"groups": [{"stream_id": "X", "clients": [{"id": "zz"}]}]}
+        assert service._find_client_volume(other, "zz") == {
+            "percent": 100,
+            "muted": False,
+        }
+        assert service._build_client_stream_map(other) == {"zz": "X"}
+
+
+class TestClientOutbox:
+    """Per-client writer tasks: coalesced frames, stalled consumers dropped."""
+
+    class _WS:
+        def __init__(self, gate=None):
+            self.sent = []
+            self.gate = gate
+            self.closed = False
+
+        async def send(self, message):
+            if self.gate is not None:
+                await self.gate.wait()
+            self.sent.append(message)
+
+        async def close(self):
+            self.closed = True
+
+    def test_superseded_metadata_is_coalesced(self, metadata_service_module):
+        import asyncio
+
+        mod = metadata_service_module
+
+        async def scenario():
+            ws = self._WS(gate=asyncio.Event())
+            sc = mod.SubscribedClient(ws, stream_id_direct="MPD")
+            sc.send("a", key="metadata")
+            await _drain_outboxes()  # "a" is now in flight, blocked
+            for frame in ("b", "c", "d"):
+                assert sc.send(frame, key="metadata")
+            sc.send("info", key="server_info")
+            ws.gate.set()
+            await _drain_outboxes()
+            sc.close()
+            return ws.sent
+
+        assert asyncio.run(scenario()) == ["a", "d", "info"]
+
+    def test_stalled_client_dropped_without_delaying_others(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        mod = metadata_service_module
+        monkeypatch.setattr(mod, "WS_SEND_TIMEOUT", 0.05)
+
+        async def scenario():
+            stuck = self._WS(gate=asyncio.Event())
+            fast = self._WS()
+            mod.ws_clients.update(
+                {
+                    mod.SubscribedClient(stuck, stream_id_direct="MPD"),
+                    mod.SubscribedClient(fast, stream_id_direct="MPD"),
+                }
+            )
+            await asyncio.wait_for(
+                service._broadcast_to_stream("MPD", {"title": "x"}, {}), 0.01
+            )
+            await _drain_outboxes()
+            assert len(fast.sent) == 1
+            await asyncio.sleep(0.1)
+            return stuck, fast
+
+        stuck, fast = asyncio.run(scenario())
+        assert stuck.closed and not stuck.sent
+        assert [sc.websocket for sc in mod.ws_clients] == [fast]
+
+
+class TestSharedServerStatus:
+    """One server tree for subscribe/control/status, refreshed by age."""
+
+    _SERVER = {
+        "groups": [
+            {
+                "id": "g1",
+                "stream_id": "MPD",
+                "clients": [
+                    {
+                        "id": "aa",
+                        "host": {"name": "pi-sala", "ip": "10.0.0.5"},
+                        "connected": True,
+                        "config": {
+                            "name": "Sala",
+                            "volume": {"percent": 30, "muted": False},
+                        },
+                    }
+                ],
+            }
+        ]
+    }
+
+    def _polling(self, metadata_service_module, service, monkeypatch):
+        monkeypatch.setattr(metadata_service_module, "SNAPSERVER_NOTIFICATIONS", False)
+        calls = []
+
+        import copy
+
+        async def get_status():
+            import asyncio
+
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            service.server_model.reset(copy.deepcopy(self._SERVER))
+            return service.server_model.server
+
+        monkeypatch.setattr(service, "get_server_status", get_status)
+        return calls
+
+    def test_concurrent_stale_readers_share_one_request(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        calls = self._polling(metadata_service_module, service, monkeypatch)
+
+        async def storm():
+            return await asyncio.gather(
+                *(service._current_server_status() for _ in range(8))
+            )
+
+        results = asyncio.run(storm())
+        assert len(calls) == 1
+        assert all(r is results[0] for r in results)
+
+    def test_young_snapshot_reused_until_max_age(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        calls = self._polling(metadata_service_module, service, monkeypatch)
+        asyncio.run(service._current_server_status())
+        asyncio.run(service._current_server_status())
+        assert len(calls) == 1
+        assert service.status_age() < 1
+
+        service.server_model.synced_at -= 60
+        asyncio.run(service._current_server_status(max_age=30))
+        assert len(calls) == 2
+
+    def test_volume_write_updates_shared_tree(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        calls = self._polling(metadata_service_module, service, monkeypatch)
+
+        async def fake_request(method, params=None, **kwargs):
+            return {"result": {}}
+
+        monkeypatch.setattr(service.rpc, "request", fake_request)
+
+        async def knob():
+            for delta in (5, 5, 5):
+                await service.handle_control_command(
+                    "Sala", f'{{"cmd": "volume", "delta": {delta}}}'
+                )
+
+        asyncio.run(knob())
+        assert len(calls) == 1
+        server = service.server_model.server
+        assert service._find_client_volume(server, "Sala")["percent"] == 45
+
+    def test_status_page_reads_service_tree(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+        import copy
+
+        class _BoomSession:
+            def __init__(self, *a, **kw):
+                raise RuntimeError("no HTTP JSON-RPC while the service runs")
+
+        monkeypatch.setattr(
+            metadata_service_module.aiohttp,
+            "ClientSession",
+            _BoomSession,
+            raising=False,
+        )
+        monkeypatch.setattr(metadata_service_module, "_service", service)
+        service.server_model.reset(copy.deepcopy(self._SERVER))
+
+        clients = asyncio.run(metadata_service_module._fetch_snapcast_clients())
+
+        assert [(c["name"], c["volume"], c["ip"]) for c in clients] == [
+            ("Sala", 30, "10.0.0.5")
+        ]
+
+
+class TestLookupStore:
+    """Persistent lookup cache: restart survival, TTLs, schema, LRU bound."""
+
+    def test_lookups_survive_restart(self, metadata_service_module, monkeypatch):
+        mod = metadata_service_module
+        first = mod.MetadataService()
+        monkeypatch.setattr(
+            first, "fetch_musicbrainz_artwork", lambda a, b: "https://caa/x.jpg"
+        )
+        first._fetch_album_artwork("Pink Floyd", "Animals")
+        first._cache_set(first._release_meta_cache, "Pink Floyd|Animals", "1977||rock")
+
+        second = mod.MetadataService()
+
+        def boom(*args):
+            raise AssertionError("restart must not repeat the lookup")
+
+        monkeypatch.setattr(second, "fetch_musicbrainz_artwork", boom)
+        assert second._fetch_album_artwork("Pink Floyd", "Animals") == (
+            "https://caa/x.jpg",
+            "musicbrainz",
+        )
+        assert second._release_meta_cache["Pink Floyd|Animals"] == "1977||rock"
+
+    def test_negative_results_use_their_own_ttl(
+        self, metadata_service_module, tmp_path
+    ):
+        mod = metadata_service_module
+        store = mod.LookupStore(tmp_path / "l.sqlite3")
+        cache = mod.LookupCache(store, "ns", ttl=3600, negative_ttl=-1)
+
+        cache["found"] = "url|itunes"
+        cache["missing"] = "||"
+        cache.set("retry-later", "", ttl=3600)
+
+        fresh = mod.LookupCache(store, "ns")
+        assert fresh.get("found") == "url|itunes"
+        assert "missing" not in fresh and "missing" not in cache
+        assert fresh["retry-later"] == ""
+
+    def test_schema_version_mismatch_rebuilds(self, metadata_service_module, tmp_path):
+        import sqlite3
+
+        mod = metadata_service_module
+        path = tmp_path / "l.sqlite3"
+        db = sqlite3.connect(path)
+        db.execute("CREATE TABLE lookups (whatever TEXT)")
+        db.execute("PRAGMA user_version = 99")
+        db.commit()
+        db.close()
+
+        store = mod.LookupStore(path)
+        store.put("ns", "k", "v", 2e9)
+        assert store.get("ns", "k") == ("v", 2e9)
+
+    def test_trim_evicts_least_recently_used(
+        self, metadata_service_module, tmp_path, monkeypatch
+    ):
+        mod = metadata_service_module
+        monkeypatch.setattr(mod.LookupStore, "_TRIM_EVERY", 1)
+        clock = iter(range(1000, 2000))
+        monkeypatch.setattr(mod.time, "time", lambda: next(clock))
+        store = mod.LookupStore(tmp_path / "l.sqlite3", max_entries=3)
+
+        for key in "abcd":
+            store.put("ns", key, key, 1e12)
+
+        assert [store.get("ns", k) is not None for k in "abcd"] == [
+            False,
+            True,
+            True,
+            True,
+        ]
+
+    def test_unusable_database_falls_back_to_memory(
+        self, metadata_service_module, tmp_path
+    ):
+        mod = metadata_service_module
+        store = mod.LookupStore(tmp_path / "missing-dir" / "l.sqlite3")
+        cache = mod.LookupCache(store, "ns")
+
+        cache["k"] = "v"
+
+        assert cache["k"] == "v"
+        assert store.get("ns", "k") is None
+
+
+class TestArtworkStore:
+    """Content-addressed artwork: dedup, memory-only repeat lookups, HTTP."""
+
+    _PNG = b"\x89PNG\r\n\x1a\n" + b"pixels"
+
+    def test_identical_bytes_stored_once(self, service):
+        store = service.artwork_store
+        a = store.put("https://a/cover.png", self._PNG, ".png")
+        b = store.put("mpd:Album/01.flac", self._PNG, ".png")
+
+        assert a == b and a.endswith(".png")
+        assert [p.name for p in store.directory.glob("artwork_*")] == [a]
+        assert store.lookup("https://a/cover.png") == a
+
+    def test_repeat_lookups_skip_filesystem_and_dns(self, service, monkeypatch):
+        path_cls = type(service.artwork_dir)
+        name = service.artwork_store.put("https://a/c.png", self._PNG, ".png")
+        service.artwork_store.put("mpd:x.flac", self._PNG, ".png")
+
+        def boom(*args, **kwargs):
+            raise AssertionError("repeat lookup must not hit disk or DNS")
+
+        monkeypatch.setattr(path_cls, "exists", boom)
+        monkeypatch.setattr(path_cls, "stat", boom)
+        monkeypatch.setattr(service.mpd, "binary_command", boom)
+        import socket
+
+        monkeypatch.setattr(socket, "getaddrinfo", boom)
+
+        assert service._download_artwork("https://a/c.png", "") == name
+        assert service._fetch_mpd_artwork("x.flac") == name
+
+    def test_index_survives_restart_and_drops_missing_blobs(
+        self, metadata_service_module, service
+    ):
+        kept = service.artwork_store.put("kept", self._PNG, ".png")
+        gone = service.artwork_store.put("gone", b"GIF89a-other", ".gif")
+        (service.artwork_dir / gone).unlink()
+
+        restarted = metadata_service_module.MetadataService().artwork_store
+
+        assert restarted.lookup("kept") == kept
+        assert restarted.lookup("gone") == ""
+
+    def test_handle_artwork_immutable_with_etag(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        mod = metadata_service_module
+        monkeypatch.setattr(mod, "_service", service)
+        name = service.artwork_store.put("src", self._PNG, ".png")
+
+        def get(filename, **headers):
+            request = types.SimpleNamespace(
+                match_info={"filename": filename}, headers=headers, query={}
+            )
+            return asyncio.run(mod.handle_artwork(request))
+
+        ok = get(name)
+        headers = ok.kwargs["headers"]
+        assert ok.kwargs["body"] == self._PNG
+        assert "immutable" in headers["Cache-Control"]
+        assert headers["ETag"] == f'"{name[len("artwork_") : -len(".png")]}"'
+        assert headers["Content-Type"] == "image/png"
+
+        cached = get(name, **{"If-None-Match": headers["ETag"]})
+        assert cached.kwargs["status"] == 304 and "body" not in cached.kwargs
+
+        assert get("artwork_0123abcd.jpg").kwargs["status"] == 404
+        assert get("../" + name).kwargs["status"] == 404
+
+
+class TestArtworkGarbageCollection:
+    """Quota-bound artwork directory, LRU by last-served time."""
+
+    def _store(self, mod, tmp_path, **limits):
+        directory = tmp_path / "art"
+        directory.mkdir(exist_ok=True)
+        index = mod.LookupCache(None, "artwork_blob")
+        return mod.ArtworkStore(directory, index, **limits)
+
+    def test_evicts_least_recently_served_but_never_published(
+        self, metadata_service_module, tmp_path, monkeypatch
+    ):
+        mod = metadata_service_module
+        store = self._store(mod, tmp_path, max_bytes=250, max_files=100)
+        clock = iter(range(1000, 2000))
+        monkeypatch.setattr(mod.time, "time", lambda: next(clock))
+        old = store.put("old", b"a" * 100, ".jpg")
+        published = store.put("published", b"b" * 100, ".jpg")
+        recent = store.put("recent", b"c" * 100, ".jpg")
+        store.touch(old)  # served again: now newer than `published`
+
+        stats = store.collect({published})
+
+        assert published in store and old in store
+        assert recent not in store
+        assert not (store.directory / recent).exists()
+        assert stats["files"] == 2 and stats["bytes"] == 200
+        assert stats["evicted_files"] == 1 and stats["evicted_bytes"] == 100
+        assert store.lookup("recent") == ""
+
+    def test_file_count_quota_and_legacy_files(self, metadata_service_module, tmp_path):
+        mod = metadata_service_module
+        directory = tmp_path / "art"
+        directory.mkdir()
+        legacy = directory / ("artwork_" + "0" * 32 + ".jpg")
+        legacy.write_bytes(b"old scheme")
+        store = self._store(mod, tmp_path, max_bytes=10**9, max_files=2)
+        for n in range(4):
+            store.put(f"s{n}", bytes([n]) * 10, ".png")
+
+        store.collect(set())
+
+        assert not legacy.exists()
+        blobs = [p.name for p in directory.iterdir() if p.is_file()]
+        assert sorted(blobs) == sorted(store._sizes)
+        assert [store.lookup(f"s{n}") != "" for n in range(4)] == [
+            False,
+            False,
+            True,
+            True,
+        ]
+
+    def test_last_use_survives_restart_via_mtime(
+        self, metadata_service_module, tmp_path, monkeypatch
+    ):
+        import os
+
+        mod = metadata_service_module
+        store = self._store(mod, tmp_path)
+        first = store.put("first", b"first", ".jpg")
+        second = store.put("second", b"second", ".jpg")
+        past = mod.time.time() - 7200
+        for name in (first, second):
+            os.utime(store.directory / name, (past, past))
+        store._mtimes = dict.fromkeys(store._mtimes, past)
+        store.touch(first)
+
+        store.collect(set())
+
+        restarted = self._store(mod, tmp_path, max_bytes=6)
+        restarted.collect(set())
+        assert first in restarted and second not in restarted
+
+    def test_referenced_artwork_and_status_section(
+        self, metadata_service_module, service
+    ):
+        mod = metadata_service_module
+        sm = mod.StreamMetadata("MPD")
+        sm.current = {
+            "artwork": "http://h:8083/artwork/artwork_aa.jpg",
+            "artist_image": "http://h:8083/artwork/artwork_bb.jpg",
+        }
+        service.streams["MPD"] = sm
+        assert {"artwork_aa.jpg", "artwork_bb.jpg"} <= service._referenced_artwork()
+
+        html = mod._render_artwork_cache_section(
+            {
+                "files": 3,
+                "bytes": 3 * 1024 * 1024,
+                "max_files": 2000,
+                "max_bytes": 200 * 1024 * 1024,
+                "evicted_files": 7,
+                "evicted_bytes": 1024 * 1024,
+                "collected_at": 0.0,
+            }
+        )
+        assert "Artwork Cache" in html
+        assert "3 / 2000 files" in html and "3.0 / 200 MB" in html
+        assert "Evicted since start: 7 files" in html
+        assert mod._render_artwork_cache_section(None) == ""
+
+
+class TestArtworkVariants:
+    """Ingest normalization and `?size=` variants (needs Pillow)."""
+
+    @staticmethod
+    def _image(size, mode="RGB", fmt="PNG"):
+        import io
+
+        from PIL import Image
+
+        buf = io.BytesIO()
+        Image.new(mode, size, (200, 30, 30)).save(buf, fmt)
+        return buf.getvalue()
+
+    @staticmethod
+    def _dimensions(data):
+        import io
+
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as img:
+            return img.size, img.format
+
+    def test_oversized_artwork_normalized_at_ingest(self, metadata_service_module):
+        mod = metadata_service_module
+        big = self._image((2400, 1800))
+        data, ext = mod.MetadataService._normalize_artwork(big)
+        assert ext == ".jpg"
+        assert self._dimensions(data) == ((1200, 900), "JPEG")
+
+        with_alpha = self._image((2000, 2000), mode="RGBA")
+        data, ext = mod.MetadataService._normalize_artwork(with_alpha)
+        assert ext == ".webp" and self._dimensions(data)[0] == (1200, 1200)
+
+        small = self._image((500, 500))
+        assert mod.MetadataService._normalize_artwork(small) == (small, ".png")
+        garbage = b"\xff\xd8\xff not really a jpeg"
+        assert mod.MetadataService._normalize_artwork(garbage) == (garbage, ".jpg")
+
+    def test_variant_generated_once_and_dropped_with_blob(
+        self, metadata_service_module, service
+    ):
+        store = service.artwork_store
+        name = store.put("src", self._image((800, 800)), ".png")
+
+        path = store.variant(name, 300)
+        assert path.parent == store.directory / "variants"
+        assert self._dimensions(path.read_bytes()) == ((300, 300), "JPEG")
+        assert store.variant(name, 300) == path
+        assert store.variant(name, 1000) is None  # original already fits
+
+        restarted = metadata_service_module.MetadataService().artwork_store
+        assert restarted._variants[(name[:-4], "300")] == path.name
+
+        store.max_files = 0
+        store.collect(set())
+        assert not path.exists() and not store._variants
+
+    def test_variants_count_against_quota(self, metadata_service_module, service):
+        store = service.artwork_store
+        name = store.put("src", self._image((800, 800)), ".png")
+        blob_bytes = store.stats()["bytes"]
+        raw = store.raw_variant(name, "bgra", 64, 64)
+
+        stats = store.stats()
+        assert stats["files"] == 2 and stats["bytes"] == blob_bytes + 64 * 64 * 4
+
+        # The blob alone fits; with its raw buffer it does not
+        store.max_bytes = blob_bytes
+        store.collect(set())
+        assert name not in store and not raw.exists()
+        assert store.stats()["bytes"] == 0
+        assert store.evicted_files == 2
+
+    def test_orphaned_variants_removed_on_start(self, metadata_service_module, service):
+        store = service.artwork_store
+        name = store.put("src", self._image((800, 800)), ".png")
+        path = store.variant(name, 300)
+        (store.directory / name).unlink()
+
+        restarted = metadata_service_module.MetadataService().artwork_store
+
+        assert not path.exists() and not restarted._variant_sizes
+
+    def test_warm_makes_recently_requested_sizes(self, service):
+        store = service.artwork_store
+        seen = store.put("a", self._image((400, 400)), ".png")
+        store.variant(seen, 120)
+        store.raw_variant(seen, "rgb565", 32, 32)
+        upcoming = store.put("b", self._image((500, 500)), ".png")
+
+        store.warm(upcoming)
+
+        stem = upcoming[:-4]
+        assert (store.variants_dir / store._variants[(stem, "120")]).exists()
+        # Raw buffers are only made when a display asks for one
+        assert (stem, "32x32-rgb565") not in store._variants
+
+    def test_handle_artwork_size_param(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        mod = metadata_service_module
+        monkeypatch.setattr(mod, "_service", service)
+        name = service.artwork_store.put("src", self._image((800, 800)), ".png")
+        calls = []
+        real_variant = service.artwork_store.variant
+        monkeypatch.setattr(
+            service.artwork_store,
+            "variant",
+            lambda *args: calls.append(args) or real_variant(*args),
+        )
+
+        def get(size, **headers):
+            request = types.SimpleNamespace(
+                match_info={"filename": name}, headers=headers, query={"size": size}
+            )
+            return asyncio.run(mod.handle_artwork(request))
+
+        ok = get("200")
+        headers = ok.kwargs["headers"]
+        assert headers["Content-Type"] == "image/jpeg"
+        assert headers["ETag"].endswith('-200"')
+        assert self._dimensions(ok.kwargs["body"])[0] == (200, 200)
+
+        cached = get("200", **{"If-None-Match": headers["ETag"]})
+        assert cached.kwargs["status"] == 304
+        assert calls == [(name, 200)]
+
+        for bad in ("0", "abc", "-5", "15", "9" * 5000):
+            assert get(bad).kwargs["status"] == 400
+
+    def test_handle_artwork_size_above_limit_is_clamped(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        mod = metadata_service_module
+        monkeypatch.setattr(mod, "_service", service)
+        monkeypatch.setattr(mod, "ARTWORK_MAX_DIMENSION", 600)
+        name = service.artwork_store.put("src", self._image((800, 800)), ".png")
+
+        request = types.SimpleNamespace(
+            match_info={"filename": name}, headers={}, query={"size": "1624"}
+        )
+        response = asyncio.run(mod.handle_artwork(request))
+
+        assert "status" not in response.kwargs
+        assert response.kwargs["headers"]["ETag"].endswith('-600"')
+        assert self._dimensions(response.kwargs["body"])[0] == (600, 600)
+
+    def test_raw_variant_matches_framebuffer_packing(
+        self, metadata_service_module, service
+    ):
+        import zlib
+
+        store = service.artwork_store
+        name = store.put("src", self._image((64, 64)), ".png")
+
+        rgb565 = store.raw_variant(name, "rgb565", 32, 16)
+        assert rgb565.suffix == ".bin"
+        data = rgb565.read_bytes()
+        assert len(data) == 32 * 16 * 2
+        # (200, 30, 30) → RRRRR GGGGGG BBBBB, little-endian
+        expected = (200 & 0xF8) << 8 | (30 & 0xFC) << 3 | 30 >> 3
+        assert int.from_bytes(data[:2], "little") == expected
+
+        bgra = store.raw_variant(name, "bgra", 8, 8, compress=True)
+        data = zlib.decompress(bgra.read_bytes())
+        assert data[:4] == bytes([30, 30, 200, 255])
+        assert len(data) == 8 * 8 * 4
+        assert store.raw_variant(name, "bgra", 8, 8, compress=True) == bgra
+
+    def test_handle_artwork_raw_format(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        mod = metadata_service_module
+        monkeypatch.setattr(mod, "_service", service)
+        name = service.artwork_store.put("src", self._image((64, 64)), ".png")
+
+        def get(**query):
+            request = types.SimpleNamespace(
+                match_info={"filename": name}, headers={}, query=query
+            )
+            return asyncio.run(mod.handle_artwork(request))
+
+        ok = get(format="rgb565", w="20", h="18")
+        assert ok.kwargs["headers"]["Content-Type"] == "application/octet-stream"
+        assert ok.kwargs["headers"]["ETag"].endswith('-20x18-rgb565"')
+        assert len(ok.kwargs["body"]) == 20 * 18 * 2
+
+        for bad in (
+            {"format": "yuv", "w": "20", "h": "18"},
+            {"format": "bgra", "w": "20"},
+            {"format": "bgra", "w": "20", "h": "5000"},
+            {"format": "bgra", "w": "20", "h": "8"},
+            {"format": "bgra", "w": "20", "h": "18", "compress": "gzip"},
+        ):
+            assert get(**bad).kwargs["status"] == 400
+
+
+class TestArtworkPlaceholder:
+    """Dominant colour + tiny thumbnail computed at ingest, sent inline."""
+
+    @staticmethod
+    def _png(color=(200, 30, 30), size=(300, 300)):
+        import io
+
+        from PIL import Image
+
+        buf = io.BytesIO()
+        img = Image.new("RGB", size, color)
+        img.paste((10, 10, 240), (0, 0, size[0] // 4, size[1]))
+        img.save(buf, "PNG")
+        return buf.getvalue()
+
+    def test_computed_at_ingest_and_persisted(self, metadata_service_module, service):
+        import base64
+
+        name = service.artwork_store.put("src", self._png(), ".png")
+        placeholder = service.artwork_store.placeholders.get(name)
+        assert placeholder is not None
+
+        restarted = metadata_service_module.MetadataService().artwork_store
+        result = restarted.placeholder(name)
+        assert result["color"] == "#c81e1e"  # three quarters of the area
+        assert "#0a0af0" in result["palette"]
+        side = result["thumb_size"]
+        assert len(base64.b64decode(result["thumb"])) == side * side * 3
+
+    def test_computed_lazily_for_older_blobs(self, metadata_service_module, service):
+        store = service.artwork_store
+        name = store.put("src", self._png(), ".png")
+        store.placeholders.pop(name)
+        assert store.placeholder(name)["color"] == "#c81e1e"
+        assert store.placeholder("artwork_unknown.png") is None
+
+    def test_attached_only_for_local_artwork(self, metadata_service_module, service):
+        name = service.artwork_store.put("src", self._png(), ".png")
+        metadata = {"artwork": service._artwork_url(name)}
+        service._attach_placeholder(metadata)
+        assert metadata["artwork_placeholder"]["color"] == "#c81e1e"
+        assert "artwork_placeholder" in service._ARTWORK_FIELDS
+
+        metadata["artwork"] = "http://h:8083/defaults/default-radio.png"
+        service._attach_placeholder(metadata)
+        assert "artwork_placeholder" not in metadata
+
+
+@pytest.mark.skipif(real_aiohttp is None, reason="aiohttp not installed")
+class TestHttpClient:
+    """Pooled outbound HTTP: SSRF guard, streamed downloads, thread bridge."""
+
+    _BODY = b"\x89PNG\r\n\x1a\n" + b"x" * 5000
+
+    @pytest.fixture()
+    def mod(self, metadata_service_module, monkeypatch):
+        monkeypatch.setattr(metadata_service_module, "aiohttp", real_aiohttp)
+        return metadata_service_module
+
+    async def _server(self):
+        async def image(request):
+            return real_web.Response(body=self._BODY)
+
+        async def redirect(request):
+            raise real_web.HTTPFound(request.query["to"])
+
+        async def api(request):
+            return real_web.json_response({"ok": True})
+
+        app = real_web.Application()
+        app.router.add_get("/img", image)
+        app.router.add_get("/redir", redirect)
+        app.router.add_get("/api", api)
+        runner = real_web.AppRunner(app)
+        await runner.setup()
+        site = real_web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        return runner, f"http://127.0.0.1:{port}", f"http://localhost:{port}"
+
+    def test_restricted_hosts_blocked_unless_trusted(self, mod, tmp_path):
+        import asyncio
+        import hashlib
+
+        async def scenario():
+            runner, base, by_name = await self._server()
+            client = mod.HttpClient("test", set())
+            try:
+                for url in (f"{base}/img", f"{by_name}/img"):
+                    with pytest.raises(mod.BlockedAddressError):
+                        await client.download(url, tmp_path, 10**6)
+                with pytest.raises(ValueError):
+                    await client.download("ftp://example.com/a.png", tmp_path, 10**6)
+
+                client.trusted_ips.add("127.0.0.1")
+                path, digest, size = await client.download(
+                    f"{base}/redir?to=/img", tmp_path, 10**6
+                )
+                assert path.read_bytes() == self._BODY
+                assert digest == hashlib.sha256(self._BODY).hexdigest()
+                assert size == len(self._BODY)
+                path.unlink()
+
+                # A redirect is re-checked: trusted host → untrusted target
+                with pytest.raises(mod.BlockedAddressError):
+                    await client.download(
+                        f"{base}/redir?to=http://10.255.255.1/x", tmp_path, 10**6
+                    )
+                with pytest.raises(ValueError):
+                    await client.download(f"{base}/img", tmp_path, 100)
+            finally:
+                await client.close()
+                await runner.cleanup()
+
+        asyncio.run(scenario())
+        assert list(tmp_path.iterdir()) == []  # no temp files left behind
+
+    def test_sync_bridge_from_worker_thread(self, mod):
+        import asyncio
+
+        async def scenario():
+            runner, base, _ = await self._server()
+            client = mod.HttpClient("test", set())
+            loop = asyncio.get_running_loop()
+            try:
+                with pytest.raises(RuntimeError):
+                    client.get_json_sync(f"{base}/api")  # not bound yet
+                client.bind(loop)
+                result = await loop.run_in_executor(
+                    None, client.get_json_sync, f"{base}/api"
+                )
+                with pytest.raises(RuntimeError):
+                    client.get_json_sync(f"{base}/api")  # on the loop thread
+                return result, client.session()
+            finally:
+                await client.close()
+                await runner.cleanup()
+
+        result, session = asyncio.run(scenario())
+        assert result == {"ok": True}
+        assert session.closed
+
+    def test_download_adopts_streamed_file(self, mod, service, monkeypatch):
+        import hashlib
+
+        def fake_download(url, directory, max_bytes):
+            tmp = directory / "download_x.tmp"
+            tmp.write_bytes(self._BODY)
+            return tmp, hashlib.sha256(self._BODY).hexdigest(), len(self._BODY)
+
+        monkeypatch.setattr(service.http, "download_sync", fake_download)
+        name = service._download_artwork("https://example.com/a.png", "")
+
+        assert name == f"artwork_{hashlib.sha256(self._BODY).hexdigest()}.png"
+        assert (service.artwork_dir / name).read_bytes() == self._BODY
+        assert not (service.artwork_dir / "download_x.tmp").exists()
+        assert service.artwork_store.lookup("https://example.com/a.png") == name
+
+
+class TestRateScheduler:
+    """Priority-ordered, rate-limited MusicBrainz/Wikidata requests."""
+
+    @staticmethod
+    def _caller(mod, scheduler, results, key, priority, ticket=None, ran=None):
+        import threading
+
+        def fetch():
+            if ran is not None:
+                ran.append(key)
+            return key
+
+        def run():
+            mod._lookup_context.set((priority, ticket))
+            try:
+                results[key] = scheduler.call("mb", key, fetch)
+            except mod.LookupCancelled:
+                results[key] = "cancelled"
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _blocked(mod, scheduler):
+        """Occupy the dispatcher until the returned event is set."""
+        import threading
+
+        gate, started = threading.Event(), threading.Event()
+
+        def hold():
+            started.set()
+            gate.wait(5)
+
+        threading.Thread(target=scheduler.call, args=("mb", "hold", hold)).start()
+        started.wait(5)
+        return gate
+
+    @staticmethod
+    def _wait_queued(scheduler, count):
+        import time
+
+        deadline = time.monotonic() + 5
+        while scheduler.queued()["mb"] < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_serves_best_priority_first(self, metadata_service_module):
+        mod = metadata_service_module
+        scheduler = mod.RateScheduler({"mb": 0.0})
+        gate = self._blocked(mod, scheduler)
+        results, ran = {}, []
+        threads = [
+            self._caller(mod, scheduler, results, key, prio, ran=ran)
+            for key, prio in (
+                ("prefetch", mod.PRIORITY_PREFETCH),
+                ("artist", mod.PRIORITY_ARTIST_IMAGE),
+                ("artwork", mod.PRIORITY_ARTWORK),
+            )
+        ]
+        self._wait_queued(scheduler, 3)
+        gate.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert ran == ["artwork", "artist", "prefetch"]
+        assert results == {
+            "prefetch": "prefetch",
+            "artist": "artist",
+            "artwork": "artwork",
+        }
+
+    def test_merges_duplicates_and_drops_cancelled(self, metadata_service_module):
+        mod = metadata_service_module
+        scheduler = mod.RateScheduler({"mb": 0.0})
+        skipped, playing = mod.LookupTicket(), mod.LookupTicket()
+
+        gate = self._blocked(mod, scheduler)
+        results = {}
+        threads = [
+            self._caller(mod, scheduler, results, "old-track", 0, skipped),
+            self._caller(mod, scheduler, results, "shared", 0, skipped),
+        ]
+        self._wait_queued(scheduler, 2)
+        shared_results = {}
+        threads.append(
+            self._caller(mod, scheduler, shared_results, "shared", 2, playing)
+        )
+        import time
+
+        deadline = time.monotonic() + 5
+        while scheduler.merged < 1 and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+        scheduler.cancel(skipped)
+        gate.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert results["old-track"] == "cancelled"
+        # Still wanted by the playing track, so it ran — once, for both
+        assert results["shared"] == shared_results["shared"] == "shared"
+        assert scheduler.merged == 1 and scheduler.cancelled == 1
+
+    def test_rate_limit_spaces_requests(self, metadata_service_module):
+        import time
+
+        mod = metadata_service_module
+        scheduler = mod.RateScheduler({"mb": 0.05})
+        started = []
+        for n in range(3):
+            scheduler.call("mb", n, lambda: started.append(time.monotonic()))
+        gaps = [b - a for a, b in zip(started, started[1:])]
+        assert all(gap >= 0.045 for gap in gaps)
+
+    def test_artist_image_lookups_use_provider_buckets(self, service, monkeypatch):
+        calls = []
+
+        def fake_call(provider, key, fn, *args, priority=None):
+            calls.append(provider)
+            if "artist/?query" in key:
+                return {"artists": [{"id": "mbid"}]}
+            if "url-rels" in key:
+                return {
+                    "relations": [{"type": "wikidata", "url": {"resource": "x/Q1"}}]
+                }
+            return {}
+
+        monkeypatch.setattr(service.scheduler, "call", fake_call)
+        assert service._fetch_artist_image("Artist") == ""
+        assert calls == ["musicbrainz", "musicbrainz", "wikidata"]
+
+
+class TestProviderCircuitBreaker:
+    """External providers fail fast while down and are retried when back."""
+
+    _STREAM = {
+        "id": "Spotify",
+        "status": "playing",
+        "properties": {
+            "metadata": {"title": "Money", "artist": "Pink Floyd", "album": "DSOTM"}
+        },
+    }
+
+    def test_opens_probes_and_closes(self, metadata_service_module):
+        mod = metadata_service_module
+        breaker = mod.CircuitBreaker("mb", threshold=2, cooldown=10, max_cooldown=30)
+
+        breaker.failure("timeout")
+        assert breaker.acquire()  # one failure is not an outage yet
+        breaker.failure("timeout")
+        assert breaker.state == breaker.OPEN
+        assert not breaker.ready() and not breaker.acquire()
+        assert breaker.short_circuited == 1
+
+        breaker.retry_at = 0  # cool-down over: exactly one probe
+        assert breaker.ready()
+        assert breaker.acquire()
+        assert breaker.state == breaker.HALF_OPEN
+        assert not breaker.acquire()
+        breaker.failure("timeout")
+        assert breaker.state == breaker.OPEN and breaker.cooldown == 20
+
+        breaker.retry_at = 0
+        assert breaker.acquire()
+        breaker.success()
+        assert breaker.state == breaker.CLOSED and breaker.cooldown == 10
+        assert breaker.trips == 1
+
+    def test_provider_by_host(self, service):
+        providers = service.providers
+        assert providers.for_url("https://musicbrainz.org/ws/2/x").name == "musicbrainz"
+        assert providers.for_url("https://ia801.us.archive.org/a.jpg").name == (
+            "coverartarchive"
+        )
+        assert providers.for_url("https://is1-ssl.mzstatic.com/a.jpg").name == "itunes"
+        assert providers.for_url("http://127.0.0.1:1780/cover.jpg") is None
+        assert providers.for_url("https://notmusicbrainz.org/") is None
+
+    def test_api_request_fails_fast_once_open(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        ProviderUnavailable = metadata_service_module.ProviderUnavailable
+        calls = []
+
+        def unreachable(url, timeout):
+            calls.append(url)
+            raise OSError("Temporary failure in name resolution")
+
+        monkeypatch.setattr(service.http, "get_json_sync", unreachable)
+        url = "https://itunes.apple.com/search?term=x"
+        for _ in range(3):
+            with pytest.raises(ProviderUnavailable):
+                service._make_api_request(url)
+
+        assert len(calls) == 2  # the third never left the host
+        assert service.providers.breakers["itunes"].state == "open"
+
+    def test_provider_answer_is_not_an_outage(self, service, monkeypatch):
+        def bad_json(url, timeout):
+            raise ValueError("not JSON")
+
+        monkeypatch.setattr(service.http, "get_json_sync", bad_json)
+        for _ in range(3):
+            assert service._make_api_request("https://itunes.apple.com/x") is None
+        assert service.providers.breakers["itunes"].state == "closed"
+
+    def test_nothing_cached_while_provider_down(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        mod = metadata_service_module
+
+        def down(artist, album):
+            raise mod.ProviderUnavailable("musicbrainz")
+
+        monkeypatch.setattr(service, "fetch_musicbrainz_artwork", down)
+        monkeypatch.setattr(service, "_fetch_itunes_artwork", lambda a, b: "")
+        with pytest.raises(mod.ProviderUnavailable):
+            service.fetch_album_artwork("Pink Floyd", "DSOTM")
+        assert "Pink Floyd|DSOTM" not in service.artwork_cache
+
+        # A fallback hit is used but not cached over the better provider
+        monkeypatch.setattr(
+            service, "_fetch_itunes_artwork", lambda a, b: "https://x/600.jpg"
+        )
+        assert service.fetch_album_artwork("Pink Floyd", "DSOTM") == (
+            "https://x/600.jpg",
+            "itunes",
+        )
+        assert "Pink Floyd|DSOTM" not in service.artwork_cache
+
+    def test_radio_falls_back_to_default_and_defers(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        mod = metadata_service_module
+
+        def down(station, url):
+            raise mod.ProviderUnavailable("radio-browser")
+
+        monkeypatch.setattr(service, "fetch_radio_logo", down)
+        ticket = mod.LookupTicket()
+        metadata = {"playing": True, "codec": "RADIO", "station_name": "Radio X"}
+        token = mod._lookup_context.set((0, ticket))
+        try:
+            service.enrich_artwork(metadata)
+        finally:
+            mod._lookup_context.reset(token)
+
+        assert metadata["artwork"].endswith("/defaults/default-radio.png")
+        assert ticket.unavailable == {"radio-browser"}
+
+    def test_deferred_enrichment_reruns_when_provider_back(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        mod = metadata_service_module
+        monkeypatch.setattr(service, "_broadcast_to_stream", self._noop)
+        runs = []
+
+        def artwork(metadata):
+            runs.append(1)
+            if len(runs) == 1:
+                raise mod.ProviderUnavailable("musicbrainz")
+            metadata["artwork"] = "http://host/artwork/a.jpg"
+
+        monkeypatch.setattr(service, "enrich_artwork", artwork)
+        monkeypatch.setattr(service, "enrich_tags", lambda metadata: None)
+        monkeypatch.setattr(service, "enrich_artist_image", lambda metadata: None)
+        breaker = service.providers.breakers["musicbrainz"]
+
+        async def scenario():
+            await service._process_stream(self._STREAM, {})
+            await service.streams["Spotify"].enrich_task
+            deferred = set(service.streams["Spotify"].deferred)
+            breaker.failure("timeout")
+            breaker.failure("timeout")
+            await service._process_stream(self._STREAM, {})  # still down
+            held = len(runs)
+            breaker.retry_at = 0
+            await service._process_stream(self._STREAM, {})
+            await service.streams["Spotify"].enrich_task
+            return deferred, held
+
+        deferred, held = asyncio.run(scenario())
+
+        assert deferred == {"musicbrainz"}
+        assert held == 1
+        assert runs == [1, 1]
+        assert service.streams["Spotify"].current["artwork"].endswith("a.jpg")
+        assert not service.streams["Spotify"].deferred
+
+    @staticmethod
+    async def _noop(stream_id, metadata, server):
+        return None
+
+    def test_download_probe_is_always_resolved(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        mod = metadata_service_module
+        breaker = service.providers.breakers["itunes"]
+        errors = iter([mod.BlockedAddressError("10.0.0.1"), ValueError("too big")])
+
+        def fake_download(url, directory, limit):
+            raise next(errors)
+
+        monkeypatch.setattr(service.http, "download_sync", fake_download)
+
+        def probe(name):
+            breaker.state, breaker.retry_at = breaker.OPEN, 0
+            return service._download_artwork(f"https://is1-ssl.mzstatic.com/{name}", "")
+
+        # Blocked before any request went out: the next acquire probes again
+        assert probe("a.jpg") == ""
+        assert breaker.state == breaker.OPEN and breaker.acquire()
+        # The host answered, just not with usable artwork: reachable
+        assert probe("b.jpg") == ""
+        assert breaker.state == breaker.CLOSED
+
+    def test_status_section(self, metadata_service_module):
+        mod = metadata_service_module
+        health = mod.ProviderHealth({"a.org": "alpha", "b.org": "beta"})
+        health.breakers["beta"].failure("ConnectTimeout <x>")
+        health.breakers["beta"].failure("ConnectTimeout <x>")
+        health.breakers["beta"].acquire()
+
+        html = mod._render_providers_section(health.stats())
+
+        assert "alpha: reachable" in html
+        assert "beta: unreachable, next try in" in html
+        assert "ConnectTimeout &lt;x&gt;" in html
+        assert "1 lookups skipped" in html
+        assert mod._render_providers_section(None) == ""
+
+
+class TestMpdPrefetch:
+    """Upcoming MPD queue entries are looked up before they play."""
+
+    class _FakeMpd:
+        def __init__(self, status, queue):
+            self.status = status
+            self.queue = queue
+            self.commands = []
+
+        def command(self, command):
+            self.commands.append(command)
+            return dict(self.status)
+
+        def command_list(self, commands):
+            self.commands.extend(commands)
+            return [dict(self.queue[int(c.split()[1])]) for c in commands]
+
+    _QUEUE = [
+        {"file": f"music/{n}.flac", "Artist": "Pink Floyd", "Album": album}
+        for n, album in enumerate(["Animals", "Meddle", "DSOTM", "Wish", "Relics"])
+    ]
+
+    def _upcoming(self, service, **status):
+        status = {"song": "1", "nextsong": "2", "playlistlength": "5", **status}
+        service.mpd = self._FakeMpd(status, self._QUEUE)
+        return [s["file"] for s in service._upcoming_songs(3)]
+
+    def test_upcoming_follows_queue_order(self, service):
+        assert self._upcoming(service) == [
+            "music/2.flac",
+            "music/3.flac",
+            "music/4.flac",
+        ]
+        # End of queue: stops, or wraps with repeat (never onto the current)
+        assert self._upcoming(service, song="3", nextsong="4") == ["music/4.flac"]
+        assert self._upcoming(service, song="3", nextsong="4", repeat="1") == [
+            "music/4.flac",
+            "music/0.flac",
+            "music/1.flac",
+        ]
+        assert self._upcoming(service, song="0", nextsong="1", repeat="1")[-1] == (
+            "music/3.flac"
+        )
+        # Random: only the next song is decided
+        assert self._upcoming(service, random="1") == ["music/2.flac"]
+        assert self._upcoming(service, nextsong="") == []
+
+    def test_prefetch_warms_artwork_and_tags_at_low_priority(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        mod = metadata_service_module
+        service.mpd = self._FakeMpd(
+            {"song": "0", "nextsong": "1", "playlistlength": "3"}, self._QUEUE
+        )
+        seen = []
+
+        def album_artwork(artist, album):
+            seen.append(("artwork", album, mod._lookup_context.get()[0]))
+            return f"https://caa/{album}.jpg", "musicbrainz"
+
+        def tags(metadata):
+            seen.append(("tags", metadata["album"], mod._lookup_context.get()[0]))
+
+        monkeypatch.setattr(
+            service,
+            "fetch_mpd_artwork",
+            lambda f, album="": "artwork_a.jpg" if "1" in f else "",
+        )
+        monkeypatch.setattr(service, "fetch_album_artwork", album_artwork)
+        monkeypatch.setattr(service, "download_artwork", lambda url: "artwork_b.jpg")
+        monkeypatch.setattr(service, "enrich_tags", tags)
+        warmed = []
+        monkeypatch.setattr(service.artwork_store, "warm", warmed.append)
+
+        service._prefetch_queue(mod.LookupTicket())
+
+        prio = mod.PRIORITY_PREFETCH
+        assert seen == [
+            ("tags", "Meddle", prio),  # embedded art: no album lookup
+            ("artwork", "DSOTM", prio),
+            ("tags", "DSOTM", prio),
+        ]
+        assert warmed == ["artwork_a.jpg", "artwork_b.jpg"]
+        assert mod._lookup_context.get()[0] == mod.PRIORITY_ARTWORK
+
+    def test_budget_and_cancellation_stop_the_round(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        mod = metadata_service_module
+        service.mpd = self._FakeMpd(
+            {"song": "0", "nextsong": "1", "playlistlength": "5"}, self._QUEUE
+        )
+        done = []
+        monkeypatch.setattr(service, "_prefetch_song", lambda s: done.append(s))
+
+        monkeypatch.setattr(mod, "MPD_PREFETCH_BUDGET", -1)
+        service._prefetch_queue(mod.LookupTicket())
+        assert done == []
+
+        monkeypatch.setattr(mod, "MPD_PREFETCH_BUDGET", 30)
+        ticket = mod.LookupTicket()
+        ticket.cancelled = True
+        service._prefetch_queue(ticket)
+        assert done == []
+
+    def test_track_change_restarts_prefetch(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        mod = metadata_service_module
+        rounds = []
+
+        def prefetch_queue(ticket):
+            rounds.append(ticket)
+
+        monkeypatch.setattr(service, "_prefetch_queue", prefetch_queue)
+        monkeypatch.setattr(service, "enrich_artwork", lambda m: None)
+        monkeypatch.setattr(service, "enrich_tags", lambda m: None)
+        monkeypatch.setattr(service, "enrich_artist_image", lambda m: None)
+
+        async def broadcast(stream_id, metadata, server):
+            return None
+
+        monkeypatch.setattr(service, "_broadcast_to_stream", broadcast)
+        tracks = iter(["music/1.flac", "music/1.flac", "music/2.flac"])
+
+        def mpd_metadata():
+            f = next(tracks)
+            return {"playing": True, "source": "MPD", "title": f, "file": f}
+
+        monkeypatch.setattr(service, "get_mpd_metadata", mpd_metadata)
+        stream = {
+            "id": "MPD",
+            "status": "playing",
+            "properties": {"metadata": {"title": "x"}},
+        }
+        monkeypatch.setattr(
+            service, "_extract_stream_metadata", lambda s: {"source": "MPD"}
+        )
+
+        async def scenario():
+            for _ in range(3):
+                await service._process_stream(stream, {})
+                await service._prefetch_task
+
+        asyncio.run(scenario())
+
+        assert len(rounds) == 2  # once per track, not per poll
+        assert rounds[0].cancelled and not rounds[1].cancelled
+        assert service._prefetch_ticket is rounds[1]
+        assert isinstance(rounds[0], mod.LookupTicket)
+
+
+class TestLibraryCrawl:
+    """MPD library crawl: album directory artwork stored before first play."""
+
+    class _FakeMpd:
+        TREE = {
+            "": (["Pink Floyd", "Queen"], []),
+            "Pink Floyd": (["Pink Floyd/Animals", "Pink Floyd/Meddle"], []),
+            "Pink Floyd/Animals": ([], ["Pink Floyd/Animals/1.flac"]),
+            "Pink Floyd/Meddle": ([], ["Pink Floyd/Meddle/1.flac"]),
+            "Queen": (["Queen/Jazz"], ["Queen/single.flac"]),
+            "Queen/Jazz": ([], ["Queen/Jazz/1.flac", "Queen/Jazz/2.flac"]),
+        }
+
+        def __init__(self, embedded=(), folder=(), status=None):
+            self.embedded = set(embedded)
+            self.folder = set(folder)
+            self.listed = []
+            self.status = status or {}
+            self.db_update = "1700000000"
+
+        @staticmethod
+        def _arg(command):
+            return command.split('"')[1]
+
+        def command(self, command):
+            if command == "stats":
+                return {"db_update": self.db_update}
+            return dict(self.status)
+
+        def entries_command(self, command):
+            path = self._arg(command)
+            self.listed.append(path)
+            dirs, files = self.TREE[path]
+            return [{"directory": d} for d in dirs] + [{"file": f} for f in files]
+
+        def binary_command(self, command, into=None, limit=None):
+            verb, path = command.split(" ", 1)[0], self._arg(command)
+            source = self.embedded if verb == "readpicture" else self.folder
+            if path in source and command.endswith(" 0"):
+                data = TestArtworkVariants._image((100, 100))
+                return {"size": str(len(data))}, data
+            return {}, b""
+
+    def _walk(self, mod, service, cursor=None):
+        progress = mod.CrawlProgress(service.artwork_dir / "library_crawl.json")
+        progress.cursor = cursor
+        return [d for d, _files in service._crawl_walk(progress)]
+
+    def test_walks_sorted_preorder_and_resumes(self, metadata_service_module, service):
+        mod = metadata_service_module
+        service.mpd = self._FakeMpd()
+        assert self._walk(mod, service) == [
+            "",
+            "Pink Floyd",
+            "Pink Floyd/Animals",
+            "Pink Floyd/Meddle",
+            "Queen",
+            "Queen/Jazz",
+        ]
+
+        service.mpd = self._FakeMpd()
+        rest = self._walk(mod, service, ("Pink Floyd", "Meddle"))
+        assert rest == ["Queen", "Queen/Jazz"]
+        # Finished subtrees are not listed again; the cursor's own is (its
+        # subdirectories come after it)
+        assert "Pink Floyd/Animals" not in service.mpd.listed
+        assert "Pink Floyd/Meddle" in service.mpd.listed
+
+    def test_directory_art_embedded_then_folder(self, metadata_service_module, service):
+        service.mpd = self._FakeMpd(
+            embedded={"Queen/Jazz/1.flac"}, folder={"Pink Floyd/Meddle/1.flac"}
+        )
+        assert service._crawl_directory("Queen/Jazz", [{"file": "Queen/Jazz/1.flac"}])
+        assert service._crawl_directory(
+            "Pink Floyd/Meddle", [{"file": "Pink Floyd/Meddle/1.flac"}]
+        )
+        assert not service._crawl_directory(
+            "Pink Floyd/Animals", [{"file": "Pink Floyd/Animals/1.flac"}]
+        )
+        assert not service._crawl_directory("Empty", [])
+
+        # Another track of the album: no embedded art, served the folder's
+        service._mpd_was_connected = True
+        name = service._fetch_mpd_artwork("Queen/Jazz/2.flac")
+        assert name and name == service.artwork_store.lookup("mpd-dir:Queen/Jazz")
+
+    def test_pass_completes_and_is_not_repeated(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        mod = metadata_service_module
+        monkeypatch.setattr(mod, "MPD_ARTWORK_CRAWL_DELAY", 0)
+        service.mpd = self._FakeMpd(embedded={"Queen/Jazz/1.flac"})
+        progress = mod.CrawlProgress(service.artwork_dir / "library_crawl.json")
+
+        assert asyncio.run(service._crawl_pass(progress))
+        assert progress.state == "complete"
+        assert (progress.scanned, progress.stored) == (6, 1)
+
+        reloaded = mod.CrawlProgress(progress.path)
+        assert reloaded.cursor is None and reloaded.db_update == "1700000000"
+        service.mpd.listed.clear()
+        assert asyncio.run(service._crawl_pass(reloaded))
+        assert service.mpd.listed == []  # same database: nothing to do
+
+        service.mpd.db_update = "1800000000"
+        assert asyncio.run(service._crawl_pass(reloaded))
+        assert len(service.mpd.listed) == 6
+
+    def test_stops_short_of_the_artwork_quota(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        import asyncio
+
+        mod = metadata_service_module
+        service.mpd = self._FakeMpd()
+        service.artwork_store.max_files = 0
+        progress = mod.CrawlProgress(service.artwork_dir / "library_crawl.json")
+
+        assert asyncio.run(service._crawl_pass(progress))
+        assert progress.state == "paused: artwork quota nearly full"
+        assert service.mpd.listed == []
+
+    def test_progress_survives_restart(self, metadata_service_module, tmp_path):
+        mod = metadata_service_module
+        progress = mod.CrawlProgress(tmp_path / "crawl.json")
+        progress.begin("42")
+        for n in range(mod.CrawlProgress.SAVE_EVERY):
+            progress.advance(("Artist", f"Album {n:02}"), stored=True)
+
+        reloaded = mod.CrawlProgress(tmp_path / "crawl.json")
+        assert reloaded.cursor == ("Artist", "Album 24")
+        assert reloaded.pass_db_update == "42"
+        assert reloaded.done(("Artist", "Album 03"))
+        assert reloaded.holds_cursor(("Artist",))
+        assert not reloaded.done(("Artist", "Album 30"))
+
+        (tmp_path / "bad.json").write_text("[1, 2]")
+        assert mod.CrawlProgress(tmp_path / "bad.json").cursor is None
+
+    def test_status_section(self, metadata_service_module):
+        mod = metadata_service_module
+        progress = mod.CrawlProgress(mod.ARTWORK_DIR / "missing.json")
+        progress.state = "running"
+        progress.current = "Queen/<Jazz>"
+        progress.scanned, progress.stored = 10, 7
+
+        html = mod._render_library_crawl_section(progress.stats())
+
+        assert "Running · 10 folders scanned, 7 with artwork" in html
+        assert "Now: Queen/&lt;Jazz&gt;" in html
+        assert mod._render_library_crawl_section(None) == ""
+
+
+class TestMpdAlbumArtwork:
+    """MPD artwork is transferred once per album, not once per track."""
+
+    class _FakeMpd:
+        CHUNK = 64
+
+        def __init__(self, embedded=None, folder=None):
+            self.pictures = {"readpicture": embedded or {}, "albumart": folder or {}}
+            self.commands = []
+
+        def binary_command(self, command, into=None, limit=None):
+            self.commands.append(command)
+            verb, path = command.split(" ", 1)[0], command.split('"')[1]
+            offset = int(command.rsplit(" ", 1)[1])
+            data = self.pictures[verb].get(path, b"")
+            chunk = data[offset : offset + self.CHUNK]
+            if into is not None:
+                into[: len(chunk)] = chunk
+                chunk = into[: len(chunk)]
+            return ({"size": str(len(data))} if chunk else {}), chunk
+
+    @staticmethod
+    def _song(n, **tags):
+        return {"file": f"Queen/Jazz/{n}.flac", **tags}
+
+    def _fetch(self, service, song):
+        return service.fetch_mpd_artwork(song["file"], service._mpd_album_source(song))
+
+    def test_album_identity(self, service):
+        source = service._mpd_album_source
+        assert source(self._song(1, MUSICBRAINZ_ALBUMID="abc", Album="Jazz")) == (
+            "mpd-album:abc"
+        )
+        assert source(self._song(1, AlbumArtist="Queen", Album="Jazz")) == (
+            "mpd-album:queen|jazz"
+        )
+        assert source(self._song(1, Album="Jazz")) == "mpd-dir:Queen/Jazz"
+        assert source({"file": "loose.flac"}) == ""
+        assert source({"file": "http://radio/stream"}) == ""
+
+    def test_later_tracks_only_check_the_first_chunk(self, service):
+        cover = TestArtworkVariants._image((100, 100))
+        assert len(cover) > self._FakeMpd.CHUNK
+        songs = [self._song(n, MUSICBRAINZ_ALBUMID="abc") for n in (1, 2, 3)]
+        service.mpd = self._FakeMpd(embedded={s["file"]: cover for s in songs})
+
+        first = self._fetch(service, songs[0])
+        transferred = len(service.mpd.commands)
+        service.mpd.commands.clear()
+        later = [self._fetch(service, s) for s in songs[1:]]
+
+        assert first and later == [first, first]
+        assert transferred == -(-len(cover) // self._FakeMpd.CHUNK)
+        assert service.mpd.commands == [
+            'readpicture "Queen/Jazz/2.flac" 0',
+            'readpicture "Queen/Jazz/3.flac" 0',
+        ]
+        assert service.artwork_store.lookup("mpd-album:abc") == first
+
+    def test_concurrent_tracks_share_one_album_transfer(self, service):
+        import threading
+        import time
+
+        cover = TestArtworkVariants._image((100, 100))
+        songs = [self._song(n, MUSICBRAINZ_ALBUMID="abc") for n in (1, 2)]
+        mpd = self._FakeMpd(embedded={s["file"]: cover for s in songs})
+        entered, release = threading.Event(), threading.Event()
+        read = mpd.binary_command
+
+        def gated(command, into=None, limit=None):
+            entered.set()
+            release.wait(2)
+            return read(command, into, limit)
+
+        mpd.binary_command = gated
+        service.mpd = mpd
+        results = {}
+
+        def fetch(song):
+            results[song["file"]] = self._fetch(service, song)
+
+        # Now playing and prefetch, for two tracks of one album
+        first = threading.Thread(target=fetch, args=(songs[0],))
+        first.start()
+        entered.wait(2)
+        second = threading.Thread(target=fetch, args=(songs[1],))
+        second.start()
+        deadline = time.monotonic() + 2
+        while service._flight.shared == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        first.join(2)
+        second.join(2)
+
+        name = service.artwork_store.lookup("mpd-album:abc")
+        assert name and set(results.values()) == {name}
+        # Track 2 waited for track 1's transfer, then only checked its head
+        full = [c for c in mpd.commands if c.startswith('readpicture "Queen/Jazz/1')]
+        assert len(full) == -(-len(cover) // self._FakeMpd.CHUNK)
+        assert [c for c in mpd.commands if "2.flac" in c] == [
+            'readpicture "Queen/Jazz/2.flac" 0'
+        ]
+
+    def test_track_with_its_own_art_keeps_it(self, service):
+        cover = TestArtworkVariants._image((100, 100))
+        single = TestArtworkVariants._image((80, 80))
+        songs = [self._song(n, AlbumArtist="Queen", Album="Jazz") for n in (1, 2)]
+        service.mpd = self._FakeMpd(
+            embedded={songs[0]["file"]: cover, songs[1]["file"]: single}
+        )
+
+        album = self._fetch(service, songs[0])
+        own = self._fetch(service, songs[1])
+        service.mpd.commands.clear()
+
+        assert own and own != album
+        assert self._fetch(service, songs[1]) == own
+        assert service.mpd.commands == []  # remembered per track
+
+    def test_folder_art_when_nothing_is_embedded(self, service):
+        cover = TestArtworkVariants._image((100, 100))
+        songs = [self._song(n) for n in (1, 2)]
+        service.mpd = self._FakeMpd(folder={songs[0]["file"]: cover})
+
+        first = self._fetch(service, songs[0])
+        service.mpd.commands.clear()
+        second = self._fetch(service, songs[1])
+
+        assert first and second == first
+        assert service.artwork_store.lookup("mpd-dir:Queen/Jazz") == first
+        assert service.mpd.commands == ['readpicture "Queen/Jazz/2.flac" 0']
+
+    def test_check_can_be_turned_off(
+        self, metadata_service_module, service, monkeypatch
+    ):
+        monkeypatch.setattr(metadata_service_module, "MPD_ARTWORK_VERIFY", False)
+        cover = TestArtworkVariants._image((100, 100))
+        songs = [self._song(n, MUSICBRAINZ_ALBUMID="abc") for n in (1, 2)]
+        service.mpd = self._FakeMpd(embedded={songs[0]["file"]: cover})
+
+        first = self._fetch(service, songs[0])
+        service.mpd.commands.clear()
+
+        assert self._fetch(service, songs[1]) == first
+        assert service.mpd.commands == []
+
+    def test_album_source_is_not_published(self, service):
+        assert "mpd_album" not in service._output_metadata(
+            {"title": "Jazz", "mpd_album": "mpd-album:abc"}
+        )
+
+
+class TestInlineArtwork:
+    """Snapcast `artData` bytes are stored directly, without an HTTP fetch."""
+
+    def _stream(self, data, art_url="http://10.0.0.5:1780/__image_cache?name=x"):
+        import base64
+
+        encoded = base64.b64encode(data).decode() if isinstance(data, bytes) else data
+        return {
+            "id": "AirPlay",
+            "status": "playing",
+            "properties": {
+                "metadata": {
+                    "title": "Idioteque",
+                    "artist": ["Radiohead"],
+                    "artUrl": art_url,
+                    "artData": {"data": encoded, "extension": "png"},
+                }
+            },
+        }
+
+    def test_stored_without_download(self, service, monkeypatch):
+        image = TestArtworkVariants._image((100, 100))
+
+        def no_download(*args, **kwargs):
+            raise AssertionError("inline artwork must not be downloaded")
+
+        monkeypatch.setattr(service, "download_artwork", no_download)
+        metadata = service._extract_stream_metadata(self._stream(image))
+        service.enrich_artwork(metadata)
+
+        name = metadata["artwork"].rsplit("/", 1)[1]
+        assert (service.artwork_dir / name).read_bytes() == image
+        assert metadata["artwork_source"] == "snapcast"
+        assert "art_data" not in service._output_metadata(metadata)
+
+    def test_same_bytes_are_not_stored_again(self, service, monkeypatch):
+        image = TestArtworkVariants._image((100, 100))
+        encoded = self._stream(image)["properties"]["metadata"]["artData"]["data"]
+        first = service.ingest_artwork_data(encoded)
+
+        def no_put(*args, **kwargs):
+            raise AssertionError("already stored")
+
+        monkeypatch.setattr(service.artwork_store, "put", no_put)
+        assert service.ingest_artwork_data(encoded) == first
+
+    def test_malformed_data_falls_back_to_art_url(self, service, monkeypatch):
+        fetched = []
+        monkeypatch.setattr(
+            service,
+            "download_artwork",
+            lambda url, cache_key="": fetched.append(url) or "artwork_x.jpg",
+        )
+        metadata = service._extract_stream_metadata(self._stream("!!not base64"))
+        service.enrich_artwork(metadata)
+
+        assert fetched == ["http://10.0.0.5:1780/__image_cache?name=x"]
+        assert metadata["artwork"].endswith("/artwork_x.jpg")
+
+    def test_cover_change_re_enriches(self, service):
+        one = service._extract_stream_metadata(self._stream(b"\x89PNG one"))
+        two = service._extract_stream_metadata(self._stream(b"\x89PNG two"))
+
+        assert service._enrichment_key(one) != service._enrichment_key(two)
+        # Keyed on a hash, not on the whole base64 picture
+        assert one["art_data"] not in service._enrichment_key(one)
+
+    def test_art_kept_for_flushes_without_it(self, service, monkeypatch):
+        import asyncio
+
+        sent = []
+
+        async def broadcast(stream_id, metadata, server):
+            sent.append(dict(metadata))
+
+        monkeypatch.setattr(service, "_broadcast_to_stream", broadcast)
+        monkeypatch.setattr(service, "enrich_tags", lambda metadata: None)
+        monkeypatch.setattr(service, "enrich_artist_image", lambda metadata: None)
+        with_art = self._stream(TestArtworkVariants._image((100, 100)), art_url="")
+        later = self._stream(b"", art_url="")
+        del later["properties"]["metadata"]["artData"]
+
+        async def scenario():
+            await service._process_stream(with_art, {})
+            await service.streams["AirPlay"].enrich_task
+            key = service.streams["AirPlay"].enrich_key
+            # The plugin only sends the picture with the flush it changed in
+            await service._process_stream(later, {})
+            return key
+
+        key = asyncio.run(scenario())
+
+        assert service.streams["AirPlay"].enrich_key == key
+        current = service.streams["AirPlay"].current
+        assert current["artwork"] and current["artwork_source"] == "snapcast"
+        assert sent[-1]["artwork"] == current["artwork"]